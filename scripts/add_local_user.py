@@ -0,0 +1,23 @@
+"""로컬 모드(STORAGE_BACKEND = "sqlite")에서 로그인할 사용자 추가
+
+사용법:
+    python -m scripts.add_local_user <user_id> <password>
+"""
+import argparse
+
+from utils.storage import create_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("user_id")
+    parser.add_argument("password")
+    args = parser.parse_args()
+
+    storage = create_storage("sqlite")
+    storage.put_user(args.user_id, {"id": args.user_id, "password": args.password})
+    print(f"► 사용자 추가 완료: {args.user_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""일기 코퍼스를 관점 x 톤 조합 전체로 일괄 증강하는 배치 실행기
+
+사용법:
+    OPENAI_API_KEY=... python -m scripts.batch_augment corpus.jsonl results.jsonl --concurrency 8
+
+corpus.jsonl은 한 줄에 {"id": "...", "diary": "..."} 하나씩.
+결과는 완료되는 순서대로 results.jsonl에 추가되고, 완료된 키는 results.jsonl.done에 기록된다.
+중단된 실행을 같은 인자로 다시 시작하면 이미 완료된 항목은 건너뛴다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from utils.api_client import DiaryAnalyzer
+
+CONFIG_DIR = Path(__file__).parent.parent / 'config'
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_config_keys(filename):
+    with open(CONFIG_DIR / filename, "r", encoding="utf-8") as f:
+        return list(json.load(f).keys())
+
+
+def load_done_keys(checkpoint_path: Path) -> set:
+    """체크포인트 파일에서 완료된 작업 키 로드"""
+    if not checkpoint_path.exists():
+        return set()
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def job_key(diary_id, life_orientation, tone, method) -> str:
+    return f"{diary_id}|{life_orientation}|{tone}|{method}"
+
+
+async def run_batch(analyzer, jobs, output_path: Path, checkpoint_path: Path, errors_path: Path, concurrency: int):
+    """제한된 수의 작업을 동시에 실행하며 결과와 체크포인트를 즉시 기록"""
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    completed = failed = 0
+    started_at = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as output, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            open(errors_path, "a", encoding="utf-8") as errors:
+
+        async def run_job(key, item, life_orientation, tone, method):
+            nonlocal completed, failed
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    result = await analyzer.aaugment_diary_v2(
+                        item["diary"], life_orientation, tone, method=method, use_cache=False
+                    )
+                    error = None
+                except Exception as e:
+                    result, error = None, str(e)
+                elapsed = time.perf_counter() - start
+
+            record = {
+                "key": key,
+                "id": item["id"],
+                "life_orientation": life_orientation,
+                "tone": tone,
+                "method": method,
+                "input_entry": item["diary"],
+                "elapsed_s": round(elapsed, 3),
+                "timestamp": datetime.now().isoformat(),
+            }
+            async with write_lock:
+                if error is None:
+                    # 결과를 먼저 기록하고 체크포인트를 남겨야 중단되어도 결과가 유실되지 않음
+                    output.write(json.dumps({**record, "result": result}, ensure_ascii=False) + "\n")
+                    output.flush()
+                    checkpoint.write(key + "\n")
+                    checkpoint.flush()
+                    completed += 1
+                else:
+                    errors.write(json.dumps({**record, "error": error}, ensure_ascii=False) + "\n")
+                    errors.flush()
+                    failed += 1
+                print(f"► [{completed + failed}/{len(jobs)}] {key} {'완료' if error is None else '실패: ' + error}")
+
+        await asyncio.gather(*(run_job(*job) for job in jobs))
+
+    print(f"► 완료 {completed}건, 실패 {failed}건, {time.perf_counter() - started_at:.1f}초")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="입력 일기 JSONL 경로")
+    parser.add_argument("output", help="결과 JSONL 경로 (체크포인트는 <output>.done)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시에 실행할 파이프라인 수")
+    parser.add_argument("--method", default="perspective")
+    parser.add_argument("--life-orientations", nargs="*", help="기본값: perspectives.json의 모든 관점")
+    parser.add_argument("--tones", nargs="*", help="기본값: tone_examples_v2.json의 모든 톤")
+    args = parser.parse_args()
+
+    output_path = Path(args.output)
+    checkpoint_path = output_path.with_name(output_path.name + ".done")
+    errors_path = output_path.with_name(output_path.name + ".errors.jsonl")
+
+    life_orientations = args.life_orientations or load_config_keys('perspectives.json')
+    tones = args.tones or load_config_keys('tone_examples_v2.json')
+    # 톤 오타가 코퍼스 전체의 실패로 이어지지 않도록 실행 전에 확인
+    unknown_tones = set(tones) - set(load_config_keys('tone_examples_v2.json')) - {"my_tone"}
+    if unknown_tones:
+        parser.error(f"지원하지 않는 톤입니다: {', '.join(sorted(unknown_tones))}")
+    done = load_done_keys(checkpoint_path)
+
+    jobs = []
+    for item in load_corpus(args.corpus):
+        for life_orientation in life_orientations:
+            for tone in tones:
+                key = job_key(item["id"], life_orientation, tone, args.method)
+                if key not in done:
+                    jobs.append((key, item, life_orientation, tone, args.method))
+    print(f"► 전체 {len(jobs) + len(done)}건 중 {len(done)}건은 이미 완료, {len(jobs)}건 실행")
+
+    analyzer = DiaryAnalyzer(os.environ["OPENAI_API_KEY"], os.environ.get("ANTHROPIC_API_KEY", ""))
+    asyncio.run(run_batch(analyzer, jobs, output_path, checkpoint_path, errors_path, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""3단계 perspective 파이프라인과 단일 호출 fused 파이프라인의 비교 벤치마크
+
+사용법:
+    OPENAI_API_KEY=... python -m scripts.bench_fused --diaries diaries.jsonl --repeat 3
+
+diaries.jsonl은 한 줄에 {"diary": "..."} 하나씩. 생략하면 내장 예시 일기를 사용한다.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from langchain_community.callbacks import get_openai_callback
+
+from utils.api_client import DiaryAnalyzer
+
+SAMPLE_DIARIES = [
+    "오늘은 아침부터 비가 와서 출근길이 너무 힘들었다. 회의에서 발표를 했는데 질문에 제대로 답을 못해서 속상했다. "
+    "저녁에는 친구랑 통화하면서 조금 기분이 풀렸다.",
+    "주말인데 밀린 과제 때문에 하루 종일 도서관에 있었다. 생각보다 많이 끝내지는 못했지만 그래도 반은 했다. "
+    "돌아오는 길에 본 노을이 예뻤다.",
+]
+
+
+def load_diaries(path):
+    if path is None:
+        return SAMPLE_DIARIES
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["diary"] for line in f if line.strip()]
+
+
+def run_method(analyzer, method, diaries, life_orientation, tone, repeat):
+    """한 가지 방법으로 모든 일기를 반복 실행하고 호출 수, 토큰, 시간을 집계"""
+    wall_times = []
+    calls = prompt_tokens = completion_tokens = 0
+    for _ in range(repeat):
+        for diary in diaries:
+            with get_openai_callback() as cb:
+                start = time.perf_counter()
+                analyzer.augment_diary_v2(diary, life_orientation, tone, method=method, use_cache=False)
+                wall_times.append(time.perf_counter() - start)
+            calls += cb.successful_requests
+            prompt_tokens += cb.prompt_tokens
+            completion_tokens += cb.completion_tokens
+    runs = len(wall_times)
+    return {
+        "method": method,
+        "runs": runs,
+        "calls/run": calls / runs,
+        "prompt_tokens/run": prompt_tokens / runs,
+        "completion_tokens/run": completion_tokens / runs,
+        "wall_mean_s": statistics.mean(wall_times),
+        "wall_p50_s": statistics.median(wall_times),
+        "wall_p95_s": sorted(wall_times)[min(runs - 1, int(runs * 0.95))],
+    }
+
+
+def print_table(rows):
+    keys = list(rows[0].keys())
+    print(" | ".join(f"{k:>20}" for k in keys))
+    for row in rows:
+        print(" | ".join(f"{row[k]:>20.2f}" if isinstance(row[k], float) else f"{row[k]:>20}" for k in keys))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diaries", help="벤치마크에 쓸 일기 JSONL 경로")
+    parser.add_argument("--life-orientation", default="optimistic")
+    parser.add_argument("--tone", default="warm")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    analyzer = DiaryAnalyzer(os.environ["OPENAI_API_KEY"], os.environ.get("ANTHROPIC_API_KEY", ""))
+    diaries = load_diaries(args.diaries)
+    rows = [
+        run_method(analyzer, method, diaries, args.life_orientation, args.tone, args.repeat)
+        for method in ("perspective", "fused")
+    ]
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""제공자 헤징 효과 측정
+
+꼬리 지연이 긴 OpenAI 호환 스텁과 Anthropic 호환 스텁을 띄우고, 같은 일기들을 헤징 없이 / 헤징으로 증강해
+전체 지연 시간 백분위, 헤징 비율, 추가로 쓴 토큰을 비교한다.
+
+사용법:
+    python -m scripts.bench_hedging --requests 40
+    python -m scripts.bench_hedging --primary-latency lognormal:0.4:1.2 --secondary-latency lognormal:0.6:0.3 --primary-error-rate 0.05
+"""
+import argparse
+import json
+import statistics
+import time
+
+from utils.api_client import DiaryAnalyzer
+from utils.llm_backend import LLMBackend
+from utils.llm_stub import StubProfile, StubServer
+from utils.provider_router import ProviderRouter
+from scripts.bench_fused import load_diaries
+from scripts.llm_stub_server import parse_latency
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(args, hedging: bool) -> dict:
+    primary = StubServer(StubProfile(
+        latency=args.primary_latency, tokens_per_second=0, error_rate=args.primary_error_rate, seed=args.seed
+    ), port=0).start()
+    secondary = StubServer(StubProfile(latency=args.secondary_latency, tokens_per_second=0, seed=args.seed + 1), port=0).start()
+    router = ProviderRouter(hedge_percentile=args.hedge_percentile, hedging=hedging, min_samples=args.min_samples)
+    backend = LLMBackend(
+        "", kind="local", base_url=primary.base_url,
+        providers=("openai", "anthropic") if hedging else ("openai",),
+        anthropic_base_url=secondary.root_url, router=router
+    )
+    analyzer = DiaryAnalyzer("", "", llm_backend=backend, warm_up_connections=0)
+    diaries = load_diaries(args.diaries)
+
+    latencies = []
+    failures = 0
+    for index in range(args.requests):
+        start = time.perf_counter()
+        try:
+            analyzer.augment_diary_v2(diaries[index % len(diaries)], args.life_orientation, args.tone, use_cache=False)
+        except Exception:
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    primary.stop()
+    secondary.stop()
+
+    tokens = sum(server.stats["prompt_tokens"] + server.stats["completion_tokens"] for server in (primary, secondary))
+    return {
+        "hedging": hedging,
+        "requests": args.requests,
+        "failures": failures,
+        "p50_s": statistics.median(latencies) if latencies else None,
+        "p95_s": percentile(latencies, 0.95) if latencies else None,
+        "p99_s": percentile(latencies, 0.99) if latencies else None,
+        "llm_requests": primary.stats["requests"] + secondary.stats["requests"],
+        "secondary_requests": secondary.stats["requests"],
+        "tokens_per_request": tokens / args.requests,
+        "router": router.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diaries", help="벤치마크에 쓸 일기 JSONL 경로")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--life-orientation", default="optimistic")
+    parser.add_argument("--tone", default="warm")
+    parser.add_argument("--primary-latency", type=parse_latency, default="lognormal:0.4:1.0", help="1순위(OpenAI 호환) 지연 분포")
+    parser.add_argument("--secondary-latency", type=parse_latency, default="lognormal:0.6:0.3", help="2순위(Anthropic 호환) 지연 분포")
+    parser.add_argument("--primary-error-rate", type=float, default=0.0)
+    parser.add_argument("--hedge-percentile", type=float, default=0.9)
+    parser.add_argument("--min-samples", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    results = []
+    for hedging in (False, True):
+        results.append(run(args, hedging))
+
+    print(f"{'hedging':>8} | {'p50_s':>6} | {'p95_s':>6} | {'p99_s':>6} | {'llm_reqs':>8} | {'secondary':>9} | {'tokens/req':>10} | {'failures':>8}")
+    for row in results:
+        print(
+            f"{str(row['hedging']):>8} | {row['p50_s']:>6.2f} | {row['p95_s']:>6.2f} | {row['p99_s']:>6.2f} | "
+            f"{row['llm_requests']:>8} | {row['secondary_requests']:>9} | {row['tokens_per_request']:>10.0f} | {row['failures']:>8}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""단계별 제공자 측 프롬프트 캐시 적중률 측정
+
+여러 일기 x 관점 x 톤 조합으로 파이프라인을 실행하고, 단계별로 프롬프트 토큰 중 캐시에서 읽은 비율
+(usage.prompt_tokens_details.cached_tokens)을 보고한다. 응답 캐시는 사용하지 않는다.
+
+사용법:
+    OPENAI_API_KEY=... python -m scripts.bench_prompt_cache --method perspective --repeat 2
+    python -m scripts.bench_prompt_cache --stub   # 로컬 스텁 서버 (접두사 캐시를 흉내 냄)
+"""
+import argparse
+import json
+import os
+
+from utils.api_client import DiaryAnalyzer
+from utils.llm_backend import LLMBackend
+from utils.llm_stub import StubProfile, StubServer
+from utils.tracing import tracer
+from scripts.bench_fused import load_diaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diaries", help="벤치마크에 쓸 일기 JSONL 경로")
+    parser.add_argument("--method", choices=("perspective", "fused"), default="perspective")
+    parser.add_argument("--life-orientations", default="optimistic,growth-oriented")
+    parser.add_argument("--tones", default="warm,calm")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--stub", action="store_true", help="로컬 스텁 서버 사용")
+    parser.add_argument("--stub-cache-min-tokens", type=int, default=1024, help="스텁 서버가 캐시하는 최소 접두사 토큰 수")
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    if args.stub:
+        server = StubServer(StubProfile(
+            latency={"dist": "fixed", "seconds": 0.0},
+            tokens_per_second=0,
+            prompt_cache_min_tokens=args.stub_cache_min_tokens
+        ), port=0).start()
+        backend = LLMBackend("", kind="local", base_url=server.base_url)
+    else:
+        backend = LLMBackend(os.environ["OPENAI_API_KEY"])
+    analyzer = DiaryAnalyzer(backend.api_key, os.environ.get("ANTHROPIC_API_KEY", ""), llm_backend=backend)
+
+    for _ in range(args.repeat):
+        for diary in load_diaries(args.diaries):
+            for life_orientation in args.life_orientations.split(","):
+                for tone in args.tones.split(","):
+                    analyzer.augment_diary_v2(diary, life_orientation, tone, method=args.method, use_cache=False)
+
+    report = tracer.prompt_cache_report()
+    print(f"{'stage':>10} | {'calls':>6} | {'prompt_tokens':>13} | {'cached_tokens':>13} | {'hit_rate':>8}")
+    for stage, row in report.items():
+        hit_rate = f"{row['hit_rate']:.1%}" if row["hit_rate"] is not None else "-"
+        print(f"{stage:>10} | {row['llm_calls']:>6.0f} | {row['prompt_tokens']:>13.0f} | {row['cached_tokens']:>13.0f} | {hit_rate:>8}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""콜드 스타트 시간 측정
+
+매 항목을 새 파이썬 프로세스에서 측정해 모듈 캐시의 영향을 없앤다.
+    import_login: 로그인 화면을 그리는 데 필요한 모듈(streamlit_app 최상위 import) 불러오기
+    import_analyzer: 증강에 필요한 모듈(utils.api_client, langchain, openai) 불러오기
+    login_render: streamlit AppTest로 로그인 화면을 처음 그리기까지
+    first_augmentation: 분석기 준비 완료, 첫 스트리밍 조각, 증강 완료까지 (로컬 스텁 서버 사용)
+
+사용법:
+    python -m scripts.bench_startup
+    python -m scripts.bench_startup --repeat 3 --output startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+LOGIN_MODULES = (
+    "streamlit",
+    "streamlit_extras.let_it_rain",
+    "streamlit_extras.stylable_container",
+    "utils.analyzer_loader",
+    "utils.response_cache",
+    "utils.request_context",
+    "utils.tracing",
+    "utils.write_behind",
+    "utils.storage",
+)
+ANALYZER_MODULES = ("utils.api_client", "utils.llm_backend")
+
+DIARY = "오늘은 발표를 망쳐서 하루 종일 기분이 가라앉았다. 집에 와서 동생이랑 저녁을 먹으면서 조금 나아졌다."
+
+IMPORT_CODE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+heavy = sorted(name for name in ("langchain_core", "langchain_community", "openai", "anthropic", "firebase_admin") if name in sys.modules)
+print(json.dumps({{"seconds": time.perf_counter() - start, "heavy_modules": heavy}}))
+"""
+
+LOGIN_RENDER_CODE = """
+import json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("streamlit_app.py", default_timeout=120)
+at.secrets["general"] = {{
+    "OPENAI_API_KEY": "", "ANTHROPIC_API_KEY": "",
+    "STORAGE_BACKEND": "sqlite", "LLM_BACKEND": "local",
+}}
+at.run()
+elapsed = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(str(at.exception[0].value))
+print(json.dumps({{"seconds": elapsed}}))
+"""
+
+FIRST_AUGMENTATION_CODE = """
+import json, time
+from utils.llm_stub import StubProfile, StubServer
+server = StubServer(StubProfile(latency={{"dist": "fixed", "seconds": {latency}}}, tokens_per_second={tps}), port=0).start()
+start = time.perf_counter()
+from utils.analyzer_loader import AnalyzerLoader
+loader = AnalyzerLoader("", "", llm_backend_kind="local", llm_base_url=server.base_url)
+analyzer = loader.get()
+ready = time.perf_counter() - start
+first_chunk = None
+for _ in analyzer.stream_diary_v2({diary!r}, "optimistic", "warm", use_cache=False):
+    if first_chunk is None:
+        first_chunk = time.perf_counter() - start
+done = time.perf_counter() - start
+print(json.dumps({{"ready_s": ready, "first_chunk_s": first_chunk, "done_s": done, **{{k: v for k, v in loader.timings.items()}}}}))
+"""
+
+
+def run_child(code: str) -> dict:
+    """새 파이썬 프로세스에서 코드를 실행하고 마지막 줄의 JSON 결과 반환"""
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(f"측정 프로세스 오류 발생: {result.stderr.strip()[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median_of(samples, key):
+    values = [sample[key] for sample in samples if sample.get(key) is not None]
+    return statistics.median(values) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="항목별 반복 횟수 (중앙값 보고)")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="스텁 서버 첫 토큰 지연(초)")
+    parser.add_argument("--stub-tps", type=float, default=0, help="스텁 서버 초당 토큰 수 (0이면 한 번에 반환)")
+    parser.add_argument("--skip-render", action="store_true", help="AppTest 로그인 화면 측정 생략")
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    samples = {
+        "import_login": [run_child(IMPORT_CODE.format(modules=LOGIN_MODULES)) for _ in range(args.repeat)],
+        "import_analyzer": [run_child(IMPORT_CODE.format(modules=ANALYZER_MODULES)) for _ in range(args.repeat)],
+        "first_augmentation": [
+            run_child(FIRST_AUGMENTATION_CODE.format(latency=args.stub_latency, tps=args.stub_tps, diary=DIARY))
+            for _ in range(args.repeat)
+        ],
+    }
+    if not args.skip_render:
+        samples["login_render"] = [run_child(LOGIN_RENDER_CODE.format()) for _ in range(args.repeat)]
+
+    report = {
+        "import_login_s": median_of(samples["import_login"], "seconds"),
+        "import_login_heavy_modules": samples["import_login"][0]["heavy_modules"],
+        "import_analyzer_s": median_of(samples["import_analyzer"], "seconds"),
+        "login_render_s": median_of(samples.get("login_render", []), "seconds"),
+        "analyzer_import_s": median_of(samples["first_augmentation"], "import_s"),
+        "analyzer_construct_s": median_of(samples["first_augmentation"], "construct_s"),
+        "analyzer_ready_s": median_of(samples["first_augmentation"], "ready_s"),
+        "first_chunk_s": median_of(samples["first_augmentation"], "first_chunk_s"),
+        "first_augmentation_s": median_of(samples["first_augmentation"], "done_s"),
+    }
+    for key, value in report.items():
+        shown = f"{value:.3f}" if isinstance(value, float) else value
+        print(f"{key:>28} | {shown}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"median": report, "samples": samples}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
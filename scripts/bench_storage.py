@@ -0,0 +1,134 @@
+"""사용자 상호작용 하나당 저장소 비용 벤치마크
+
+한 번의 상호작용(일기 수정 -> 증강 요청 -> 응답 저장 -> 활동 기록)이 만드는 쓰기를 재현해,
+저장소를 직접 호출할 때와 쓰기 큐(WriteBehindQueue)를 거칠 때의 연산별 지연 시간을 비교한다.
+
+사용법:
+    python -m scripts.bench_storage --backend sqlite --interactions 200
+    GOOGLE_APPLICATION_CREDENTIALS=key.json python -m scripts.bench_storage --backend firestore --interactions 20
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from utils.storage import create_storage
+from utils.write_behind import WriteBehindQueue
+
+SAMPLE_DIARY = (
+    "오늘은 아침부터 비가 와서 출근길이 너무 힘들었다. 회의에서 발표를 했는데 질문에 제대로 답을 못해서 속상했다. "
+    "저녁에는 친구랑 통화하면서 조금 기분이 풀렸다."
+)
+
+
+def interaction_intents(user_id, session_id, counter):
+    """상호작용 하나가 만드는 쓰기 의도 목록 (streamlit_app의 저장 순서와 동일)"""
+    now = datetime.now()
+    return [
+        ("save_entry", dict(user_id=user_id, session_id=session_id, entry_type="working_diaries",
+                            doc_counter=counter, entry=SAMPLE_DIARY, timestamp=now.isoformat())),
+        ("append_activity", dict(user_id=user_id, session_id=session_id,
+                                 activity="Modified diary entry", timestamp=now)),
+        ("append_activity", dict(user_id=user_id, session_id=session_id,
+                                 activity="Requested AI augmentation", timestamp=now)),
+        ("save_api_response", dict(user_id=user_id, session_id=session_id, doc_counter=counter, response={
+            "life_orientation": "optimistic", "tone": "warm", "input_entry": SAMPLE_DIARY,
+            "result": SAMPLE_DIARY, "cache": {}, "timestamp": now.isoformat()
+        })),
+    ]
+
+
+def create_backend(name, path):
+    if name == "sqlite":
+        return create_storage("sqlite", path=path)
+    import firebase_admin
+    from firebase_admin import firestore
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app()
+    return create_storage("firestore", db=firestore.client())
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(mode, latencies):
+    """연산별 지연 시간(ms) 요약"""
+    rows = []
+    for op, values in latencies.items():
+        rows.append({
+            "mode": mode,
+            "op": op,
+            "count": len(values),
+            "mean_ms": statistics.mean(values) * 1000,
+            "p50_ms": statistics.median(values) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+        })
+    return rows
+
+
+def run_direct(storage, interactions, session_id):
+    """저장소를 직접 호출 (UI 스레드가 기록을 기다리는 경우)"""
+    latencies = defaultdict(list)
+    storage.start_session("bench", session_id, datetime.now())
+    for counter in range(1, interactions + 1):
+        start_interaction = time.perf_counter()
+        for kind, params in interaction_intents("bench", session_id, counter):
+            start = time.perf_counter()
+            storage.apply(kind, params)
+            latencies[kind].append(time.perf_counter() - start)
+        latencies["interaction"].append(time.perf_counter() - start_interaction)
+    return summarize("direct", latencies)
+
+
+def run_queued(storage, interactions, session_id, spool_path):
+    """쓰기 큐를 거쳐 호출 (UI 스레드는 스풀 기록까지만 기다림)"""
+    latencies = defaultdict(list)
+    queue = WriteBehindQueue(storage, spool_path=spool_path)
+    queue.submit("start_session", user_id="bench", session_id=session_id, start_time=datetime.now())
+    for counter in range(1, interactions + 1):
+        start_interaction = time.perf_counter()
+        for kind, params in interaction_intents("bench", session_id, counter):
+            start = time.perf_counter()
+            queue.submit(kind, **params)
+            latencies[kind].append(time.perf_counter() - start)
+        latencies["interaction"].append(time.perf_counter() - start_interaction)
+    queue.flush()
+    rows = summarize("queued", latencies)
+    stats = queue.stats()
+    print(f"► 큐 통계: {json.dumps(stats, ensure_ascii=False)}")
+    return rows
+
+
+def print_table(rows):
+    keys = list(rows[0].keys())
+    print(" | ".join(f"{k:>18}" for k in keys))
+    for row in rows:
+        print(" | ".join(f"{row[k]:>18.3f}" if isinstance(row[k], float) else f"{row[k]:>18}" for k in keys))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("sqlite", "firestore"), default="sqlite")
+    parser.add_argument("--interactions", type=int, default=100, help="재현할 상호작용 수")
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = create_backend(args.backend, Path(tmp) / "storage.sqlite3")
+        session_id = f"bench_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        rows = run_direct(storage, args.interactions, f"{session_id}_direct")
+        rows += run_queued(storage, args.interactions, f"{session_id}_queued", Path(tmp) / "spool.sqlite3")
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""형식 지시문 + 텍스트 파서와 제공자 고유 구조화 출력 비교
+
+로컬 스텁 서버에 단계별 체인(발견, 판정, 증강, 톤, 통합)을 직접 호출해, 두 방식의
+호출당 입력 토큰, 파싱 실패율(결과를 못 얻은 비율), 텍스트 파서로 다시 시도한 비율, 호출당 LLM 요청 수를 비교한다.
+--malformed-rate는 형식 지시문만 보고 만든 JSON이 스키마에서 벗어나는 비율이다 (구조화 출력 요청에는 적용되지 않음).
+
+사용법:
+    python -m scripts.bench_structured_output --calls 30 --malformed-rate 0.03
+    python -m scripts.bench_structured_output --provider anthropic --output structured_output.json
+"""
+import argparse
+import json
+import time
+
+from utils.api_client import DiaryAnalyzer
+from utils.async_utils import run_sync
+from utils.llm_backend import LLMBackend
+from utils.llm_stub import StubProfile, StubServer
+from utils.perspective_agents import DiscoveredResults, DiscoveringSteps
+from scripts.bench_fused import load_diaries
+
+STAGES = ("discover", "judge", "augment", "tone", "fused")
+
+
+def stage_calls(analyzer: DiaryAnalyzer, diary: str, life_orientation: str, tone: str):
+    """단계 이름 -> 해당 단계 체인 호출(코루틴 함수)"""
+    perspective_agent = analyzer.perspective_agent
+    perspective_manager = analyzer.perspective_manager
+    # 증강 단계 입력은 고정된 발견 결과로 (발견 단계의 실패가 다른 단계 측정에 섞이지 않도록)
+    discovery = DiscoveredResults(points=[DiscoveringSteps(quotes=diary[:40], new_perspective="그래도 하루를 잘 버텨 냈다.")])
+    judge_orientation = next(iter(perspective_manager.life_orientations))
+    point = {"point": "친구와의 통화", "quotes": diary[:40], "reason": "하루를 버티게 해 준 대화"}
+    return {
+        "discover": lambda: perspective_agent.discover_chains[life_orientation].ainvoke({"diary_entry": diary}),
+        "judge": lambda: perspective_manager.judgment_chain.ainvoke({
+            "life_orientation": judge_orientation,
+            "life_orientation_desc": perspective_manager.get_life_orientation_definition(judge_orientation),
+            "point_json": json.dumps(point, ensure_ascii=False)
+        }),
+        "augment": lambda: perspective_agent.augment_chains[life_orientation].ainvoke(
+            perspective_agent._build_augment_inputs(discovery, diary)
+        ),
+        "tone": lambda: analyzer.tone_agent._create_tone_chain(tone).ainvoke(
+            analyzer.tone_agent._build_tone_inputs(diary, diary, tone)
+        ),
+        "fused": lambda: analyzer.fused_agent._create_fused_chain(life_orientation).ainvoke(
+            analyzer.fused_agent._build_inputs(diary, tone)
+        ),
+    }
+
+
+def run(args, structured_output: bool) -> list:
+    server = StubServer(StubProfile(
+        latency={"dist": "fixed", "seconds": 0.0}, tokens_per_second=0,
+        malformed_rate=args.malformed_rate, prompt_cache=False, seed=args.seed
+    ), port=0).start()
+    backend = LLMBackend(
+        "", kind="local", base_url=server.base_url, providers=(args.provider,),
+        anthropic_base_url=server.root_url, structured_output=structured_output
+    )
+    analyzer = DiaryAnalyzer("", "", llm_backend=backend, warm_up_connections=0)
+    calls_by_diary = [
+        stage_calls(analyzer, diary, args.life_orientation, args.tone) for diary in load_diaries(args.diaries)
+    ]
+
+    rows = []
+    for stage in STAGES:
+        calls = failures = requests = prompt_tokens = 0
+        elapsed = 0.0
+        for index in range(args.calls):
+            call = calls_by_diary[index % len(calls_by_diary)][stage]
+            before = dict(server.stats)
+            start = time.perf_counter()
+            try:
+                run_sync(call())
+            except Exception:
+                failures += 1
+            elapsed += time.perf_counter() - start
+            calls += 1
+            requests += server.stats["requests"] - before["requests"]
+            prompt_tokens += server.stats["prompt_tokens"] - before["prompt_tokens"]
+        rows.append({
+            "stage": stage,
+            "structured_output": structured_output,
+            "calls": calls,
+            "prompt_tokens/call": prompt_tokens / calls,
+            "llm_requests/call": requests / calls,
+            "retried_rate": (requests - calls) / calls,  # 텍스트 파서로 다시 시도한 비율
+            "parse_failure_rate": failures / calls,
+            "mean_s": elapsed / calls,
+        })
+    server.stop()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diaries", help="벤치마크에 쓸 일기 JSONL 경로")
+    parser.add_argument("--calls", type=int, default=30, help="단계별 호출 수")
+    parser.add_argument("--provider", choices=("openai", "anthropic"), default="openai")
+    parser.add_argument("--life-orientation", default="optimistic")
+    parser.add_argument("--tone", default="warm")
+    parser.add_argument("--malformed-rate", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    text_rows = run(args, structured_output=False)
+    native_rows = run(args, structured_output=True)
+
+    print(f"{'stage':>8} | {'text tok':>8} | {'native tok':>10} | {'saved':>6} | {'text fail':>9} | {'native fail':>11} | {'native retried':>14}")
+    for text, native in zip(text_rows, native_rows):
+        saved = 1 - native["prompt_tokens/call"] / text["prompt_tokens/call"]
+        print(
+            f"{text['stage']:>8} | {text['prompt_tokens/call']:>8.0f} | {native['prompt_tokens/call']:>10.0f} | {saved:>6.1%} | "
+            f"{text['parse_failure_rate']:>9.1%} | {native['parse_failure_rate']:>11.1%} | {native['retried_rate']:>14.1%}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(text_rows + native_rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
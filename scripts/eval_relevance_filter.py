@@ -0,0 +1,152 @@
+"""로컬 관련성 필터(n-gram 유사도)와 LLM 판정(judge_template)의 일치도 및 절약되는 지연 시간 평가
+
+일기와 관점마다 발견 체인을 한 번 실행해 포인트를 얻고, 같은 포인트를 두 필터로 판정한다.
+LLM 판정을 기준으로 로컬 필터의 일치율, 정밀도, 재현율, Cohen's kappa와, 요청당 판정 시간 / LLM 호출 수를 비교한다.
+--sweep을 주면 로컬 필터 기준값 조합별 일치율도 출력한다.
+
+--backend local(기본)은 로컬 스텁 서버를 띄워 하네스 동작만 확인한다 (스텁의 판정은 무작위라 일치율은 의미 없음).
+실제 일치율은 --backend openai로 측정한다.
+
+사용법:
+    python -m scripts.eval_relevance_filter --sweep
+    OPENAI_API_KEY=... python -m scripts.eval_relevance_filter --backend openai --diaries diaries.jsonl --output relevance.json
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+
+from utils.async_utils import run_sync
+from utils.llm_backend import LLMBackend
+from utils.llm_stub import StubProfile, StubServer
+from utils.perspective_manager import PerspectiveManager
+from utils.relevance import LLMRelevanceFilter, LocalRelevanceFilter
+from scripts.bench_fused import load_diaries
+
+GROUNDING_THRESHOLDS = (0.4, 0.5, 0.6, 0.7, 0.8)
+ALIGNMENT_THRESHOLDS = (0.0, 0.05, 0.1, 0.15, 0.2)
+
+
+def agreement_stats(reference: list, predicted: list) -> dict:
+    """LLM 판정(reference) 대비 로컬 필터(predicted)의 일치율, 정밀도, 재현율, kappa"""
+    reference, predicted = np.array(reference, dtype=bool), np.array(predicted, dtype=bool)
+    total = len(reference)
+    agreement = float((reference == predicted).mean()) if total else 0.0
+    true_positive = int((reference & predicted).sum())
+    # 두 판정이 우연히 일치할 확률을 뺀 일치도
+    expected = float(reference.mean() * predicted.mean() + (1 - reference.mean()) * (1 - predicted.mean())) if total else 0.0
+    return {
+        "points": total,
+        "agreement": agreement,
+        "precision": true_positive / predicted.sum() if predicted.sum() else 0.0,
+        "recall": true_positive / reference.sum() if reference.sum() else 0.0,
+        "kappa": (agreement - expected) / (1 - expected) if expected < 1 else 0.0,
+        "llm_relevant_rate": float(reference.mean()) if total else 0.0,
+        "local_relevant_rate": float(predicted.mean()) if total else 0.0,
+    }
+
+
+def collect(manager: PerspectiveManager, diaries: list, life_orientations: list) -> list:
+    """일기 x 관점마다 포인트를 발견하고 두 필터로 판정한 결과"""
+    llm_filter = LLMRelevanceFilter(manager.judgment_chain, manager.life_orientations, manager.judge_concurrency)
+    local_filter = LocalRelevanceFilter(manager.life_orientations)
+    cases = []
+    for diary, life_orientation in itertools.product(diaries, life_orientations):
+        discovery = run_sync(manager.discovery_chain.ainvoke({
+            "diary_entry": diary, "life_orientation": life_orientation, "value": ""
+        }))
+        points = discovery.points
+        if not points:
+            continue
+        start = time.perf_counter()
+        llm = run_sync(llm_filter.ajudge(diary, points, life_orientation))
+        llm_s = time.perf_counter() - start
+        start = time.perf_counter()
+        local = run_sync(local_filter.ajudge(diary, points, life_orientation))
+        local_s = time.perf_counter() - start
+        grounding, alignment = local_filter.score(diary, points, life_orientation)
+        cases.append({
+            "life_orientation": life_orientation,
+            "points": len(points),
+            "llm": [is_relevant for is_relevant, _ in llm],
+            "local": [is_relevant for is_relevant, _ in local],
+            "grounding": grounding.tolist(),
+            "alignment": alignment.tolist(),
+            "llm_s": llm_s,
+            "local_s": local_s,
+        })
+    return cases
+
+
+def sweep(cases: list, life_orientations: dict) -> list:
+    """로컬 필터 기준값 조합별 LLM 판정과의 일치도 (발견 / 판정을 다시 호출하지 않고 저장된 점수로 계산)"""
+    rows = []
+    for grounding_threshold, alignment_threshold in itertools.product(GROUNDING_THRESHOLDS, ALIGNMENT_THRESHOLDS):
+        local_filter = LocalRelevanceFilter(
+            life_orientations, grounding_threshold=grounding_threshold, alignment_threshold=alignment_threshold
+        )
+        reference, predicted = [], []
+        for case in cases:
+            reference += case["llm"]
+            predicted += local_filter.decide(np.array(case["grounding"]), np.array(case["alignment"])).tolist()
+        rows.append({"grounding": grounding_threshold, "alignment": alignment_threshold, **agreement_stats(reference, predicted)})
+    return sorted(rows, key=lambda row: row["kappa"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diaries", help="평가에 쓸 일기 JSONL 경로")
+    parser.add_argument("--life-orientations", help="쉼표로 구분한 관점 (기본: life_orientations.json의 전체)")
+    parser.add_argument("--backend", choices=("local", "openai"), default="local")
+    parser.add_argument("--sweep", action="store_true", help="로컬 필터 기준값 조합별 일치도 출력")
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    server = None
+    if args.backend == "local":
+        server = StubServer(StubProfile(latency={"dist": "lognormal", "median": 0.6, "sigma": 0.3}, tokens_per_second=0, seed=7), port=0).start()
+        backend = LLMBackend("", kind="local", base_url=server.base_url, anthropic_base_url=server.root_url)
+    else:
+        backend = LLMBackend(os.environ["OPENAI_API_KEY"])
+    manager = PerspectiveManager("", backend=backend, relevance_filter="llm")
+    life_orientations = args.life_orientations.split(",") if args.life_orientations else manager.get_life_orientations()
+
+    cases = collect(manager, load_diaries(args.diaries), life_orientations)
+    if server is not None:
+        server.stop()
+
+    summary = agreement_stats(
+        [is_relevant for case in cases for is_relevant in case["llm"]],
+        [is_relevant for case in cases for is_relevant in case["local"]]
+    )
+    llm_s = [case["llm_s"] for case in cases]
+    local_s = [case["local_s"] for case in cases]
+    summary.update({
+        "requests": len(cases),
+        "llm_calls_saved/request": statistics.mean(case["points"] for case in cases) if cases else 0.0,
+        "llm_judge_mean_s": statistics.mean(llm_s) if cases else 0.0,
+        "local_judge_mean_ms": statistics.mean(local_s) * 1000 if cases else 0.0,
+        "latency_saved_mean_s": statistics.mean(llm - local for llm, local in zip(llm_s, local_s)) if cases else 0.0,
+    })
+    for key, value in summary.items():
+        print(f"{key:>24}: {value:.3f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+    rows = sweep(cases, manager.life_orientations) if args.sweep else []
+    if rows:
+        print(f"\n{'grounding':>9} | {'alignment':>9} | {'agreement':>9} | {'kappa':>6} | {'precision':>9} | {'recall':>6}")
+        for row in rows[:10]:
+            print(
+                f"{row['grounding']:>9.2f} | {row['alignment']:>9.2f} | {row['agreement']:>9.1%} | "
+                f"{row['kappa']:>6.2f} | {row['precision']:>9.1%} | {row['recall']:>6.1%}"
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "sweep": rows, "cases": cases}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""OpenAI / Anthropic 호환 로컬 스텁 서버 실행
+
+네트워크 없이 파이프라인을 돌려 처리량과 꼬리 지연 시간을 측정할 때 사용한다.
+앱에서는 secrets의 [general]에 LLM_BACKEND = "local" (필요하면 LLM_BASE_URL)을 설정한다.
+Anthropic 호환 엔드포인트(/v1/messages)도 함께 열리므로, 지연 분포가 다른 서버 두 개를 띄우고
+LLM_PROVIDERS = "openai,anthropic", ANTHROPIC_BASE_URL로 나눠 연결하면 헤징을 시험할 수 있다.
+
+사용법:
+    python -m scripts.llm_stub_server --port 8765 --latency lognormal:0.4:0.5 --tokens-per-second 80 --error-rate 0.02
+    python -m scripts.llm_stub_server --config stub_profile.json
+
+stub_profile.json은 StubProfile의 인자를 담은 JSON이다. 예:
+    {"latency": {"dist": "uniform", "low": 0.2, "high": 1.0}, "tokens_per_second": 60, "timeout_rate": 0.01}
+"""
+import argparse
+import json
+
+from utils.llm_stub import StubProfile, StubServer
+
+
+def parse_latency(spec):
+    """fixed:<초>, uniform:<최소>:<최대>, lognormal:<중앙값>:<시그마> 형식의 지연 시간 분포"""
+    dist, *params = spec.split(":")
+    params = [float(param) for param in params]
+    if dist == "fixed":
+        return {"dist": dist, "seconds": params[0]}
+    if dist == "uniform":
+        return {"dist": dist, "low": params[0], "high": params[1]}
+    if dist == "lognormal":
+        return {"dist": dist, "median": params[0], "sigma": params[1]}
+    raise argparse.ArgumentTypeError(f"지원하지 않는 지연 시간 분포입니다: {spec}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", help="StubProfile JSON 경로 (지정하면 아래 옵션은 무시)")
+    parser.add_argument("--latency", type=parse_latency, default="lognormal:0.4:0.5", help="첫 토큰까지의 지연 시간 분포")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/500/503 오류 응답 비율")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="응답하지 않는 요청 비율")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="형식 지시문만 보고 만든 JSON이 스키마에서 벗어나는 비율")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            profile = StubProfile.from_dict(json.load(f))
+    else:
+        profile = StubProfile(
+            latency=args.latency,
+            tokens_per_second=args.tokens_per_second,
+            error_rate=args.error_rate,
+            timeout_rate=args.timeout_rate,
+            malformed_rate=args.malformed_rate,
+            seed=args.seed
+        )
+    server = StubServer(profile, host=args.host, port=args.port)
+    print(f"► 스텁 서버 실행 중: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
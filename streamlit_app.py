@@ -1,12 +1,14 @@
 import streamlit as st
-import openai  # OpenAI API 사용
-import anthropic
-import firebase_admin
-from firebase_admin import credentials, firestore
 from streamlit_extras.let_it_rain import rain
 from streamlit_extras.stylable_container import stylable_container
-from utils.api_client import DiaryAnalyzer
+from utils.analyzer_loader import AnalyzerLoader  # langchain, openai는 로더 스레드에서 불러옴
+from utils.response_cache import ResponseCache
+from utils.request_context import request_scope
+from utils.tracing import tracer, span
+from utils.write_behind import WriteBehindQueue
+from utils.storage import create_storage
 from datetime import datetime
+import itertools
 from zoneinfo import ZoneInfo
 
 # 한국시간 설정
@@ -24,30 +26,56 @@ def load_css(filename):
         st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 load_css('style.css')
 
-# Firebase 초기화
-if not firebase_admin._apps:
-    firebase_config = {
-        "type": st.secrets["firebase"]["type"],
-        "project_id": st.secrets["firebase"]["project_id"],
-        "private_key_id": st.secrets["firebase"]["private_key_id"],
-        "private_key": st.secrets["firebase"]["private_key"],
-        "client_email": st.secrets["firebase"]["client_email"],
-        "client_id": st.secrets["firebase"]["client_id"],
-        "auth_uri": st.secrets["firebase"]["auth_uri"],
-        "token_uri": st.secrets["firebase"]["token_uri"],
-    }
-    cred = credentials.Certificate(firebase_config)
-    firebase_admin.initialize_app(cred)
-
-db = firestore.client()  # Firestore 클라이언트
+# 단계별 span 기록 설정 (TRACE_JSONL: span을 한 줄씩 기록할 경로, METRICS_PATH: Prometheus 텍스트 파일 경로)
+if st.secrets["general"].get("TRACE_JSONL"):
+    tracer.configure(jsonl_path=st.secrets["general"]["TRACE_JSONL"])
+METRICS_PATH = st.secrets["general"].get("METRICS_PATH")
+
+# 요청 한 번에 만들 결과 후보 수 (2 이상이면 가장 좋은 후보를 보여 주고 "다른 결과 보기"는 나머지 후보에서 바로 제공)
+CANDIDATES = int(st.secrets["general"].get("CANDIDATES", 1))
+
+# 저장소 설정 (firestore 또는 sqlite, sqlite는 Firebase 없이 로컬에서 실행)
+STORAGE_BACKEND = st.secrets["general"].get("STORAGE_BACKEND", "firestore")
+
+# 저장소 생성 (프로세스당 하나)
+@st.cache_resource
+def get_storage():
+    if STORAGE_BACKEND != "firestore":
+        return create_storage(STORAGE_BACKEND)
+
+    # Firebase 초기화
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    if not firebase_admin._apps:
+        firebase_config = {
+            "type": st.secrets["firebase"]["type"],
+            "project_id": st.secrets["firebase"]["project_id"],
+            "private_key_id": st.secrets["firebase"]["private_key_id"],
+            "private_key": st.secrets["firebase"]["private_key"],
+            "client_email": st.secrets["firebase"]["client_email"],
+            "client_id": st.secrets["firebase"]["client_id"],
+            "auth_uri": st.secrets["firebase"]["auth_uri"],
+            "token_uri": st.secrets["firebase"]["token_uri"],
+        }
+        cred = credentials.Certificate(firebase_config)
+        firebase_admin.initialize_app(cred)
+    return create_storage("firestore", db=firestore.client())  # Firestore 클라이언트
+
+storage = get_storage()
+
+# 쓰기 큐 (로컬 스풀에 먼저 저장하고 백그라운드에서 저장소에 일괄 기록, 프로세스당 하나)
+@st.cache_resource
+def get_write_queue():
+    return WriteBehindQueue(storage)
+
+write_queue = get_write_queue()
 
 # 로그인 처리 (유저 정보 로드)
 def handle_login(user_id, password):
-    # Firestore에서 사용자 문서 가져오기
-    user_doc = db.collection("users").document(user_id).get()
-    # 사용자 문서가 존재하는지 확인
-    if user_doc.exists:
-        user_data = user_doc.to_dict()
+    # 저장소에서 사용자 정보 가져오기
+    user_data = storage.get_user(user_id)
+    # 사용자 정보가 존재하는지 확인
+    if user_data is not None:
         # 비밀번호 검증
         if "password" in user_data and user_data["password"] == password:
             # 로그인 성공 처리
@@ -67,21 +95,11 @@ def start_session_with_log(user_id):
     # 고유한 세션 ID 생성
     session_id = f"{user_id}_{datetime.now(kst).strftime('%Y%m%d%H%M%S')}"
 
-    # Firestore 참조
-    logs_ref = db.collection("users").document(user_id).collection("logs").document(session_id)
-    api_responses_ref = db.collection("users").document(user_id).collection("api_responses").document(session_id)
+    # 세션 logs 초기화 (end_time은 null, 활동 배열은 빈 배열로 초기화)
+    write_queue.submit("start_session", user_id=user_id, session_id=session_id, start_time=datetime.now(kst))
 
-    # 세션 logs 초기화
-    logs_ref.set({
-        "start_time": datetime.now(kst),
-        "end_time": None,  # 초기값 null
-        "activities": []   # 활동 배열 초기화
-    })
-
-    # 세션 api_responses 초기화
-    api_responses_ref.set({
-        "responses": []  # 빈 배열로 초기화
-    })
+    # 세션 api_responses 초기화 (응답은 responses 하위 컬렉션에 하나씩 저장)
+    write_queue.submit("start_api_responses", user_id=user_id, session_id=session_id, start_time=datetime.now(kst))
 
     # 로그인 활동 기록 추가
     log_activity(user_id, session_id, "Logged in")
@@ -150,62 +168,71 @@ def save_to_firebase(user_id: str, session_id: str, entry: str, entry_type: str,
         # 현재 시간 기록
         timestamp = datetime.now(kst).isoformat()
         
-        # Firestore 컬렉션 참조
-        doc_ref = db.collection("users").document(user_id).collection(entry_type).document(f'{session_id}_{doc_counter}')
-        # 데이터 저장
-        doc_ref.set({
-            'entry' : entry,
-            'timestamp' : timestamp
-        })
+        # 쓰기 큐에 저장 의도 추가 (즉시 반환, 기록은 백그라운드에서 처리)
+        write_queue.submit(
+            "save_entry",
+            user_id=user_id,
+            session_id=session_id,
+            entry_type=entry_type,
+            doc_counter=doc_counter,
+            entry=entry,
+            timestamp=timestamp
+        )
     except Exception as e:
         st.error(f"Firebase 저장 중 오류 발생: {e}")
 
 
+# API 응답 도큐먼트 카운터 (응답마다 1씩 증가)
+def next_response_counter():
+    st.session_state["response_counter"] = st.session_state.get("response_counter", 0) + 1
+    return st.session_state["response_counter"]
+
+# 저장할 API 응답 문서 구성
+def build_api_response(diary_entry: str, result: str, life_orientation: str, tone: str, request_record: dict = None): #value 제외
+    return {
+        'life_orientation': life_orientation,  # 사용자가 선택한 삶의 태도
+        #'value': value,                 # 선택된 가치
+        'tone': tone,                   # 선택된 어조
+        'input_entry': diary_entry,     # 입력으로 사용된 일기
+        'result': result,               # AI 일기 생성 결과
+        'cache': (request_record or {}).get("cache", {}),  # 단계별 캐시 적중 여부
+        'tokens': (request_record or {}).get("tokens", {}),  # 단계별 토큰 사용량
+        'scheduler': (request_record or {}).get("scheduler", {}),  # 호출 한도 대기 시간, 재시도 횟수
+        'pipeline': (request_record or {}).get("pipeline", {}),  # 단계 재개 / 재시도 / 대체 여부, 낭비된 토큰
+        'timestamp': datetime.now(kst).isoformat()  # 저장 시간
+    }
+
 # API 요청 및 응답 정보 저장
-def save_api_response(user_id: str, session_id: str, diary_entry: str, result: str, life_orientation: str, tone: str, doc_counter: int): #value 제외
-    # 현재 시간 기록
-    timestamp = datetime.now(kst).isoformat()
-
-    # Firestore 컬렉션 참조
-    session_ref = db.collection("users").document(user_id).collection("api_responses").document(session_id)
-
-    session_doc = session_ref.get()
-    if session_doc.exists:
-        responses = session_doc.to_dict().get("responses", [])
-
-        # 데이터 저장
-        responses.append({
-            'life_orientation': life_orientation,  # 사용자가 선택한 삶의 태도
-            #'value': value,                 # 선택된 가치
-            'tone': tone,                   # 선택된 어조
-            'input_entry': diary_entry,     # 입력으로 사용된 일기
-            'result': result,               # AI 일기 생성 결과
-            'timestamp': timestamp          # 저장 시간
-        })
-        session_ref.update({"responses": responses})
-        print(f"► API 응답 저장 완료: {session_ref.id}")
-    else:
-        print(f"► API 요청 및 응답 정보 저장 중 오류 발생")
+def save_api_response(user_id: str, session_id: str, diary_entry: str, result: str, life_orientation: str, tone: str, doc_counter: int, request_record: dict = None): #value 제외
+    # 응답 하나를 doc_counter 기반 개별 문서로 저장 (쓰기 큐를 통해 백그라운드에서 기록)
+    try:
+        write_queue.submit(
+            "save_api_response", user_id=user_id, session_id=session_id, doc_counter=doc_counter,
+            response=build_api_response(diary_entry, result, life_orientation, tone, request_record)
+        )
+        print(f"► API 응답 저장 요청: {session_id}/{doc_counter}")
+    except Exception as e:
+        print(f"► API 요청 및 응답 정보 저장 중 오류 발생: {e}")
+
+# 관점 비교 결과를 한 번에 저장 (관점마다 개별 문서, 쓰기 의도는 하나로 묶어 함께 기록)
+def save_api_responses(user_id: str, session_id: str, diary_entry: str, results: dict, tone: str, request_records: dict):
+    try:
+        responses = [
+            {
+                "doc_counter": next_response_counter(),
+                "response": build_api_response(diary_entry, result, life_orientation, tone, request_records.get(life_orientation)),
+            }
+            for life_orientation, result in results.items()
+        ]
+        write_queue.submit("save_api_responses", user_id=user_id, session_id=session_id, responses=responses)
+        print(f"► API 응답 {len(responses)}건 저장 요청: {session_id}/{[item['doc_counter'] for item in responses]}")
+    except Exception as e:
+        print(f"► API 요청 및 응답 정보 저장 중 오류 발생: {e}")
 
 # 활동 기록 함수
 def log_activity(user_id, session_id, activity):
-    # Firestore에서 세션 문서 참조
-    session_ref = db.collection("users").document(user_id).collection("logs").document(session_id)
-
-    # 세션 데이터 가져오기
-    session_doc = session_ref.get()
-    if session_doc.exists:
-        activities = session_doc.to_dict().get("activities", [])
-        
-        # 활동 추가
-        activities.append({
-            "activity": activity,
-            "timestamp": datetime.now(kst)
-        })
-        session_ref.update({"activities": activities})
-        print(f"► Activity '{activity}' logged for session {session_id}.")
-    else:
-        print(f"► Session {session_id} does not exist for user {user_id}.")
+    # 읽기 없이 쓰기 큐에 추가만 하고 즉시 반환 (기록은 백그라운드에서 ArrayUnion으로 일괄 처리)
+    write_queue.submit("append_activity", user_id=user_id, session_id=session_id, activity=activity, timestamp=datetime.now(kst))
 
 # textarea 콜백 함수
 def handle_entry_interaction():
@@ -263,50 +290,143 @@ def handle_api_request(spinner_container):
 
     # API 호출 및 결과 저장
     with spinner_container.container():
-        with st.spinner("일기를 읽고 있어요. 잠시만 기다려 주세요..."):
-            try:
-                result = analyzer.augment_diary_v2(
-                    diary_entry=diary_entry,
-                    life_orientation=life_orientation,
-                    #value=value,
-                    tone=tone,
-                    method="perspective"
-                )
-                # 결과를 세션 상태에 저장
-                st.session_state["analysis_result"] = result
-                st.session_state["result_life_orientation"] = life_orientation
-                #st.session_state["result_value"] = value
-                st.session_state["result_tone"] = tone
-                st.session_state["show_update_entry_button"] = True
-                st.session_state['show_rain'] = True
-
-                # 도큐먼트 카운터 기본값 설정
-                if "response_counter" not in st.session_state:
-                    st.session_state["response_counter"] = 1
+        try:
+            # 요청 단위 기록 (단계별 캐시 적중 여부 등)
+            with request_scope(user_id=user_id, session_id=session_id) as request_record, \
+                    span("request", method="perspective", life_orientation=life_orientation, tone=tone):
+                if CANDIDATES > 1:
+                    # 후보 여러 개를 한 번에 만들고 랭커 점수가 가장 높은 후보를 표시
+                    with st.spinner("일기를 읽고 있어요. 잠시만 기다려 주세요..."):
+                        candidates = analyzer.generate_candidates(
+                            diary_entry=diary_entry,
+                            life_orientation=life_orientation,
+                            tone=tone,
+                            n=CANDIDATES,
+                            use_cache=not st.session_state.get("fresh_take", False)  # 새 결과 요청 시 캐시 건너뛰기
+                        )
+                    result = candidates[0]
+                    st.session_state["candidates"] = candidates
+                    st.session_state["shown_candidates"] = [result]
                 else:
-                    st.session_state["response_counter"] += 1
-                doc_counter = st.session_state["response_counter"]
+                    stream = analyzer.stream_diary_v2(
+                        diary_entry=diary_entry,
+                        life_orientation=life_orientation,
+                        #value=value,
+                        tone=tone,
+                        method="perspective",
+                        use_cache=not st.session_state.get("fresh_take", False)  # 새 결과 요청 시 캐시 건너뛰기
+                    )
+                    # 앞 단계(발견, 증강)가 끝나고 첫 조각이 올 때까지 스피너 표시
+                    with st.spinner("일기를 읽고 있어요. 잠시만 기다려 주세요..."):
+                        first_chunk = next(stream, "")
+                    # 마지막 단계의 결과를 생성되는 대로 표시
+                    result = st.write_stream(itertools.chain([first_chunk], stream))
+            if METRICS_PATH:
+                tracer.write_prometheus(METRICS_PATH)
+
+            # 결과를 세션 상태에 저장
+            st.session_state["analysis_result"] = result
+            st.session_state["result_life_orientation"] = life_orientation
+            #st.session_state["result_value"] = value
+            st.session_state["result_tone"] = tone
+            st.session_state["show_update_entry_button"] = True
+            st.session_state['show_rain'] = True
+
+            # Firestore에 API 결과와 선택 옵션 저장
+            save_api_response(user_id, session_id, diary_entry, result, life_orientation, tone, next_response_counter(), request_record) #value 제외
+
+        except Exception as e:
+            st.error(f"API 요청 중 오류 발생: {e}")
+
+# 관점 비교 요청 콜백 함수: 선택한 관점들을 동시에 생성해 관점별 탭에 생성되는 대로 표시
+def handle_compare_request(spinner_container):
+    st.session_state.expander_state = False
+
+    diary_entry = st.session_state.get("diary_entry")
+    life_orientations = st.session_state.get("compare_life_orientations") or []
+    tone = st.session_state.get("tone")
+    if not all([diary_entry, life_orientations, tone]):
+        st.toast("아직 작성된 내용이 없어요.일기를 쓰고 원하는 옵션을 선택하시면 새로운 관점을 찾아드릴게요.", icon=':material/error:')
+        return
 
-                # Firestore에 API 결과와 선택 옵션 저장
-                save_api_response(user_id, session_id, diary_entry, result, life_orientation, tone, doc_counter) #value 제외
+    user_id = st.session_state.get("user_id")
+    session_id = st.session_state.get("session_id")
+    if 'initial_entry' not in st.session_state:
+        st.session_state['initial_entry'] = diary_entry
+        upload_initial_diary(user_id, diary_entry)
+    log_activity(user_id, session_id, f"Requested AI comparison ({', '.join(life_orientations)})")
 
-            except Exception as e:
-                st.error(f"API 요청 중 오류 발생: {e}")
+    with spinner_container.container():
+        try:
+            results = {life_orientation: "" for life_orientation in life_orientations}
+            tabs = st.tabs([life_orientation_map_v2[life_orientation] for life_orientation in life_orientations])
+            placeholders = {life_orientation: tab.empty() for life_orientation, tab in zip(life_orientations, tabs)}
+            with request_scope(user_id=user_id, session_id=session_id) as request_record, \
+                    span("request", method="compare", tone=tone):
+                with st.spinner("여러 관점으로 일기를 읽고 있어요. 잠시만 기다려 주세요..."):
+                    for life_orientation, chunk in analyzer.compare_perspectives(
+                        diary_entry=diary_entry,
+                        life_orientations=life_orientations,
+                        tone=tone,
+                        use_cache=not st.session_state.get("fresh_take", False)
+                    ):
+                        results[life_orientation] += chunk
+                        placeholders[life_orientation].markdown(results[life_orientation])
+            if METRICS_PATH:
+                tracer.write_prometheus(METRICS_PATH)
+
+            records = request_record["children"]
+            failed = [life_orientation for life_orientation in life_orientations if records.get(life_orientation, {}).get("error")]
+            results = {life_orientation: result for life_orientation, result in results.items() if result and life_orientation not in failed}
+            if failed:
+                st.toast(f"일부 관점을 가져오지 못했어요: {', '.join(life_orientation_map_v2[o] for o in failed)}", icon=":material/error:")
+            if not results:
+                return
+
+            st.session_state["compare_results"] = results
+            st.session_state["result_tone"] = tone
+            st.session_state["analysis_result"] = None
+            st.session_state['show_rain'] = True
+
+            # 관점별 결과를 한 번에 저장
+            save_api_responses(user_id, session_id, diary_entry, results, tone, records)
+
+        except Exception as e:
+            st.error(f"API 요청 중 오류 발생: {e}")
+
+# 다른 결과 보기 버튼 핸들: 남은 후보 중 이미 보여 준 결과와 가장 다른 후보를 LLM 호출 없이 표시
+def handle_try_another():
+    user_id = st.session_state.get("user_id")
+    session_id = st.session_state.get("session_id")
+    diary_entry = st.session_state.get("diary_entry")
+    shown = st.session_state.get("shown_candidates", [])
+    result = analyzer.ranker.best(st.session_state.get("candidates", []), diary_entry, shown)
+    if result is None:
+        st.toast("준비된 결과를 모두 보여 드렸어요. 새로운 관점을 다시 요청해 보세요.", icon=":material/info:")
+        return
+    st.session_state["shown_candidates"] = shown + [result]
+    st.session_state["analysis_result"] = result
+    log_activity(user_id, session_id, "Tried another candidate")
+    # 추가 LLM 호출이 없으므로 요청 기록 없이 결과만 저장
+    save_api_response(
+        user_id, session_id, diary_entry, result,
+        st.session_state["result_life_orientation"], st.session_state["result_tone"], next_response_counter()
+    )
 
 # 탭 확장 여부 함수
 def toggle_expander_state():
     st.session_state.expander_state = False  # 상태 토글
 
 # 가져오기 버튼 핸들
-def handle_entry_update():
+def handle_entry_update(result=None):
     """
     "내 일기에 담기" 버튼 클릭 시 실행되는 콜백 함수.
-    - 분석 결과를 일기 입력 필드에 저장.
+    - 분석 결과(관점 비교에서는 선택한 탭의 결과)를 일기 입력 필드에 저장.
     - 활동 로그 기록.
     """
     try:
         # 분석 결과를 Textarea 상태에 반영
-        st.session_state.diary_entry = st.session_state.get('analysis_result')
+        st.session_state.diary_entry = result or st.session_state.get('analysis_result')
 
         # 활동 로그 기록
         log_activity(
@@ -356,6 +476,34 @@ def initialize_openai_api():
     api_key_claude = st.secrets["general"]["ANTHROPIC_API_KEY"]
     return api_key_gpt, api_key_claude
 
+# API 클라이언트 초기화 (서버 시작 직후 백그라운드에서 미리 준비, 프로세스당 하나)
+@st.cache_resource
+def get_analyzer_loader():
+    api_key_gpt, api_key_claude = initialize_openai_api()  # Retrieve the API keys
+    return AnalyzerLoader(
+        api_key_gpt, api_key_claude,  # 설정된 API 키 사용
+        llm_backend_kind=st.secrets["general"].get("LLM_BACKEND", "openai"),  # local이면 로컬 스텁 서버 사용
+        llm_base_url=st.secrets["general"].get("LLM_BASE_URL"),
+        # "openai,anthropic"이면 느린 요청을 Anthropic으로 헤징 (앞에 둔 제공자가 기본 1순위)
+        llm_providers=st.secrets["general"].get("LLM_PROVIDERS", "openai").split(","),
+        anthropic_base_url=st.secrets["general"].get("ANTHROPIC_BASE_URL"),
+        hedge_percentile=st.secrets["general"].get("HEDGE_PERCENTILE", 0.9),
+        # 프로세스 전체 LLM 호출 한도 (설정하지 않은 값은 무제한)
+        rate_limits={
+            provider: {
+                "rpm": st.secrets["general"].get(f"{provider.upper()}_RPM"),
+                "tpm": st.secrets["general"].get(f"{provider.upper()}_TPM"),
+            }
+            for provider in ("openai", "anthropic")
+        },
+        # 제공자 고유 구조화 출력 사용 (false면 형식 지시문 + 텍스트 파서)
+        structured_output=st.secrets["general"].get("STRUCTURED_OUTPUT", True),
+        cache=ResponseCache(),
+        prefetch_discovery=st.secrets["general"].get("PREFETCH_DISCOVERY", False)  # 발견 단계 선실행 (opt-in)
+    )
+
+analyzer_loader = get_analyzer_loader()
+
 ## -------------------------------------------------------------------------------------------------
 ## Not logged in -----------------------------------------------------------------------------------
 ## -------------------------------------------------------------------------------------------------
@@ -379,13 +527,12 @@ else:
         st.session_state["show_welcome_message"] = False  # 메시지 표시 후 플래그 비활성화
         print("► 세션: "+st.session_state["session_id"])
 
-    # API 클라이언트 초기화
-    @st.cache_resource
-    def get_analyzer():
-        api_key_gpt, api_key_claude = initialize_openai_api()  # Retrieve the API keys
-        return DiaryAnalyzer(api_key_gpt, api_key_claude)  # 설정된 API 키 사용
-
-    analyzer = get_analyzer()
+    # API 클라이언트 (백그라운드 준비가 아직 끝나지 않았으면 기다림)
+    if not analyzer_loader.ready():
+        with st.spinner("준비 중이에요..."):
+            analyzer = analyzer_loader.get()
+    else:
+        analyzer = analyzer_loader.get()
     
     if st.session_state.get("save_success", False):
         rain(
@@ -491,7 +638,19 @@ else:
         selector = st.expander("See this day a little differently", icon="🔮", expanded=st.session_state.get("expander_state", True))  # 세션 상태 사용
         # 옵션 선택 섹션 - life_orientation
         selector.text("How would you like to view this day?")
-        life_orientation = selector.pills(
+        # 관점 비교: 여러 관점을 한 번에 생성해 탭으로 나란히 보기
+        compare_mode = selector.toggle("Compare perspectives", key="compare_mode")
+        if compare_mode:
+            selector.pills(
+                "Life-orientations",
+                options=list(life_orientation_map_v2.keys()),
+                format_func=lambda option: life_orientation_map_v2[option],
+                selection_mode="multi",
+                default=list(life_orientation_map_v2.keys()),
+                key="compare_life_orientations",
+                label_visibility="collapsed"
+            )
+        life_orientation = None if compare_mode else selector.pills(
             "Life-orientation", 
             options=life_orientation_map_v2.keys(), 
             format_func=lambda option: life_orientation_map_v2[option], 
@@ -499,6 +658,14 @@ else:
         ) or None
         if life_orientation:
             st.session_state["life_orientation"] = life_orientation
+        # 일기와 관점이 정해지면 톤 선택 전에 발견 단계를 미리 실행 (입력이 바뀌면 이전 선실행은 대체됨)
+        # 이번 실행에서 고른 관점만 사용: 관점 비교 모드이거나 선택을 해제하면 None이라 선실행이 취소됨
+        # (session_state의 관점은 마지막으로 골랐던 값이 남아 있어 쓰지 않음)
+        analyzer.prefetch_discovery(
+            st.session_state["session_id"],
+            st.session_state.get("diary_entry", ""),
+            life_orientation
+        )
         # 옵션 선택 섹션 - value
         #selector.text("나에게 소중한 가치는")
         #value = selector.pills(
@@ -520,6 +687,9 @@ else:
         if tone:
             st.session_state["tone"] = tone
 
+        # 같은 입력이어도 캐시된 결과 대신 새 결과 받기
+        selector.toggle("Give me a fresh take", key="fresh_take")
+
         if 'analysis_result' not in st.session_state:
             st.session_state.analysis_result = None
         
@@ -533,24 +703,39 @@ else:
 
             # 결과 요청 버튼
             st.button(
-                "🪄 Get a New Perspective", 
+                "🪄 Compare Perspectives" if compare_mode else "🪄 Get a New Perspective", 
                 type='secondary', 
                 use_container_width=True, 
                 disabled=st.session_state.get("button_disabled", True),
-                on_click=handle_api_request,
+                on_click=handle_compare_request if compare_mode else handle_api_request,
                 args=(spinner_container,), # spinner_container를 인자로 전달
             )
 
         # 결과를 입력 필드에 적용하는 버튼 추가
-        if st.session_state.get('show_update_entry_button', False):  # 버튼 표시 플래그 확인
+        if not compare_mode and st.session_state.get('show_update_entry_button', False):  # 버튼 표시 플래그 확인
             st.button("Replace My Diary", icon=':material/north_west:', type='secondary', on_click=handle_entry_update)
+            # 남은 후보가 있으면 다른 결과 보기
+            if len(st.session_state.get("shown_candidates", [])) < len(st.session_state.get("candidates", [])):
+                st.button("Try Another", icon=':material/autorenew:', type='secondary', on_click=handle_try_another)
 
         if st.session_state.get('show_rain'):
             rain(emoji="🍀", font_size=36, falling_speed=10, animation_length="1",)
             st.session_state.show_rain = False
 
+        # 관점 비교 결과가 있다면 관점별 탭으로 표시
+        if compare_mode and st.session_state.get("compare_results"):
+            compare_results = st.session_state["compare_results"]
+            with result_container.container(height=400, border=None):
+                tabs = st.tabs([life_orientation_map_v2[option] for option in compare_results])
+                for tab, (option, result) in zip(tabs, compare_results.items()):
+                    with tab:
+                        st.markdown(f":violet[_#{life_orientation_map_v2[option]}  #{tone_map_v2[st.session_state.result_tone]}_]")
+                        st.write(result)
+                        st.button("Replace My Diary", key=f"replace_{option}", icon=':material/north_west:', type='secondary',
+                                  on_click=handle_entry_update, args=(result,))
+
         # 결과가 있다면 항상 표시
-        if st.session_state.analysis_result:
+        elif st.session_state.analysis_result:
             with result_container.container(height=400, border=None):
                 # 안내 메시지
                 with stylable_container(
@@ -0,0 +1,72 @@
+import asyncio
+import gc
+
+from utils.prefetch import DiscoveryPrefetcher
+
+
+def _prefetcher(calls, **kwargs):
+    async def discover(diary_entry, life_orientation):
+        calls.append((diary_entry, life_orientation))
+        return f"{life_orientation}:{diary_entry}"
+    return DiscoveryPrefetcher(discover, idle_delay=0, **kwargs)
+
+
+def test_claim_keeps_only_consumed_marker():
+    """가져간 뒤에는 결과를 놓고, 같은 입력으로 다시 예약해도 다시 실행하지 않음"""
+    calls = []
+
+    async def scenario():
+        prefetcher = _prefetcher(calls)
+        await prefetcher._aschedule("s1", "diary", "optimistic")
+        await asyncio.sleep(0.01)
+        assert await prefetcher.claim("s2", "diary", "optimistic") is None  # 다른 세션은 가져갈 수 없음
+        result = await prefetcher.claim("s1", "diary", "optimistic")
+        assert prefetcher._by_owner["s1"][1] is None
+        await prefetcher._aschedule("s1", "diary", "optimistic")
+        await asyncio.sleep(0.01)
+        return result, await prefetcher.claim("s1", "diary", "optimistic")
+
+    assert asyncio.run(scenario()) == ("optimistic:diary", None)
+    assert len(calls) == 1
+
+
+def test_owners_are_bounded():
+    async def scenario():
+        prefetcher = _prefetcher([], max_owners=3)
+        for owner in range(10):
+            await prefetcher._aschedule(f"s{owner}", "diary", "optimistic")
+        await asyncio.sleep(0.01)
+        return list(prefetcher._by_owner)
+
+    assert asyncio.run(scenario()) == ["s7", "s8", "s9"]
+
+
+def test_idle_owners_expire():
+    async def scenario():
+        prefetcher = _prefetcher([], idle_ttl=0.05)
+        await prefetcher._aschedule("old", "diary", "optimistic")
+        await asyncio.sleep(0.1)
+        await prefetcher._aschedule("new", "diary", "optimistic")
+        return list(prefetcher._by_owner)
+
+    assert asyncio.run(scenario()) == ["new"]
+
+
+def test_unclaimed_failure_is_retrieved(capsys):
+    async def failing(diary_entry, life_orientation):
+        raise RuntimeError("discover failed")
+
+    async def scenario():
+        prefetcher = DiscoveryPrefetcher(failing, idle_delay=0)
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda _, context: errors.append(context))
+        await prefetcher._aschedule("s1", "diary", "optimistic")
+        await asyncio.sleep(0.01)
+        # 가져가지 않은 채 항목이 지워져도 경고 없음
+        prefetcher._by_owner.clear()
+        gc.collect()
+        return errors
+
+    assert asyncio.run(scenario()) == []
+    assert "discover failed" in capsys.readouterr().out
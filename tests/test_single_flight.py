@@ -0,0 +1,69 @@
+import asyncio
+
+from utils.single_flight import SingleFlight
+
+
+async def _slow(value, delay=0.05):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _slow_stream(values, delay=0.01):
+    for value in values:
+        await asyncio.sleep(delay)
+        yield value
+
+
+def test_do_after_last_waiter_cancelled_starts_new_call():
+    """마지막 호출자가 취소된 직후 같은 키로 온 요청은 취소된 실행에 합류하지 않고 새로 실행"""
+    async def scenario():
+        flight = SingleFlight("test")
+        first = asyncio.ensure_future(flight.do("k", lambda: _slow("old")))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)  # 첫 호출자의 finally가 실행을 취소
+        # 취소된 실행의 done 콜백이 돌기 전에 바로 다시 요청
+        return await flight.do("k", lambda: _slow("new")), flight.in_flight()
+
+    assert asyncio.run(scenario()) == ("new", 0)
+
+
+def test_do_joins_call_in_flight():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        return await _slow("shared")
+
+    async def scenario():
+        flight = SingleFlight("test")
+        return await asyncio.gather(flight.do("k", factory), flight.do("k", factory))
+
+    assert asyncio.run(scenario()) == ["shared", "shared"]
+    assert len(calls) == 1
+
+
+def test_stream_after_last_subscriber_left_starts_new_stream():
+    """마지막 구독자가 떠난 직후 같은 키로 온 스트림은 취소된 스트림에 합류하지 않고 새로 시작"""
+    async def scenario():
+        flight = SingleFlight("test")
+        stream = flight.stream("k", lambda: _slow_stream(["a", "b", "c"]))
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        # _pump의 finally가 돌기 전에 바로 다시 구독
+        return [chunk async for chunk in flight.stream("k", lambda: _slow_stream(["x", "y"]))]
+
+    assert asyncio.run(scenario()) == ["x", "y"]
+
+
+def test_stream_late_subscriber_replays_chunks():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def collect(delay):
+            await asyncio.sleep(delay)
+            return [chunk async for chunk in flight.stream("k", lambda: _slow_stream(["a", "b", "c"]))]
+
+        return await asyncio.gather(collect(0), collect(0.015))
+
+    assert asyncio.run(scenario()) == [["a", "b", "c"], ["a", "b", "c"]]
@@ -0,0 +1,69 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional, Sequence
+
+
+class AnalyzerLoader:
+    """DiaryAnalyzer를 백그라운드 스레드에서 미리 만들어 두는 로더
+
+    langchain, openai 등 무거운 모듈은 이 스레드 안에서 처음 불러오므로, 로그인 화면은
+    이 모듈들을 기다리지 않고 바로 그려진다. 증강이 필요한 시점에 get()으로 완성된 객체를 받는다.
+    """
+
+    def __init__(self, api_key_gpt: str, api_key_claude: str, llm_backend_kind: str = "openai",
+                 llm_base_url: Optional[str] = None, llm_providers: Sequence[str] = ("openai",),
+                 anthropic_base_url: Optional[str] = None, hedge_percentile: float = 0.9,
+                 rate_limits: Optional[Dict[str, Dict[str, float]]] = None, structured_output: bool = True,
+                 **analyzer_kwargs):
+        self._args = (api_key_gpt, api_key_claude, llm_backend_kind, llm_base_url)
+        self._provider_args = (tuple(llm_providers), anthropic_base_url, hedge_percentile)
+        self._rate_limits = rate_limits  # 제공자별 RPM / TPM 한도 (None이면 무제한)
+        self._structured_output = structured_output  # False면 형식 지시문 + 텍스트 파서만 사용
+        self._kwargs = analyzer_kwargs  # DiaryAnalyzer의 나머지 인자 (cache, prefetch_discovery 등)
+        self._future: Future = Future()
+        self.timings: Dict[str, float] = {}  # 단계별 소요 시간(초)
+        self._thread = threading.Thread(target=self._load, name="analyzer-loader", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        api_key_gpt, api_key_claude, llm_backend_kind, llm_base_url = self._args
+        try:
+            start = time.perf_counter()
+            from .api_client import DiaryAnalyzer
+            from .llm_backend import LLMBackend
+            from .provider_router import ProviderRouter
+            from .scheduler import scheduler
+            self.timings["import_s"] = time.perf_counter() - start
+
+            if self._rate_limits:
+                scheduler.configure(self._rate_limits)
+
+            start = time.perf_counter()
+            llm_providers, anthropic_base_url, hedge_percentile = self._provider_args
+            analyzer = DiaryAnalyzer(
+                api_key_gpt, api_key_claude,
+                llm_backend=LLMBackend(
+                    api_key_gpt, kind=llm_backend_kind, base_url=llm_base_url,
+                    providers=llm_providers,
+                    anthropic_api_key=api_key_claude,
+                    anthropic_base_url=anthropic_base_url,
+                    router=ProviderRouter(hedge_percentile=hedge_percentile),
+                    structured_output=self._structured_output
+                ),
+                **self._kwargs
+            )
+            self.timings["construct_s"] = time.perf_counter() - start
+            print(f"► 분석기 준비 완료 (import {self.timings['import_s']:.2f}s, 생성 {self.timings['construct_s']:.2f}s)")
+            self._future.set_result(analyzer)
+        except BaseException as e:
+            print(f"► 분석기 준비 중 오류 발생: {e}")
+            self._future.set_exception(e)
+
+    def ready(self) -> bool:
+        """준비가 끝났는지 여부 (실패한 경우도 True)"""
+        return self._future.done()
+
+    def get(self, timeout: Optional[float] = None):
+        """준비된 DiaryAnalyzer 반환 (아직이면 기다림, 준비 중 오류가 났으면 그 오류를 다시 발생)"""
+        return self._future.result(timeout)
@@ -1,54 +1,259 @@
-import openai
 from config.message import DIARY_ANALYSIS_PROMPT
 from .tone_manager import ToneManager
 from .tone_agents import ToneAgent
 from .perspective_manager import PerspectiveManager
 from .perspective_agents import PerspectiveAgent
+from .async_utils import run_sync, iterate_sync
+from .response_cache import ResponseCache, make_cache_key, normalize_text, hash_prompts
+from .request_context import current_request, ensure_request_scope, record_cache, sub_request_scope
+from .prefetch import DiscoveryPrefetcher
+from .fused_agent import FusedAgent
+from .llm_backend import LLMBackend, model_name_of
+from .single_flight import SingleFlight
+from .pipeline import Stage, StageCheckpoints, StagePipeline
+from .ranker import CandidateRanker
+from .tracing import span
+from . import tone_manager, tone_agents, perspective_manager, perspective_agents, fused_agent
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import json
+import threading
+
+# perspective 파이프라인 단계별 재시도 횟수와 시도당 제한 시간(초)
+DEFAULT_STAGE_BUDGETS = {
+    "discover": {"retries": 1, "timeout": 60.0},
+    "augment": {"retries": 1, "timeout": 90.0},
+    "tone": {"retries": 2, "timeout": 60.0},
+}
 
 class DiaryAnalyzer:
-    def __init__(self, api_key_gpt, api_key_claude):
+    def __init__(self, api_key_gpt, api_key_claude, judge_concurrency: int = 5, cache: Optional[ResponseCache] = None,
+                 prefetch_discovery: bool = False, prefetch_idle_delay: float = 1.5, llm_backend: Optional[LLMBackend] = None,
+                 warm_up_connections: int = 2, stage_budgets: Optional[Dict[str, Dict[str, float]]] = None,
+                 ranker: Optional[CandidateRanker] = None, relevance_filter: str = "local"):
         self.api_key_gpt = api_key_gpt
         self.api_key_claude = api_key_claude
-        self.client = openai.OpenAI(api_key=api_key_gpt)
-        self.tone_manager = ToneManager(api_key=api_key_gpt)  # ToneManager 인스턴스 생성
-        self.tone_agent = ToneAgent(api_key=api_key_gpt)
-        self.perspective_manager = PerspectiveManager(api_key=api_key_gpt)
-        self.perspective_agent = PerspectiveAgent(api_key_gpt=api_key_gpt, api_key_claude=api_key_claude)
+        self.judge_concurrency = judge_concurrency
+        self.relevance_filter = relevance_filter  # langchain 방법의 포인트 판정 방식 (local / llm)
+        # 모든 에이전트가 같은 백엔드에서 모델을 받음 (None이면 OpenAI API)
+        self.llm_backend = llm_backend or LLMBackend(api_key_gpt)
+        # openai / langchain 방법에서만 쓰는 클라이언트와 에이전트는 처음 사용할 때 생성
+        self._lazy_lock = threading.Lock()
+        self._client = None
+        self._async_client = None
+        self._tone_manager = None
+        self._perspective_manager = None
+        self.tone_agent = ToneAgent(api_key=api_key_gpt, backend=self.llm_backend)
+        self.perspective_agent = PerspectiveAgent(api_key_gpt=api_key_gpt, api_key_claude=api_key_claude, cache=cache, backend=self.llm_backend)
+        self.fused_agent = FusedAgent(api_key=api_key_gpt, perspective_agent=self.perspective_agent, tone_agent=self.tone_agent, backend=self.llm_backend)
+        self.cache = cache  # None이면 캐시 사용 안 함
+        # 같은 입력(일기, 관점, 톤, 방법)으로 동시에 들어온 요청은 한 번만 실행하고 결과를 나눠 받음
+        self.inflight = SingleFlight("response")
+        # 단계별 출력을 체크포인트로 남겨, 실패한 요청을 다시 보내면 실패한 단계부터 실행
+        self.checkpoints = StageCheckpoints()
+        self.perspective_pipeline = self._build_perspective_pipeline({**DEFAULT_STAGE_BUDGETS, **(stage_budgets or {})})
+        self.ranker = ranker or CandidateRanker()  # 후보 생성(generate_candidates) 결과의 순서를 매기는 로컬 랭커
+        # 관점 선택 직후 발견 단계를 미리 실행 (opt-in)
+        self.prefetcher = None
+        if prefetch_discovery:
+            self.prefetcher = DiscoveryPrefetcher(
+                lambda diary_entry, life_orientation: self.perspective_agent.adiscover(
+                    diary_entry, life_orientation, use_prefetch=False
+                ),
+                idle_delay=prefetch_idle_delay
+            )
+            self.perspective_agent.prefetcher = self.prefetcher
+        self.prompt_version = self._compute_prompt_version()
+        # 첫 요청이 연결을 맺느라 늦지 않도록 미리 연결 (0이면 사용 안 함)
+        if warm_up_connections:
+            self.llm_backend.warm_up(connections=warm_up_connections)
+
+    def _lazy(self, name: str, factory):
+        """처음 접근할 때 한 번만 생성"""
+        if getattr(self, name) is None:
+            with self._lazy_lock:
+                if getattr(self, name) is None:
+                    setattr(self, name, factory())
+        return getattr(self, name)
+
+    @property
+    def client(self):
+        return self._lazy("_client", self.llm_backend.openai_client)
+
+    @property
+    def async_client(self):
+        return self._lazy("_async_client", self.llm_backend.async_openai_client)
+
+    @property
+    def tone_manager(self) -> ToneManager:
+        return self._lazy("_tone_manager", lambda: ToneManager(api_key=self.api_key_gpt, backend=self.llm_backend))
+
+    @property
+    def perspective_manager(self) -> PerspectiveManager:
+        return self._lazy("_perspective_manager", lambda: PerspectiveManager(
+            api_key=self.api_key_gpt, judge_concurrency=self.judge_concurrency, backend=self.llm_backend,
+            relevance_filter=self.relevance_filter
+        ))
+
+    @staticmethod
+    def _load_config(filename: str):
+        """config 폴더의 JSON 설정 로드 (지연 생성되는 에이전트를 만들지 않고 프롬프트 버전 계산)"""
+        with open(Path(__file__).parent.parent / 'config' / filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _compute_prompt_version(self) -> str:
+        """모든 프롬프트 템플릿과 프롬프트에 들어가는 설정의 해시"""
+        return hash_prompts(
+            DIARY_ANALYSIS_PROMPT,
+            tone_manager.tone_template.template,
+            tone_agents.tone_prompt,
+            tone_agents.my_tone_prompt,
+            perspective_manager.extract_template.template,
+            perspective_manager.judge_template.template,
+            perspective_manager.augment_template.template,
+            perspective_agents.discover_prompt,
+            perspective_agents.augment_prompt,
+            fused_agent.fused_prompt,
+            self._load_config('tone_examples.json'),  # ToneManager
+            self.tone_agent.examples,
+            self._load_config('life_orientations.json'),  # PerspectiveManager
+            self.perspective_agent.life_orientations,
+            {"structured_output": self.llm_backend.structured_output},  # 형식 지시문이 프롬프트에 들어가는지 여부
+            {"relevance_filter": self.relevance_filter},  # langchain 방법에서 증강에 쓰일 포인트가 달라짐
+        )
+
+    def _build_perspective_pipeline(self, budgets: Dict[str, Dict[str, float]]) -> StagePipeline:
+        """발견 -> 증강 -> 톤 단계 파이프라인 (톤 단계가 끝내 실패하면 증강 결과를 그대로 사용)"""
+        agent = self.perspective_agent
+        return StagePipeline("perspective", [
+            Stage(
+                "discover",
+                # 새로 받기(use_cache=False)는 선실행 결과도 쓰지 않음
+                run=lambda state: agent.adiscover(
+                    state["diary_entry"], state["life_orientation"], state["use_cache"], use_prefetch=state["use_cache"]
+                ),
+                **budgets["discover"]
+            ),
+            Stage(
+                "augment",
+                run=lambda state: agent.aaugment_stage(
+                    state["diary_entry"], state["life_orientation"], state["discover"], state["use_cache"]
+                ),
+                stream=lambda state: agent.astream_augment_stage(
+                    state["diary_entry"], state["life_orientation"], state["discover"], state["use_cache"]
+                ),
+                **budgets["augment"]
+            ),
+            Stage(
+                "tone",
+                run=lambda state: self.tone_agent.arefine_with_tone(
+                    state["augment"], state["diary_entry"], state["tone"], state["tone_example"]
+                ),
+                stream=lambda state: self.tone_agent.astream_refine_with_tone(
+                    state["augment"], state["diary_entry"], state["tone"], state["tone_example"]
+                ),
+                fallback=lambda state: state["augment"],
+                **budgets["tone"]
+            ),
+        ], self.checkpoints)
+
+    def _checkpoint_key(self, method: str, diary_entry: str, life_orientation: str) -> str:
+        """체크포인트 키: 같은 사용자가 같은 일기와 관점으로 다시 보낸 요청이면 같은 키 (톤은 마지막 단계의 입력이라 제외)"""
+        metadata = (current_request() or {}).get("metadata", {})
+        return make_cache_key(
+            "checkpoint",
+            user_id=metadata.get("user_id"),
+            diary_entry=normalize_text(diary_entry),
+            life_orientation=life_orientation,
+            method=method,
+            prompt_version=self.prompt_version,
+        )
+
+    def prefetch_discovery(self, owner: str, diary_entry: str, life_orientation: str):
+        """발견 단계 선실행 예약 (선실행이 꺼져 있으면 무시)"""
+        if self.prefetcher is None:
+            return
+        if diary_entry and diary_entry.strip() and life_orientation:
+            self.prefetcher.schedule(owner, diary_entry, life_orientation)
+        else:
+            self.prefetcher.cancel(owner)
+
+    def _model_names(self, method: str) -> list:
+        """증강 방법별로 사용되는 모델 이름"""
+        if method == "openai":
+            return ["gpt-4o-mini"]
+        elif method == "langchain":
+            return [self.perspective_manager.llm.model_name, self.tone_manager.llm.model_name]
+        elif method == "fused":
+            return [model_name_of(self.fused_agent.gpt)]
+        else:
+            return [model_name_of(self.perspective_agent.gpt), model_name_of(self.tone_agent.llm)]
+
+    def _response_cache_key(self, method: str, diary_entry: str, life_orientation: str, tone: Optional[str], value: Optional[str] = None) -> str:
+        """입력, 모델, 프롬프트 버전으로 구성된 응답 캐시 키"""
+        return make_cache_key(
+            "response",
+            diary_entry=normalize_text(diary_entry),
+            life_orientation=life_orientation,
+            value=value,
+            tone=tone,
+            method=method,
+            models=self._model_names(method),
+            backend=self.llm_backend.base_url,  # 스텁 서버 응답이 실제 응답 캐시에 섞이지 않도록
+            prompt_version=self.prompt_version,
+        )
     
     def augment_with_openai(self, diary_entry, life_orientation, value, tone):
+        """일기를 분석하고 결과를 반환하는 메서드 (동기 래퍼)"""
+        return run_sync(self.aaugment_with_openai(diary_entry, life_orientation, value, tone))
+
+    async def aaugment_with_openai(self, diary_entry, life_orientation, value, tone):
         """일기를 분석하고 결과를 반환하는 메서드"""
         try:
             tone_example = self.tone_manager.get_random_example(tone)
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{
-                    "role": "user",
-                    "content": DIARY_ANALYSIS_PROMPT.format(
-                        tone=tone,
-                        tone_example=tone_example,
-                        attitude=life_orientation,
-                        value=value,
-                        diary=diary_entry
+            with span("openai", model="gpt-4o-mini", life_orientation=life_orientation, tone=tone) as stage:
+                response = await self.async_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[{
+                        "role": "user",
+                        "content": DIARY_ANALYSIS_PROMPT.format(
+                            tone=tone,
+                            tone_example=tone_example,
+                            attitude=life_orientation,
+                            value=value,
+                            diary=diary_entry
+                        )
+                    }],
+                    temperature=0.8,
+                )
+                if response.usage is not None:
+                    details = response.usage.prompt_tokens_details
+                    stage.add_tokens(
+                        response.usage.prompt_tokens,
+                        response.usage.completion_tokens,
+                        cached_tokens=(details.cached_tokens or 0) if details is not None else 0
                     )
-                }],
-                temperature=0.8,
-            )
             return response.choices[0].message.content
         except Exception as e:
             raise Exception(f"API 요청 중 오류 발생: {str(e)}")
         
     def augment_with_langchain(self, diary_entry: str, life_orientation: str, value: str, tone: str) -> str:
+        """LangChain 에이전트를 사용한 분석 (동기 래퍼)"""
+        return run_sync(self.aaugment_with_langchain(diary_entry, life_orientation, value, tone))
+
+    async def aaugment_with_langchain(self, diary_entry: str, life_orientation: str, value: str, tone: str) -> str:
         """LangChain 에이전트를 사용한 분석"""
         try:
             print("▶ 원본: \n", diary_entry)
-            result = self.perspective_manager.augment_from_perspective(
+            result = await self.perspective_manager.aaugment_from_perspective(
                 diary_entry=diary_entry,
                 life_orientation=life_orientation,  # 추가
                 value=value    
             )
             print("▶ perspective agent 동작 완료")
             try: 
-                result = self.tone_manager.refine_with_tone(
+                result = await self.tone_manager.arefine_with_tone(
                     diary_entry=result, 
                     tone=tone
                 )
@@ -60,43 +265,253 @@ class DiaryAnalyzer:
         except Exception as e:
             raise Exception(f"perspective agent 동작 중 오류 발생: {str(e)}")
         
-    def augment_with_perspective(self, diary_entry: str, life_orientation: str, tone: str) -> str:
-        """LangChain 에이전트를 사용한 분석"""
+    def augment_with_perspective(self, diary_entry: str, life_orientation: str, tone: Optional[str], use_cache: bool = True) -> str:
+        """LangChain 에이전트를 사용한 분석 (동기 래퍼)"""
+        return run_sync(self.aaugment_with_perspective(diary_entry, life_orientation, tone, use_cache))
+
+    async def aaugment_with_perspective(self, diary_entry: str, life_orientation: str, tone: Optional[str], use_cache: bool = True) -> str:
+        """LangChain 에이전트를 사용한 분석 (tone이 None이면 톤 단계 생략)
+
+        실패한 요청을 다시 보내면 체크포인트에 남은 단계는 건너뛰고, 톤 단계가 일시적인 오류로 끝내 실패하면 증강 결과를 반환한다.
+        잘못된 입력(톤, 관점)은 ValueError / KeyError로 그대로 발생한다.
+        """
+        self.tone_agent.validate_tone(tone)
         try:
             print("▶ 원본: \n", diary_entry)
-            augment_result = self.perspective_agent.augment_from_perspective(
-                diary_entry=diary_entry,
-                life_orientation=life_orientation
+            result = await self.perspective_pipeline.run(
+                self._checkpoint_key("perspective", diary_entry, life_orientation),
+                self._perspective_state(diary_entry, life_orientation, tone, use_cache),
+                until="augment" if tone is None else None
             )
-            print("▶ perspective agent 동작 완료")
-            try: 
-                styling_result = self.tone_agent.refine_with_tone(
-                    diary_entry=augment_result,
-                    original_diary_entry=diary_entry,
-                    tone=tone
-                )
-                print("▶ tone agent 동작 완료")
-                print("▶ AI 증강 결과: \n", styling_result)
-                return styling_result
-            except Exception as e:
-                raise Exception(f"tone agent 동작 중 오류 발생: {str(e)}")
+            print("▶ perspective 파이프라인 동작 완료")
+            print("▶ AI 증강 결과: \n", result)
+            return result
+        except (ValueError, KeyError):
+            raise
         except Exception as e:
             raise Exception(f"perspective agent 동작 중 오류 발생: {str(e)}")
+
+    @staticmethod
+    def _perspective_state(diary_entry: str, life_orientation: str, tone: Optional[str], use_cache: bool,
+                           tone_example: Optional[str] = None) -> Dict:
+        return {
+            "diary_entry": diary_entry, "life_orientation": life_orientation, "tone": tone,
+            "use_cache": use_cache, "tone_example": tone_example
+        }
     
-    def augment_diary(self, diary_entry: str, life_orientation: str, value: str, tone: str, method: str = "openai") -> str:
-        """통합된 증강 메서드"""
+    def augment_with_fused(self, diary_entry: str, life_orientation: str, tone: Optional[str]) -> str:
+        """발견, 증강, 톤 적용을 한 번의 호출로 처리 (동기 래퍼)"""
+        return run_sync(self.aaugment_with_fused(diary_entry, life_orientation, tone))
+
+    async def aaugment_with_fused(self, diary_entry: str, life_orientation: str, tone: Optional[str]) -> str:
+        """발견, 증강, 톤 적용을 한 번의 호출로 처리"""
+        print("▶ 원본: \n", diary_entry)
+        fused_result = await self.fused_agent.aaugment(diary_entry, life_orientation, tone)
+        print("▶ fused agent 동작 완료")
+        print("▶ AI 증강 결과: \n", fused_result.diary_entry)
+        return fused_result.diary_entry
+
+    def augment_diary(self, diary_entry: str, life_orientation: str, value: str, tone: str, method: str = "openai", use_cache: bool = True) -> str:
+        """통합된 증강 메서드 (동기 래퍼)"""
+        return run_sync(self.aaugment_diary(diary_entry, life_orientation, value, tone, method, use_cache))
+
+    async def aaugment_diary(self, diary_entry: str, life_orientation: str, value: str, tone: str, method: str = "openai", use_cache: bool = True) -> str:
+        """통합된 증강 메서드 (use_cache=False이면 캐시를 건너뛰고 새 결과로 갱신)"""
+        return await self._acached(
+            self._response_cache_key(method, diary_entry, life_orientation, tone, value),
+            use_cache,
+            lambda: self._aaugment_diary(diary_entry, life_orientation, value, tone, method, use_cache)
+        )
+
+    async def _aaugment_diary(self, diary_entry: str, life_orientation: str, value: str, tone: str, method: str, use_cache: bool) -> str:
         if method == "openai":
-            return self.augment_with_openai(diary_entry, life_orientation, value, tone)
+            return await self.aaugment_with_openai(diary_entry, life_orientation, value, tone)
         elif method == "langchain":
-            return self.augment_with_langchain(diary_entry, life_orientation, value, tone)
+            return await self.aaugment_with_langchain(diary_entry, life_orientation, value, tone)
         elif method == "perspective":
-            return self.augment_with_perspective(diary_entry, life_orientation, tone)
+            return await self.aaugment_with_perspective(diary_entry, life_orientation, tone, use_cache)
         else:
             raise ValueError(f"지원하지 않는 증강 방법입니다: {method}")
     
-    def augment_diary_v2(self, diary_entry: str, life_orientation: str, tone: str, method: str = "perspective") -> str:
-        """통합된 증강 메서드"""
+    def augment_diary_v2(self, diary_entry: str, life_orientation: str, tone: str, method: str = "perspective", use_cache: bool = True) -> str:
+        """통합된 증강 메서드 (동기 래퍼)"""
+        return run_sync(self.aaugment_diary_v2(diary_entry, life_orientation, tone, method, use_cache))
+
+    async def aaugment_diary_v2(self, diary_entry: str, life_orientation: str, tone: str, method: str = "perspective", use_cache: bool = True) -> str:
+        """통합된 증강 메서드 (use_cache=False이면 캐시를 건너뛰고 새 결과로 갱신)"""
+        return await self._acached(
+            self._response_cache_key(method, diary_entry, life_orientation, tone),
+            use_cache,
+            lambda: self._aaugment_diary_v2(diary_entry, life_orientation, tone, method, use_cache)
+        )
+
+    async def _aaugment_diary_v2(self, diary_entry: str, life_orientation: str, tone: str, method: str, use_cache: bool) -> str:
         if method == "perspective":
-            return self.augment_with_perspective(diary_entry, life_orientation, tone)
+            return await self.aaugment_with_perspective(diary_entry, life_orientation, tone, use_cache)
+        elif method == "fused":
+            return await self.aaugment_with_fused(diary_entry, life_orientation, tone)
+        else:
+            raise ValueError(f"지원하지 않는 증강 방법입니다: {method}")
+
+    async def astream_with_perspective(self, diary_entry: str, life_orientation: str, tone: Optional[str], use_cache: bool = True,
+                                       tone_example: Optional[str] = None) -> AsyncIterator[str]:
+        """마지막 단계의 결과를 생성되는 대로 조각 단위로 반환 (tone이 None이면 증강 단계를 스트리밍)"""
+        self.tone_agent.validate_tone(tone)
+        print("▶ 원본: \n", diary_entry)
+        try:
+            async for chunk in self.perspective_pipeline.astream(
+                self._checkpoint_key("perspective", diary_entry, life_orientation),
+                self._perspective_state(diary_entry, life_orientation, tone, use_cache, tone_example),
+                until="augment" if tone is None else None
+            ):
+                yield chunk
+            print("▶ perspective 파이프라인 동작 완료")
+        except (ValueError, KeyError):
+            raise
+        except Exception as e:
+            raise Exception(f"perspective agent 동작 중 오류 발생: {str(e)}")
+
+    def stream_diary_v2(self, diary_entry: str, life_orientation: str, tone: Optional[str], method: str = "perspective", use_cache: bool = True) -> Iterator[str]:
+        """스트리밍 증강 메서드 (동기 래퍼)"""
+        return iterate_sync(self.astream_diary_v2(diary_entry, life_orientation, tone, method, use_cache))
+
+    async def astream_diary_v2(self, diary_entry: str, life_orientation: str, tone: Optional[str], method: str = "perspective", use_cache: bool = True,
+                               tone_example: Optional[str] = None) -> AsyncIterator[str]:
+        """스트리밍 증강 메서드: 최종 일기를 조각 단위로 반환하며, 조각을 모두 이으면 최종 결과가 됨 (tone_example: perspective 톤 단계에 쓸 예시)"""
+        if method not in ("perspective", "fused"):
+            raise ValueError(f"지원하지 않는 증강 방법입니다: {method}")
+
+        cache_key = self._response_cache_key(method, diary_entry, life_orientation, tone)
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(cache_key)
+            record_cache("response", "miss" if cached is None else "hit")
+            if cached is not None:
+                print("▶ 캐시된 결과 사용")
+                yield cached
+                return
+        elif self.cache is not None:
+            record_cache("response", "bypass")
+
+        stream = lambda: self._astream_and_store(cache_key, diary_entry, life_orientation, tone, method, use_cache, tone_example)
+        if not use_cache:
+            # 새로 받기는 진행 중인 같은 요청(바꾸려는 결과)에 합류하지 않음
+            async for chunk in stream():
+                yield chunk
+            return
+        # 같은 입력으로 진행 중인 스트림이 있으면 지금까지의 조각부터 함께 받음
+        async for chunk in self.inflight.stream(cache_key, stream):
+            yield chunk
+
+    def compare_perspectives(self, diary_entry: str, life_orientations: Sequence[str], tone: Optional[str], use_cache: bool = True) -> Iterator[Tuple[str, str]]:
+        """여러 관점 비교 (동기 래퍼)"""
+        return iterate_sync(self.acompare_perspectives(diary_entry, life_orientations, tone, use_cache))
+
+    async def acompare_perspectives(self, diary_entry: str, life_orientations: Sequence[str], tone: Optional[str], use_cache: bool = True) -> AsyncIterator[Tuple[str, str]]:
+        """선택한 관점들의 perspective 결과를 동시에 생성하며 (관점, 조각)을 생성되는 대로 반환
+
+        관점과 무관한 톤 예시는 한 번만 골라 모든 관점이 함께 쓴다. 관점마다 하위 요청으로 기록을 따로 남기며
+        (현재 요청 기록의 children[관점]), 한 관점이 실패해도 나머지는 계속 생성하고 그 관점의 기록에 error를 남긴다.
+        """
+        self.tone_agent.validate_tone(tone)
+        print("▶ 관점 비교: ", ", ".join(life_orientations))
+        tone_example = self.tone_agent.get_random_example(tone) if tone in self.tone_agent.examples else None
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def produce(life_orientation: str):
+            with sub_request_scope(life_orientation, life_orientation=life_orientation) as record:
+                try:
+                    async for chunk in self.astream_diary_v2(
+                        diary_entry, life_orientation, tone, "perspective", use_cache, tone_example
+                    ):
+                        await queue.put((life_orientation, chunk))
+                except Exception as e:
+                    print(f"▶ {life_orientation} 관점 생성 중 오류 발생: {e}")
+                    record["error"] = str(e)
+            await queue.put((life_orientation, None))  # 이 관점의 생성 종료
+
+        tasks = [asyncio.create_task(produce(life_orientation)) for life_orientation in dict.fromkeys(life_orientations)]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                life_orientation, chunk = await queue.get()
+                if chunk is None:
+                    remaining -= 1
+                    continue
+                yield life_orientation, chunk
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def generate_candidates(self, diary_entry: str, life_orientation: str, tone: Optional[str], n: int = 3, use_cache: bool = True) -> List[str]:
+        """perspective 결과 후보 여러 개 생성 (동기 래퍼)"""
+        return run_sync(self.agenerate_candidates(diary_entry, life_orientation, tone, n, use_cache))
+
+    async def agenerate_candidates(self, diary_entry: str, life_orientation: str, tone: Optional[str], n: int = 3, use_cache: bool = True) -> List[str]:
+        """perspective 결과 후보 n개를 랭커 점수가 높은 순서로 반환 ("다른 결과 보기"는 self.ranker.best로 나머지에서 고름)"""
+        self.tone_agent.validate_tone(tone)
+        candidates = await self._acached(
+            self._response_cache_key(f"candidates-{n}", diary_entry, life_orientation, tone),
+            use_cache,
+            lambda: self._agenerate_candidates(diary_entry, life_orientation, tone, n, use_cache)
+        )
+        return [candidate for candidate, _ in self.ranker.rank(candidates, diary_entry)]
+
+    async def _agenerate_candidates(self, diary_entry: str, life_orientation: str, tone: Optional[str], n: int, use_cache: bool) -> List[str]:
+        """발견 단계 한 번, 증강 단계는 n 파라미터로 한 번 호출하고, 톤은 후보마다 같은 예시로 동시에 적용 (3n번 대신 n + 2번 호출)"""
+        print("▶ 원본: \n", diary_entry)
+        try:
+            discovery_result = await self.perspective_agent.adiscover(diary_entry, life_orientation, use_cache, use_prefetch=use_cache)
+            candidates = await self.perspective_agent.aaugment_candidates(diary_entry, life_orientation, discovery_result, n)
+            print(f"▶ perspective agent 동작 완료 (후보 {len(candidates)}개)")
+        except Exception as e:
+            raise Exception(f"perspective agent 동작 중 오류 발생: {str(e)}")
+        if tone is None:
+            return candidates
+        tone_example = self.tone_agent.get_random_example(tone) if tone in self.tone_agent.examples else None
+        results = await asyncio.gather(
+            *(self.tone_agent.arefine_with_tone(candidate, diary_entry, tone, tone_example) for candidate in candidates),
+            return_exceptions=True
+        )
+        # 톤 적용에 실패한 후보는 버림 (모두 실패하면 오류)
+        refined = [result for result in results if not isinstance(result, BaseException)]
+        if not refined:
+            raise Exception(f"tone agent 동작 중 오류 발생: {str(results[0])}")
+        print(f"▶ tone agent 동작 완료 (후보 {len(refined)}개)")
+        return refined
+
+    async def _astream_and_store(self, cache_key: str, diary_entry: str, life_orientation: str, tone: Optional[str], method: str, use_cache: bool,
+                                 tone_example: Optional[str] = None) -> AsyncIterator[str]:
+        chunks = []
+        if method == "fused":
+            stream = self.fused_agent.astream(diary_entry, life_orientation, tone)
         else:
-            raise ValueError(f"지원하지 않는 증강 방법입니다: {method}")
\ No newline at end of file
+            stream = self.astream_with_perspective(diary_entry, life_orientation, tone, use_cache, tone_example)
+        with ensure_request_scope() as record:
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        # 톤 단계 대신 증강 결과로 대체된 응답은 캐시하지 않음 (다음 요청에서 다시 시도)
+        if self.cache is not None and not record["pipeline"]["fallback"]:
+            self.cache.set(cache_key, "".join(chunks))
+
+    async def _acached(self, cache_key: str, use_cache: bool, compute) -> str:
+        """캐시에 결과가 있으면 반환하고, 없으면 계산 후 저장 (같은 키로 진행 중인 계산이 있으면 합류, use_cache=False면 합류하지 않음)"""
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(cache_key)
+            record_cache("response", "miss" if cached is None else "hit")
+            if cached is not None:
+                print("▶ 캐시된 결과 사용")
+                return cached
+        elif self.cache is not None:
+            record_cache("response", "bypass")
+        async def compute_and_store():
+            with ensure_request_scope() as record:
+                result = await compute()
+            # 톤 단계 대신 증강 결과로 대체된 응답은 캐시하지 않음 (다음 요청에서 다시 시도)
+            if self.cache is not None and result is not None and not record["pipeline"]["fallback"]:
+                self.cache.set(cache_key, result)
+            return result
+        if not use_cache:
+            # 새로 받기는 진행 중인 같은 요청(바꾸려는 결과)에 합류하지 않음
+            return await compute_and_store()
+        return await self.inflight.do(cache_key, compute_and_store)
@@ -0,0 +1,96 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import queue
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+# 프로세스 전체가 공유하는 이벤트 루프.
+# Streamlit 워커 스레드마다 루프를 새로 만들지 않고, 하나의 루프 위에서 여러 사용자 요청을 동시에 처리한다.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """백그라운드 스레드에서 실행 중인 공유 이벤트 루프 반환 (없으면 생성)"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever,
+                name="augmentiary-event-loop",
+                daemon=True
+            )
+            _loop_thread.start()
+        return _loop
+
+
+def submit(coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+    """코루틴을 공유 루프에 제출하고 concurrent Future 반환 (호출자의 contextvars 유지)"""
+    loop = get_event_loop()
+    ctx = contextvars.copy_context()
+    future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def _start():
+        if future.cancelled():
+            coro.close()
+            return
+        task = loop.create_task(coro, context=ctx)
+
+        def _done(t: asyncio.Task):
+            if future.cancelled():
+                return
+            if t.cancelled():
+                future.cancel()
+            elif t.exception() is not None:
+                future.set_exception(t.exception())
+            else:
+                future.set_result(t.result())
+
+        task.add_done_callback(_done)
+        # 호출자가 Future를 취소하면 루프 위의 태스크도 취소
+        future.add_done_callback(
+            lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel)
+        )
+
+    loop.call_soon_threadsafe(_start)
+    return future
+
+
+def run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    """동기 코드에서 코루틴을 실행하고 결과를 기다림"""
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("공유 이벤트 루프 안에서는 run_sync를 호출할 수 없습니다. await를 사용하세요.")
+    return submit(coro).result()
+
+
+def iterate_sync(agen: AsyncIterator[Any]) -> Iterator[Any]:
+    """비동기 제너레이터를 공유 루프에서 돌리며 동기 제너레이터로 노출"""
+    items: queue.Queue = queue.Queue()
+    done = object()
+
+    async def _pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((done, e))
+            raise
+        else:
+            items.put((done, None))
+
+    future = submit(_pump())
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # 소비자가 중간에 멈추면 루프 위의 생성도 중단
+        future.cancel()
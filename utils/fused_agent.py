@@ -0,0 +1,139 @@
+from langchain.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, Dict, Optional
+
+from .async_utils import run_sync
+from .llm_backend import LLMBackend, model_name_of
+from .streaming import astream_text_field
+from .tracing import span
+from .perspective_agents import DiscoveringSteps, PerspectiveAgent
+from .tone_agents import ToneAgent
+
+# 통합 결과 모델 정의 (필드 순서대로 생성되므로 최종 일기가 마지막)
+class FusedResult(BaseModel):
+    points: list[DiscoveringSteps] = Field(description="List of extracted excerpts and its interpretations.")
+    augmented_diary: str = Field(description="관점이 덧대어진 일기 내용")
+    diary_entry: str = Field(description="톤까지 적용된 최종 일기 내용")
+
+
+# 발견, 증강, 톤 적용을 한 번의 호출로 수행하는 프롬프트
+# 제공자 측 프롬프트 캐시가 적중하도록 정적 지시문 -> 관점(미리 채워 둠) -> 톤 지시문과 일기 순으로 배치
+fused_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
+        당신은 주어진 관점을 통해 세상을 바라보며, 다른 사람들이 새로운 관점과 건설적인 생각을 발견할 수 있도록 돕는 역할입니다.
+        아래 세 단계를 차례로 수행하고, 각 단계의 결과를 모두 반환하세요.
+
+        [1단계: 관점 발견]
+        - 사용자가 표현한 감정과 생각, 사건의 맥락과 배경, 암묵적인 고민이나 어려움을 깊이 이해하세요.
+        - 일기에서 주어진 관점으로 재해석할 수 있는 부분 1~3개를 식별하고, 발췌문과 재해석을 points에 담으세요.
+        - 원본 일기의 사실(사건, 행동, 감정, 생각)을 유지하고, 관점의 강조점을 강조하되 너무 거창한 해석은 자제하세요.
+
+        [2단계: 일기 증강]
+        - 일기의 작성자가 되어, 1단계의 재해석을 영감으로 삼아 적절한 위치에 새로운 관점/의미를 덧붙이세요.
+        - 원본 일기의 어휘, 문장 구조, 전반적인 어조를 따라하고, 일상적이고 쉬운 표현과 짧은 문장을 쓰세요.
+        - 스스로에게 제안하거나 질문하는 어조를 사용하세요. 결과를 augmented_diary에 담으세요.
+
+        [3단계: 톤 적용]
+        - 톤 지시문에 따라 증강된 일기를 다듬으세요.
+        - 원본 일기의 사실(사건, 행동, 감정)을 유지하세요. 결과를 diary_entry에 담으세요.
+
+        {format_instructions}
+        """),
+    ("system", """
+        [관점]
+        {life_orientation}: {life_orientation_desc}
+        강조점: {highlight}
+        """),
+    ("human", """
+        [톤 지시문]
+        {tone_instructions}
+
+        [일기]
+        ```
+        {diary_entry}
+        ```
+        """),
+])
+
+
+class FusedAgent:
+    """발견, 증강, 톤 적용을 하나의 구조화 출력 호출로 처리하는 에이전트"""
+
+    def __init__(self, api_key: str, perspective_agent: PerspectiveAgent, tone_agent: ToneAgent,
+                 backend: Optional[LLMBackend] = None):
+        self.backend = backend or LLMBackend(api_key)
+        self.perspective_agent = perspective_agent  # 관점 정의 재사용
+        self.tone_agent = tone_agent  # 톤 예시 재사용
+        # 제공자별 모델 (체인은 라우터로 묶어 헤징 / 장애 조치)
+        self.models = self.backend.chat_models("gpt-4o", temperature=1.0)
+        self.gpt = self.models[self.backend.providers[0]]
+        # 체인은 (관점, 스트리밍 여부)별로 한 번만 생성 (관점 설명을 미리 채워 둠)
+        self.fused_chains = {
+            (orient, streaming): self._build_fused_chain(orient, streaming)
+            for orient in perspective_agent.get_life_orientations() for streaming in (False, True)
+        }
+
+    def _build_fused_chain(self, life_orientation: str, streaming: bool):
+        """통합 체인 생성"""
+        prompt = fused_prompt.partial(
+            life_orientation=life_orientation,
+            life_orientation_desc=self.perspective_agent.get_life_orientation_definition(life_orientation),
+            highlight=self.perspective_agent.get_life_orientation_highlights(life_orientation)
+        )
+        return self.backend.routed_chain(
+            "fused", self.models, lambda model: self.backend.structured_chain(prompt, model, FusedResult, streaming)
+        )
+
+    def _create_fused_chain(self, life_orientation: str, streaming: bool = False):
+        """관점에 맞는 통합 체인 반환 (미리 만들어 둔 체인 재사용)"""
+        if (life_orientation, streaming) not in self.fused_chains:
+            raise ValueError(f"정의되지 않은 관점입니다: {life_orientation}")
+        return self.fused_chains[(life_orientation, streaming)]
+
+    def _tone_instructions(self, tone: Optional[str]) -> str:
+        """3단계에 들어갈 톤 지시문"""
+        if tone is None:
+            return "- 톤을 적용하지 않습니다. augmented_diary와 같은 내용을 반환하세요."
+        if tone == "my_tone":
+            return (
+                "- 증강된 일기를 원본 일기를 쓴 사람이 작성한 것처럼 다듬으세요.\n"
+                "        - 원본과 동일한 부분은 유지하고, 추가된 부분만 원본의 어휘, 어미, 문장 길이와 구조, 표현의 무게를 반영하세요."
+            )
+        tone_example = self.tone_agent.get_random_example(tone)
+        return (
+            f"- 다음 예시를 참고하여 증강된 일기에 '{tone}' 톤을 적용하세요: \"{tone_example}\"\n"
+            "        - 묘사의 깊이, 표현의 가벼움, 주로 사용되는 어투, (예시에 포함된 경우) 이모티콘이나 웃음 문자의 활용을 반영하세요.\n"
+            "        - 필요 시 가독성을 위해 적절한 줄바꿈을 추가하세요."
+        )
+
+    def _build_inputs(self, diary_entry: str, tone: Optional[str]) -> Dict:
+        """통합 체인의 요청별 입력 구성 (관점과 형식 지시문은 체인에 미리 채워져 있음)"""
+        return {
+            "diary_entry": diary_entry,
+            "tone_instructions": self._tone_instructions(tone)
+        }
+
+    def augment(self, diary_entry: str, life_orientation: str, tone: Optional[str]) -> FusedResult:
+        """한 번의 호출로 발견, 증강, 톤 적용 (동기 래퍼)"""
+        return run_sync(self.aaugment(diary_entry, life_orientation, tone))
+
+    async def aaugment(self, diary_entry: str, life_orientation: str, tone: Optional[str]) -> FusedResult:
+        """한 번의 호출로 발견, 증강, 톤 적용"""
+        try:
+            fused_chain = self._create_fused_chain(life_orientation)
+            with span("fused", model=model_name_of(self.gpt), life_orientation=life_orientation, tone=tone):
+                fused_result = await fused_chain.ainvoke(self._build_inputs(diary_entry, tone))
+            print("====================\n발견된 부분: ", fused_result.points)
+            return fused_result
+        except Exception as e:
+            raise Exception(f"통합 증강 중 오류 발생: {str(e)}")
+
+    async def astream(self, diary_entry: str, life_orientation: str, tone: Optional[str]) -> AsyncIterator[str]:
+        """최종 일기(diary_entry)를 생성되는 대로 조각 단위로 반환"""
+        try:
+            fused_chain = self._create_fused_chain(life_orientation, streaming=True)
+            with span("fused", model=model_name_of(self.gpt), life_orientation=life_orientation, tone=tone, streaming=True):
+                async for chunk in astream_text_field(fused_chain, self._build_inputs(diary_entry, tone)):
+                    yield chunk
+        except Exception as e:
+            raise Exception(f"통합 증강 중 오류 발생: {str(e)}")
@@ -0,0 +1,150 @@
+import asyncio
+import importlib.util
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from .async_utils import run_sync, submit
+from .scheduler import LLMScheduler, ScheduledTransport, scheduler as default_scheduler
+from .tracing import span, tracer
+
+
+class HTTPPool:
+    """모든 LLM 클라이언트가 함께 쓰는 keep-alive HTTP 연결 풀 (동기 / 비동기 한 벌)
+
+    OpenAI SDK 클라이언트와 ChatOpenAI 모델이 모두 이 풀의 httpx 클라이언트를 사용하므로,
+    파이프라인 단계가 바뀌어도 이미 맺어 둔 TLS 연결을 그대로 재사용한다. h2 패키지가 있으면 HTTP/2를 쓴다.
+    요청마다 새 연결을 맺었는지 기록해 단계별 연결 재사용률을 tracer 카운터로 내보낸다.
+    LLM 호출은 전송 계층에서 스케줄러(기본값: 프로세스 공유 스케줄러)를 거쳐 한도 관리와 재시도를 받는다.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 120.0,
+        timeout: float = 60.0,
+        http2: Optional[bool] = None,
+        ping_interval: Optional[float] = 45.0,
+        scheduler: Optional[LLMScheduler] = None
+    ):
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None  # 설치되어 있을 때만 HTTP/2
+        self.http2 = http2
+        self.keepalive_expiry = keepalive_expiry  # 쓰지 않는 연결을 풀에 남겨 두는 시간(초)
+        self.ping_interval = ping_interval  # 이 시간 동안 요청이 없으면 연결 유지용 요청 전송 (None이면 사용 안 함)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.scheduler = scheduler or default_scheduler
+        self.client = httpx.Client(
+            transport=ScheduledTransport(httpx.HTTPTransport(limits=limits, http2=http2), self.scheduler),
+            timeout=timeout,
+            event_hooks={"request": [self._on_request], "response": [self._on_response]}
+        )
+        self.async_client = httpx.AsyncClient(
+            transport=ScheduledTransport(httpx.AsyncHTTPTransport(limits=limits, http2=http2), self.scheduler),
+            timeout=timeout,
+            event_hooks={"request": [self._aon_request], "response": [self._aon_response]}
+        )
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._new_connections = 0
+        self._tls_handshakes = 0
+        self._last_used = time.monotonic()
+        self._ping_requests: List[Dict] = []  # warm_up에서 정한 서버별 연결 유지용 요청
+        self._pinger: Optional[threading.Thread] = None
+
+    # httpcore의 trace 확장으로 요청마다 새 연결(TCP 연결, TLS 핸드셰이크)을 맺었는지 기록
+    @staticmethod
+    def _trace_state(request: httpx.Request) -> Dict[str, bool]:
+        state = {"connect": False, "tls": False}
+        request.extensions["augmentiary_connection"] = state
+        return state
+
+    @staticmethod
+    def _mark(state: Dict[str, bool], event_name: str):
+        if event_name == "connection.connect_tcp.complete":
+            state["connect"] = True
+        elif event_name == "connection.start_tls.complete":
+            state["tls"] = True
+
+    def _on_request(self, request: httpx.Request):
+        state = self._trace_state(request)
+        request.extensions["trace"] = lambda event_name, info: self._mark(state, event_name)
+
+    async def _aon_request(self, request: httpx.Request):
+        state = self._trace_state(request)
+
+        async def trace(event_name, info):
+            self._mark(state, event_name)
+        request.extensions["trace"] = trace
+
+    def _on_response(self, response: httpx.Response):
+        state = response.request.extensions.get("augmentiary_connection")
+        if state is None:
+            return
+        with self._lock:
+            self._requests += 1
+            self._new_connections += state["connect"]
+            self._tls_handshakes += state["tls"]
+            self._last_used = time.monotonic()
+        tracer.count("http_requests_total")
+        if state["connect"]:
+            tracer.count("http_new_connections_total")
+        if state["tls"]:
+            tracer.count("http_tls_handshakes_total")
+
+    async def _aon_response(self, response: httpx.Response):
+        self._on_response(response)
+
+    def stats(self) -> Dict:
+        """풀 전체의 요청 수, 새 연결 수, 연결 재사용률"""
+        with self._lock:
+            return {
+                "http2": self.http2,
+                "requests": self._requests,
+                "new_connections": self._new_connections,
+                "tls_handshakes": self._tls_handshakes,
+                "reuse_rate": 1 - self._new_connections / self._requests if self._requests else None,
+            }
+
+    def warm_up(self, url: str, headers: Optional[Dict[str, str]] = None, connections: int = 1, timeout: float = 5.0):
+        """가벼운 요청으로 동기 / 비동기 풀에 연결을 미리 맺어 두고, 유휴 연결 유지 스레드 시작
+
+        서버(제공자)마다 한 번씩 호출한다. 응답 상태와 관계없이 연결만 맺어지면 되므로 오류는 기록만 하고 넘어간다.
+        """
+        request = {"url": url, "headers": headers or {}, "timeout": timeout}
+        self._ping_requests.append(request)
+        with span("http-warmup", connections=connections):
+            try:
+                self.client.get(**request)
+                run_sync(self._awarm(request, connections))
+            except Exception as e:
+                print(f"► 연결 예열 실패 (첫 요청에서 다시 연결): {e}")
+        if self.ping_interval and self._pinger is None:
+            self._pinger = threading.Thread(target=self._ping_loop, name="http-keepalive", daemon=True)
+            self._pinger.start()
+
+    async def _awarm(self, request: Dict, connections: int):
+        # 동시에 보내야 요청마다 따로 연결이 열림 (판정 단계처럼 병렬 호출에 대비)
+        await asyncio.gather(*(self.async_client.get(**request) for _ in range(connections)))
+
+    def _ping_loop(self):
+        while True:
+            time.sleep(self.ping_interval)
+            with self._lock:
+                idle = time.monotonic() - self._last_used
+            if idle < self.ping_interval:
+                continue
+            for request in list(self._ping_requests):
+                with span("http-ping"):
+                    try:
+                        self.client.get(**request)
+                        submit(self._awarm(request, 1)).result()
+                    except Exception as e:
+                        print(f"► 연결 유지 요청 실패: {e}")
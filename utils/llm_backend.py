@@ -0,0 +1,222 @@
+import anthropic
+import openai
+from functools import cached_property
+from langchain_anthropic import ChatAnthropic
+from langchain_community.chat_models import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, Field
+from typing import Any, Callable, Dict, Optional, Sequence, Type
+
+from .http_pool import HTTPPool
+from .provider_router import ProviderRouter, RoutedChain
+from .structured_output import candidates_chain, structured_chain
+from .tracing import current_span, estimate_tokens
+
+# 로컬 스텁 서버 기본 주소 (scripts/llm_stub_server.py, Anthropic 호환 엔드포인트는 /v1 없이)
+DEFAULT_LOCAL_BASE_URL = "http://127.0.0.1:8765/v1"
+DEFAULT_LOCAL_ANTHROPIC_BASE_URL = "http://127.0.0.1:8765"
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+
+PROVIDERS = ("openai", "anthropic")
+
+# OpenAI 모델에 대응하는 Anthropic 모델 (헤징 / 장애 조치용 보조 제공자)
+ANTHROPIC_MODELS = {
+    "gpt-4o": "claude-3-5-sonnet-20241022",
+    "gpt-4o-mini": "claude-3-5-haiku-20241022",
+}
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LLM 호출이 끝날 때 토큰 사용량을 현재 span에 기록하는 콜백
+
+    API가 사용량을 돌려주지 않는 스트리밍 호출은 프롬프트와 생성 결과 길이로 추정한다.
+    """
+
+    run_inline = True  # 호출한 컨텍스트에서 실행되어야 현재 span을 찾을 수 있음
+
+    def __init__(self):
+        self._prompts: Dict[Any, str] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._prompts[run_id] = "".join(
+            message.content for batch in messages for message in batch if isinstance(message.content, str)
+        )
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._prompts[run_id] = "".join(prompts)
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        span = current_span()
+        if span is not None:
+            span.add_retry()
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._prompts.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt = self._prompts.pop(run_id, "")
+        span = current_span()
+        if span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage.get("prompt_tokens") is not None:
+            details = usage.get("prompt_tokens_details") or {}
+            span.add_tokens(
+                usage.get("prompt_tokens", 0),
+                usage.get("completion_tokens", 0),
+                cached_tokens=details.get("cached_tokens") or 0
+            )
+            return
+        # ChatAnthropic은 스트리밍에서도 메시지에 사용량을 담아 줌
+        usage_metadata = [
+            generation.message.usage_metadata
+            for generations in response.generations for generation in generations
+            if getattr(getattr(generation, "message", None), "usage_metadata", None)
+        ]
+        if usage_metadata:
+            span.add_tokens(
+                sum(usage["input_tokens"] for usage in usage_metadata),
+                sum(usage["output_tokens"] for usage in usage_metadata),
+                cached_tokens=sum((usage.get("input_token_details") or {}).get("cache_read") or 0 for usage in usage_metadata)
+            )
+            return
+        completion = "".join(
+            generation.text for generations in response.generations for generation in generations
+        )
+        span.add_tokens(estimate_tokens(prompt), estimate_tokens(completion), source="estimated")
+
+
+class PooledChatAnthropic(ChatAnthropic):
+    """공유 HTTP 연결 풀 위에서 동작하는 ChatAnthropic"""
+
+    pool: Any = Field(default=None, exclude=True)
+
+    @cached_property
+    def _client(self) -> anthropic.Client:
+        return anthropic.Client(**self._client_params, http_client=self.pool.client)
+
+    @cached_property
+    def _async_client(self) -> anthropic.AsyncClient:
+        return anthropic.AsyncClient(**self._client_params, http_client=self.pool.async_client)
+
+
+def model_name_of(model: BaseChatModel) -> str:
+    """ChatOpenAI(model_name) / ChatAnthropic(model)의 모델 이름"""
+    return getattr(model, "model_name", None) or getattr(model, "model", "")
+
+
+class LLMBackend:
+    """에이전트들이 사용하는 모델과 OpenAI 클라이언트를 만드는 팩토리
+
+    kind="openai"는 실제 OpenAI API를, kind="local"은 OpenAI 호환 로컬 스텁 서버를 사용한다.
+    base_url을 지정하면 어떤 OpenAI 호환 서버든 사용할 수 있다.
+    여기서 만드는 모든 클라이언트와 모델은 하나의 HTTP 연결 풀(pool)을 공유한다.
+    providers에 "anthropic"을 넣으면 단계마다 Anthropic 모델로도 같은 체인을 만들어,
+    router가 느린 요청을 헤징하거나 실패한 요청을 넘겨받게 한다 (앞에 둔 제공자가 기본 1순위).
+    structured_output이면 체인이 형식 지시문 대신 제공자 고유 구조화 출력(response_format / 도구 호출)을 쓴다.
+    """
+
+    def __init__(self, api_key: str, kind: str = "openai", base_url: Optional[str] = None,
+                 pool: Optional[HTTPPool] = None, providers: Sequence[str] = ("openai",),
+                 anthropic_api_key: Optional[str] = None, anthropic_base_url: Optional[str] = None,
+                 router: Optional[ProviderRouter] = None, structured_output: bool = True):
+        if kind not in ("openai", "local"):
+            raise ValueError(f"지원하지 않는 LLM 백엔드입니다: {kind}")
+        for provider in providers:
+            if provider not in PROVIDERS:
+                raise ValueError(f"지원하지 않는 LLM 제공자입니다: {provider}")
+        if "anthropic" in providers and kind == "openai" and not anthropic_api_key:
+            raise ValueError("Anthropic 제공자를 쓰려면 anthropic_api_key가 필요합니다.")
+        self.kind = kind
+        self.api_key = api_key or "local"  # 스텁 서버는 키를 검사하지 않음
+        self.base_url = base_url or (DEFAULT_LOCAL_BASE_URL if kind == "local" else None)
+        self.pool = pool or HTTPPool()
+        self.providers = tuple(providers)
+        self.anthropic_api_key = anthropic_api_key or "local"
+        self.anthropic_base_url = anthropic_base_url or (DEFAULT_LOCAL_ANTHROPIC_BASE_URL if kind == "local" else None)
+        self.router = router or ProviderRouter()
+        self.structured_output = structured_output  # False면 형식 지시문 + 텍스트 파서만 사용
+
+    def chat_model(self, model_name: str, temperature: float, **kwargs) -> ChatOpenAI:
+        """LangChain 체인에 연결할 채팅 모델 생성"""
+        return ChatOpenAI(
+            model_name=model_name,
+            temperature=temperature,
+            openai_api_key=self.api_key,
+            openai_api_base=self.base_url,
+            # 모델마다 연결 풀을 따로 만들지 않도록 공유 풀 위의 클라이언트를 직접 넘김
+            client=self.openai_client().chat.completions,
+            async_client=self.async_openai_client().chat.completions,
+            callbacks=[TokenUsageCallback()],  # 단계별 span에 토큰 사용량 기록
+            **kwargs
+        )
+
+    def anthropic_chat_model(self, model_name: str, temperature: float) -> ChatAnthropic:
+        """model_name(OpenAI 모델)에 대응하는 Anthropic 채팅 모델 생성"""
+        return PooledChatAnthropic(
+            model=ANTHROPIC_MODELS.get(model_name, model_name),
+            temperature=temperature,
+            max_tokens=4096,
+            api_key=self.anthropic_api_key,
+            base_url=self.anthropic_base_url,
+            max_retries=0,  # 재시도는 공유 풀의 스케줄러가 담당
+            pool=self.pool,
+            callbacks=[TokenUsageCallback()]
+        )
+
+    def chat_models(self, model_name: str, temperature: float) -> Dict[str, BaseChatModel]:
+        """providers 순서대로 제공자별 채팅 모델 생성"""
+        factories = {"openai": self.chat_model, "anthropic": self.anthropic_chat_model}
+        return {provider: factories[provider](model_name, temperature) for provider in self.providers}
+
+    def structured_chain(self, prompt: BasePromptTemplate, model: BaseChatModel, schema: Type[BaseModel],
+                         streaming: bool = False) -> Runnable:
+        """prompt | model | parser 체인 (구조화 출력이 실패하면 형식 지시문 + 텍스트 파서로 다시 시도)"""
+        return structured_chain(prompt, model, schema, streaming=streaming, native=self.structured_output)
+
+    def candidates_chain(self, prompt: BasePromptTemplate, model: BaseChatModel, schema: Type[BaseModel], n: int) -> Runnable:
+        """prompt | model(n개 생성) | parser 체인 (결과는 스키마 객체 목록)"""
+        return candidates_chain(prompt, model, schema, n, native=self.structured_output)
+
+    def routed_chain(self, stage: str, models: Dict[str, BaseChatModel],
+                     build: Callable[[BaseChatModel], Any]) -> RoutedChain:
+        """제공자별 모델로 같은 체인을 만들고 라우터로 묶음 (build: 모델 -> 체인)"""
+        return RoutedChain(
+            stage,
+            {provider: build(model) for provider, model in models.items()},
+            {provider: model_name_of(model) for provider, model in models.items()},
+            self.router
+        )
+
+    def openai_client(self) -> openai.OpenAI:
+        """OpenAI SDK 동기 클라이언트 생성"""
+        return openai.OpenAI(
+            api_key=self.api_key, base_url=self.base_url, http_client=self.pool.client,
+            max_retries=0  # 재시도는 공유 풀의 스케줄러가 담당
+        )
+
+    def async_openai_client(self) -> openai.AsyncOpenAI:
+        """OpenAI SDK 비동기 클라이언트 생성"""
+        return openai.AsyncOpenAI(
+            api_key=self.api_key, base_url=self.base_url, http_client=self.pool.async_client,
+            max_retries=0  # 재시도는 공유 풀의 스케줄러가 담당
+        )
+
+    def warm_up(self, connections: int = 1):
+        """제공자별 API 서버와 연결을 미리 맺어 둠 (모델 목록 조회, 토큰을 쓰지 않음)"""
+        if "openai" in self.providers:
+            self.pool.warm_up(
+                f"{(self.base_url or DEFAULT_OPENAI_BASE_URL).rstrip('/')}/models",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                connections=connections
+            )
+        if "anthropic" in self.providers:
+            self.pool.warm_up(
+                f"{(self.anthropic_base_url or DEFAULT_ANTHROPIC_BASE_URL).rstrip('/')}/v1/models",
+                headers={"x-api-key": self.anthropic_api_key, "anthropic-version": "2023-06-01"},
+                connections=connections
+            )
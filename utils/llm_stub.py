@@ -0,0 +1,474 @@
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# 구조화 출력 필드에 채워 넣을 문장
+FILLER_SENTENCES = [
+    "오늘 하루도 나름대로 의미가 있었던 것 같다.",
+    "조금 힘들었지만 그래도 끝까지 해냈다.",
+    "그 순간을 다시 떠올려 보니 배울 점이 있었다.",
+    "내일은 조금 더 여유를 가져 보고 싶다.",
+    "작은 일이었지만 고마운 마음이 들었다.",
+    "생각해 보면 나는 생각보다 잘 버티고 있다.",
+    "다음에는 스스로에게 조금 더 너그러워져도 괜찮지 않을까?",
+]
+
+# 필드 이름별 생성 길이(글자 수) 범위
+FIELD_LENGTHS = {
+    "diary_entry": (150, 400),
+    "augmented_diary": (150, 400),
+}
+DEFAULT_FIELD_LENGTH = (20, 80)
+
+# 프롬프트 캐시 흉내: 최소 1024토큰 이상의 접두사를 128토큰 단위로 캐시 (OpenAI 자동 프롬프트 캐시와 같은 규칙)
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_INCREMENT = 128
+PROMPT_CACHE_MAX_ENTRIES = 10000
+
+# PydanticOutputParser 형식 지시문 안의 JSON 스키마 블록
+SCHEMA_BLOCK = re.compile(r"```\s*(\{.*?\})\s*```", re.DOTALL)
+
+
+def count_tokens(text: str) -> int:
+    """토큰 수 근사치 (한국어 기준 두 글자당 한 토큰)"""
+    return max(1, math.ceil(len(text) / 2))
+
+
+class StubProfile:
+    """스텁 서버의 지연 시간 분포, 토큰 생성 속도, 오류 주입 설정
+
+    latency는 첫 토큰까지의 지연 시간 분포로 {"dist": "fixed"|"uniform"|"lognormal", ...} 형태다.
+        fixed: {"seconds"}, uniform: {"low", "high"}, lognormal: {"median", "sigma"}
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Dict] = None,
+        tokens_per_second: float = 80.0,
+        error_rate: float = 0.0,
+        error_statuses: List[int] = (429, 500, 503),
+        timeout_rate: float = 0.0,
+        timeout_seconds: float = 60.0,
+        prompt_cache: bool = True,
+        prompt_cache_min_tokens: int = PROMPT_CACHE_MIN_TOKENS,
+        malformed_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency or {"dist": "lognormal", "median": 0.4, "sigma": 0.5}
+        self.tokens_per_second = tokens_per_second  # 0 이하이면 출력 시간 없이 한 번에 반환
+        self.error_rate = error_rate  # 오류 응답 비율
+        self.error_statuses = list(error_statuses)
+        self.timeout_rate = timeout_rate  # 응답 없이 timeout_seconds 동안 붙잡아 두는 비율
+        self.timeout_seconds = timeout_seconds
+        self.prompt_cache = prompt_cache  # 이전 요청과 같은 접두사를 cached_tokens로 보고
+        self.prompt_cache_min_tokens = prompt_cache_min_tokens  # 캐시되는 최소 접두사 길이
+        # 형식 지시문만 보고 만든 JSON이 스키마에서 벗어나는 비율 (구조화 출력 요청은 항상 스키마를 지킴)
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, config: Dict) -> "StubProfile":
+        return cls(**config)
+
+    def sample_latency(self) -> float:
+        """첫 토큰까지의 지연 시간(초) 샘플"""
+        dist = self.latency.get("dist", "fixed")
+        with self._lock:
+            if dist == "fixed":
+                return self.latency.get("seconds", 0.0)
+            if dist == "uniform":
+                return self.random.uniform(self.latency["low"], self.latency["high"])
+            if dist == "lognormal":
+                return self.random.lognormvariate(math.log(self.latency["median"]), self.latency["sigma"])
+        raise ValueError(f"지원하지 않는 지연 시간 분포입니다: {dist}")
+
+    def sample_failure(self) -> Optional[Any]:
+        """주입할 실패 (오류 상태 코드, "timeout", 또는 None)"""
+        with self._lock:
+            roll = self.random.random()
+            if roll < self.error_rate:
+                return self.random.choice(self.error_statuses)
+            if roll < self.error_rate + self.timeout_rate:
+                return "timeout"
+        return None
+
+    def sample_malformed(self) -> bool:
+        with self._lock:
+            return self.random.random() < self.malformed_rate
+
+    def token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+
+class SchemaFaker:
+    """JSON 스키마에 맞는 임의의 값을 생성"""
+
+    def __init__(self, rng: random.Random):
+        self.random = rng
+
+    def generate(self, schema: Dict) -> Any:
+        return self._value(schema, schema.get("$defs", schema.get("definitions", {})), None)
+
+    def _value(self, schema: Dict, defs: Dict, name: Optional[str]) -> Any:
+        if "$ref" in schema:
+            return self._value(defs[schema["$ref"].split("/")[-1]], defs, name)
+        for combinator in ("anyOf", "oneOf", "allOf"):
+            if combinator in schema:
+                options = [option for option in schema[combinator] if option.get("type") != "null"]
+                return self._value(options[0], defs, name)
+        kind = schema.get("type", "object" if "properties" in schema else "string")
+        if kind == "object":
+            return {key: self._value(prop, defs, key) for key, prop in schema.get("properties", {}).items()}
+        if kind == "array":
+            low = schema.get("minItems", 1)
+            high = max(low, min(schema.get("maxItems", 3), 3))
+            return [self._value(schema.get("items", {}), defs, name) for _ in range(self.random.randint(low, high))]
+        if kind == "boolean":
+            return self.random.random() < 0.7
+        if kind == "integer":
+            return self.random.randint(0, 10)
+        if kind == "number":
+            return round(self.random.random(), 3)
+        return self.text(*FIELD_LENGTHS.get(name, DEFAULT_FIELD_LENGTH))
+
+    def text(self, min_chars: int, max_chars: int) -> str:
+        target = self.random.randint(min_chars, max_chars)
+        sentences = []
+        while sum(len(sentence) + 1 for sentence in sentences) < target:
+            sentences.append(self.random.choice(FILLER_SENTENCES))
+        return " ".join(sentences)
+
+
+def anthropic_to_chat(body: Dict) -> Dict:
+    """Anthropic Messages 요청을 OpenAI chat completions 형식으로 변환 (스키마 탐색, 토큰 계산용)"""
+    def text_of(content) -> str:
+        if isinstance(content, str):
+            return content
+        return "".join(block.get("text", "") for block in content or [] if isinstance(block, dict))
+
+    messages = [{"role": "system", "content": text_of(body["system"])}] if body.get("system") else []
+    messages += [{"role": m.get("role"), "content": text_of(m.get("content"))} for m in body.get("messages", [])]
+    return {**body, "messages": messages, "n": 1}
+
+
+def native_schema(body: Dict) -> Optional[Dict]:
+    """구조화 출력 요청의 스키마 (OpenAI response_format json_schema / 도구, Anthropic 도구)"""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return response_format["json_schema"]["schema"]
+    tools = body.get("tools") or []
+    if tools:
+        return tools[0]["input_schema"] if "input_schema" in tools[0] else tools[0]["function"]["parameters"]
+    return None
+
+
+def find_schema(body: Dict) -> Optional[Dict]:
+    """요청에서 출력 스키마 찾기 (구조화 출력 요청, 또는 프롬프트의 형식 지시문)"""
+    schema = native_schema(body)
+    if schema is not None:
+        return schema
+    for message in reversed(body.get("messages", [])):
+        content = message.get("content")
+        if not isinstance(content, str):
+            continue
+        for block in reversed(SCHEMA_BLOCK.findall(content)):
+            try:
+                schema = json.loads(block)
+            except json.JSONDecodeError:
+                continue
+            if "properties" in schema:
+                return schema
+    return None
+
+
+class StubServer:
+    """OpenAI 호환 /v1/chat/completions와 Anthropic 호환 /v1/messages를 흉내 내는 로컬 HTTP 서버
+
+    프롬프트(또는 response_format, 도구 정의)에 들어 있는 JSON 스키마를 읽어 스키마에 맞는 JSON을 반환하므로,
+    DiscoveredResults, AugmentResult, ToneAugmentResult, JudgmentResult 등 모든 파서가 그대로 동작한다.
+    Anthropic 요청에 도구가 있으면 첫 번째 도구를 호출하는 tool_use 블록으로 응답한다.
+    스키마가 없는 요청에는 일반 텍스트를 반환한다.
+    Anthropic SDK에는 base_url 대신 root_url(/v1 없이)을 넘긴다.
+    """
+
+    def __init__(self, profile: Optional[StubProfile] = None, host: str = "127.0.0.1", port: int = 8765):
+        self.profile = profile or StubProfile()
+        self.faker = SchemaFaker(self.profile.random)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "errors": 0, "timeouts": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0
+        }
+        self._prefixes: "OrderedDict[str, None]" = OrderedDict()  # 프롬프트 캐시에 들어간 접두사 해시
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        """백그라운드 스레드에서 서버 시작"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="llm-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def cached_prefix_tokens(self, prompt: str) -> int:
+        """이전 요청과 겹치는 접두사 토큰 수를 반환하고, 이번 프롬프트의 접두사를 캐시에 등록"""
+        if not self.profile.prompt_cache:
+            return 0
+        cached = 0
+        with self._stats_lock:
+            for tokens in range(self.profile.prompt_cache_min_tokens, count_tokens(prompt) + 1, PROMPT_CACHE_INCREMENT):
+                digest = hashlib.sha256(prompt[:tokens * 2].encode("utf-8")).hexdigest()
+                if digest in self._prefixes:
+                    cached = tokens
+                    self._prefixes.move_to_end(digest)
+                else:
+                    self._prefixes[digest] = None
+            while len(self._prefixes) > PROMPT_CACHE_MAX_ENTRIES:
+                self._prefixes.popitem(last=False)
+        return cached
+
+    def completion_contents(self, body: Dict) -> List[str]:
+        """요청 하나에 대한 응답 본문 n개 생성"""
+        schema = find_schema(body)
+        constrained = native_schema(body) is not None
+        contents = []
+        for _ in range(body.get("n") or 1):
+            if schema is None:
+                contents.append(self.faker.text(*FIELD_LENGTHS["diary_entry"]))
+            elif not constrained and self.profile.sample_malformed():
+                contents.append(self.malformed(self.faker.generate(schema)))
+            else:
+                contents.append(json.dumps(self.faker.generate(schema), ensure_ascii=False))
+        return contents
+
+    def malformed(self, value: Dict) -> str:
+        """형식 지시문을 따르다 틀린 출력 흉내: 필드 하나를 빠뜨리거나 JSON이 중간에 끊김"""
+        if len(value) > 1 and self.profile.random.random() < 0.5:
+            value = dict(list(value.items())[:-1])
+            return json.dumps(value, ensure_ascii=False)
+        text = json.dumps(value, ensure_ascii=False)
+        return text[:max(1, len(text) // 2)]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # 요청마다 출력하지 않음
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # 헤징에서 진 요청처럼 클라이언트가 먼저 끊은 경우
+
+            def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [
+                        {"id": model, "object": "model", "owned_by": "stub"} for model in ("gpt-4o", "gpt-4o-mini")
+                    ]})
+                elif self.path.rstrip("/").endswith("/stats"):
+                    with server._stats_lock:
+                        self._send_json(200, dict(server.stats))
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                path = self.path.rstrip("/")
+                if path.endswith("/chat/completions"):
+                    api = "openai"
+                elif path.endswith("/messages"):
+                    api = "anthropic"
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if api == "anthropic":
+                    body = anthropic_to_chat(body)
+                server._count(requests=1)
+
+                failure = server.profile.sample_failure()
+                if failure == "timeout":
+                    server._count(timeouts=1)
+                    time.sleep(server.profile.timeout_seconds)
+                    self.close_connection = True
+                    return
+                if failure is not None:
+                    server._count(errors=1)
+                    time.sleep(server.profile.sample_latency())
+                    error = {"message": f"injected error {failure}", "type": "stub_error", "code": str(failure)}
+                    self._send_json(
+                        failure,
+                        {"type": "error", "error": error} if api == "anthropic" else {"error": error},
+                        {"Retry-After": "1"} if failure == 429 else None
+                    )
+                    return
+
+                prompt = "".join(
+                    f"{m.get('role')}:{m.get('content')}\n" for m in body.get("messages", []) if isinstance(m.get("content"), str)
+                )
+                # 구조화 출력 스키마도 입력 토큰으로 계산
+                if native_schema(body) is not None:
+                    prompt += json.dumps(native_schema(body), ensure_ascii=False)
+                prompt_tokens = count_tokens(prompt)
+                cached_tokens = server.cached_prefix_tokens(prompt)
+                contents = server.completion_contents(body)
+                completion_tokens = sum(count_tokens(content) for content in contents)
+                server._count(prompt_tokens=prompt_tokens, cached_tokens=cached_tokens, completion_tokens=completion_tokens)
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                }
+                completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+                model = body.get("model", "gpt-4o-mini")
+
+                time.sleep(server.profile.sample_latency())
+                if api == "anthropic":
+                    tools = body.get("tools") or []
+                    self._anthropic_response(model, contents[0], usage, body.get("stream"), tools[0]["name"] if tools else None)
+                    return
+                if body.get("stream"):
+                    self._stream(completion_id, model, contents, usage, body)
+                    return
+                time.sleep(server.profile.token_delay() * completion_tokens)
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {"index": index, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                        for index, content in enumerate(contents)
+                    ],
+                    "usage": usage,
+                })
+
+            def _stream(self, completion_id: str, model: str, contents: List[str], usage: Dict, body: Dict):
+                """토큰 생성 속도에 맞춰 SSE 조각으로 전송"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def send(choices, extra=None):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": choices,
+                        **(extra or {}),
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                for index, content in enumerate(contents):
+                    send([{"index": index, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+                    for start in range(0, len(content), 2):  # 두 글자 = 한 토큰
+                        time.sleep(server.profile.token_delay())
+                        send([{"index": index, "delta": {"content": content[start:start + 2]}, "finish_reason": None}])
+                    send([{"index": index, "delta": {}, "finish_reason": "stop"}])
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    send([], {"usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _anthropic_response(self, model: str, content: str, usage: Dict, stream: bool, tool: Optional[str] = None):
+                """Anthropic Messages 형식 응답 (stream이면 SSE 이벤트로 전송, tool이 있으면 도구 호출로 응답)"""
+                message_id = f"msg_stub_{uuid.uuid4().hex[:12]}"
+                anthropic_usage = {
+                    "input_tokens": usage["prompt_tokens"] - usage["prompt_tokens_details"]["cached_tokens"],
+                    "cache_read_input_tokens": usage["prompt_tokens_details"]["cached_tokens"],
+                    "output_tokens": usage["completion_tokens"],
+                }
+                message = {
+                    "id": message_id, "type": "message", "role": "assistant", "model": model,
+                    "stop_reason": None, "stop_sequence": None,
+                }
+                tool_id = f"toolu_stub_{uuid.uuid4().hex[:12]}"
+                stop_reason = "tool_use" if tool else "end_turn"
+                if not stream:
+                    time.sleep(server.profile.token_delay() * usage["completion_tokens"])
+                    block = (
+                        {"type": "tool_use", "id": tool_id, "name": tool, "input": json.loads(content)}
+                        if tool else {"type": "text", "text": content}
+                    )
+                    self._send_json(200, {**message, "content": [block], "stop_reason": stop_reason, "usage": anthropic_usage})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def send(event: str, data: Dict):
+                    payload = json.dumps({"type": event, **data}, ensure_ascii=False)
+                    self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                send("message_start", {"message": {**message, "content": [], "usage": {**anthropic_usage, "output_tokens": 1}}})
+                if tool:
+                    send("content_block_start", {"index": 0, "content_block": {"type": "tool_use", "id": tool_id, "name": tool, "input": {}}})
+                else:
+                    send("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+                for start in range(0, len(content), 2):  # 두 글자 = 한 토큰
+                    time.sleep(server.profile.token_delay())
+                    piece = content[start:start + 2]
+                    delta = {"type": "input_json_delta", "partial_json": piece} if tool else {"type": "text_delta", "text": piece}
+                    send("content_block_delta", {"index": 0, "delta": delta})
+                send("content_block_stop", {"index": 0})
+                send("message_delta", {
+                    "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                    "usage": {"output_tokens": anthropic_usage["output_tokens"]}
+                })
+                send("message_stop", {})
+
+        return Handler
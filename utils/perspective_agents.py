@@ -1,11 +1,15 @@
-from langchain.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import ChatPromptTemplate, PromptTemplate
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional
 import json
 from pathlib import Path
+from .async_utils import run_sync
+from .llm_backend import LLMBackend, model_name_of
+from .streaming import astream_text_field
+from .response_cache import ResponseCache, make_cache_key, normalize_text, hash_prompts
+from .request_context import current_request, record_cache
+from .single_flight import SingleFlight
+from .tracing import span
 
 # 추출 결과 모델 정의
 class DiscoveringSteps(BaseModel):
@@ -58,38 +62,41 @@ discover_template = PromptTemplate(
         """
     )
 )
-discover_template_v2 = PromptTemplate(
-    input_variables=["diary_entry", "life_orientation", "life_orientation_desc", "highlight"],
-    template=(
-        """
-        당신은 {life_orientation} 관점을 통해 세상을 바라보며, 다른 사람들이 새로운 관점과 건설적인 생각을 발견할 수 있도록 돕는 역할입니다. 
-        {life_orientation_desc}
-        당신의 임무는 {life_orientation} 시각으로 일기를 읽고, 의미의 재해석이나 인사이트가 필요한 부분을 식별하는 것입니다.
+# 관점 발견 프롬프트 (v3): 제공자 측 프롬프트 캐시가 적중하도록 모든 요청에서 바이트 단위로 동일한 지시문과
+# 형식 지시문을 앞에 두고, 관점별 내용(요청 전에 미리 채워 둠)과 일기를 뒤에 둔다.
+discover_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
+        당신은 주어진 관점을 통해 세상을 바라보며, 다른 사람들이 새로운 관점과 건설적인 생각을 발견할 수 있도록 돕는 역할입니다.
+        당신의 임무는 주어진 관점의 시각으로 일기를 읽고, 의미의 재해석이나 인사이트가 필요한 부분을 식별하는 것입니다.
 
-        [작업 지시] 
+        [작업 지시]
         1. 사용자의 일기를 읽고 다음 요소를 깊이 이해하세요:
         - 사용자가 표현한 감정과 생각
         - 기술된 사건의 맥락과 배경
-        - 암묵적인 고민, 욕구 또는 어려움 
+        - 암묵적인 고민, 욕구 또는 어려움
 
-        2. 이러한 이해를 바탕으로, 일기에서 {life_orientation} 관점으로 재해석할 수 있는 부분 1~3개를 식별하세요. 다음을 고려하세요:
+        2. 이러한 이해를 바탕으로, 일기에서 주어진 관점으로 재해석할 수 있는 부분 1~3개를 식별하세요.
 
         3. 발견한 새로운 시각이나 해석은 다음을 준수해야 합니다:
         - 원본 일기의 사실(사건, 행동, 감정, 생각)을 유지
-        - {highlight}을 강조하되, 너무 거창한 해석은 자제
+        - 관점의 강조점을 강조하되, 너무 거창한 해석은 자제
         - 감정과 생각을 존중하고 인정하면서 건설적인 관점을 부드럽게 소개
         - 사용자의 고유한 상황을 반영하여 적절하고 공감적인 내용 제공
 
-        
+        {format_instructions}
+        """),
+    ("system", """
+        [관점]
+        {life_orientation}: {life_orientation_desc}
+        강조점: {highlight}
+        """),
+    ("human", """
         [일기]
         ```
         {diary_entry}
         ```
-
-        {format_instructions}
-        """
-    )
-)
+        """),
+])
 
 # 두 번째 프롬프트 템플릿: 내용 증강
 augment_template = PromptTemplate(
@@ -128,23 +135,30 @@ augment_template = PromptTemplate(
         """
     )
 )
-augment_template_v2 = PromptTemplate(
-    input_variables=["diary_entry", "life_orientation", "highlight", "relevant_points"],
-    template=(
-        """
-        당신은 이 일기의 작성자가 되어, {life_orientation}적인 관점과 인사이트를 원본 일기에 자연스럽게 통합하는 역할을 합니다. 최종적으로 완성된 일기는 마치 처음부터 작성자가 직접 쓴 것처럼 읽혀야 하며, 원본에 드러나지 않았던 미묘하면서도 새로운 의미와 관점을 포함하여 작성자가 자신의 경험을 다시 돌아볼 수 있어야 합니다.
+# 증강 프롬프트 (v3): 발견 프롬프트와 같은 순서로 정적 지시문 -> 관점 -> 일기와 발췌를 배치
+augment_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
+        당신은 이 일기의 작성자가 되어, 주어진 관점과 인사이트를 원본 일기에 자연스럽게 통합하는 역할을 합니다. 최종적으로 완성된 일기는 마치 처음부터 작성자가 직접 쓴 것처럼 읽혀야 하며, 원본에 드러나지 않았던 미묘하면서도 새로운 의미와 관점을 포함하여 작성자가 자신의 경험을 다시 돌아볼 수 있어야 합니다.
 
         [작업 지시]
         1. 원본 일기의 어휘, 문장 구조, 전반적인 어조를 따라하세요.
 
-        2. {life_orientation} 관점에서 의미/관점/시각을 생성할 때:
+        2. 주어진 관점에서 의미/관점/시각을 생성할 때:
         - 원본 일기의 사실(사건, 행동, 감정)을 유지하세요.
-        - 제시된 발췌문을 참고하여 적절한 위치에 새로운 관점/의미/재해석을 덧붙이세요. 
+        - 제시된 발췌문을 참고하여 적절한 위치에 새로운 관점/의미/재해석을 덧붙이세요.
         - 관점 설명은 그대로 복사하지 말고 영감으로만 삼으십시오.
-        - {highlight}에 집중하되, 원본 글의 내러티브, 감정적 연속성을 고려하여 너무 거창하게 쓰지 않도록 합니다.
+        - 관점의 강조점에 집중하되, 원본 글의 내러티브, 감정적 연속성을 고려하여 너무 거창하게 쓰지 않도록 합니다.
         - 일상적이고 쉬운 표현을 쓰고 문장길이는 짧게 유지하세요.
         - 스스로에게 제안하거나 질문하는 어조를 사용하세요.
 
+        {format_instructions}
+        """),
+    ("system", """
+        [관점]
+        {life_orientation}
+        강조점: {highlight}
+        """),
+    ("human", """
         [입력]
         1. 원본 일기:
         ```
@@ -154,22 +168,23 @@ augment_template_v2 = PromptTemplate(
         ```
         {relevant_points}
         ```
-
-        {format_instructions}
-        """
-    )
-)
+        """),
+])
 
 
 class PerspectiveAgent:
-    def __init__(self, api_key_gpt: str, api_key_claude: str):
+    def __init__(self, api_key_gpt: str, api_key_claude: str, cache: Optional[ResponseCache] = None,
+                 backend: Optional[LLMBackend] = None):
+        self.backend = backend or LLMBackend(api_key_gpt)
+        self.cache = cache  # 발견/증강 단계 결과 캐시 (None이면 사용 안 함)
+        self.prefetcher = None  # 발견 단계 선실행기 (DiaryAnalyzer가 설정)
+        self.inflight = SingleFlight("perspective_agent")  # 톤만 다른 동시 요청이 발견 / 증강 단계를 함께 씀
         self.life_orientations = self._load_life_orientations()
-        self.gpt = ChatOpenAI(
-            model_name="gpt-4o",
-            temperature=1.0,
-            openai_api_key=api_key_gpt
-        )
+        # 제공자별 모델 (체인은 라우터로 묶어 헤징 / 장애 조치)
+        self.models = self.backend.chat_models("gpt-4o", temperature=1.0)
+        self.gpt = self.models[self.backend.providers[0]]
         """
+        # from langchain_anthropic import ChatAnthropic
         self.claude = ChatAnthropic(
             model="claude-3-5-haiku-20241022",
             temperature=1.0,
@@ -179,8 +194,21 @@ class PerspectiveAgent:
             api_key=api_key_claude
         )
         """
-        self.discover_parser = PydanticOutputParser(pydantic_object=DiscoveredResults)
-        self.augment_parser = PydanticOutputParser(pydantic_object=AugmentResult)
+        # 체인은 관점별로 한 번만 생성 (관점 설명을 미리 채워 둠)
+        self.discover_chains = {orient: self._create_discover_chain(orient) for orient in self.life_orientations}
+        self.augment_chains = {orient: self._create_augment_chain(orient) for orient in self.life_orientations}
+        self.augment_stream_chains = {
+            orient: self._create_augment_stream_chain(orient) for orient in self.life_orientations
+        }
+        self.augment_candidate_chains = {}  # (관점, 후보 수) -> 후보 n개를 만드는 체인 (처음 쓸 때 생성)
+        self.prompt_version = hash_prompts(
+            discover_prompt,
+            augment_prompt,
+            self.life_orientations,
+            model_name_of(self.gpt),
+            self.backend.base_url,
+            {"structured_output": self.backend.structured_output}
+        )
     
     
     def _load_life_orientations(self) -> Dict:
@@ -189,64 +217,222 @@ class PerspectiveAgent:
         with open(json_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def _create_discover_chain(self):
+    def _create_discover_chain(self, life_orientation: str):
         """주어진 관점에서 다시 바라볼 포인트를 발견하는 체인 생성"""
-        return discover_template_v2 | self.gpt | self.discover_parser
+        prompt = discover_prompt.partial(
+            life_orientation=life_orientation,
+            life_orientation_desc=self.get_life_orientation_definition(life_orientation),
+            highlight=self.get_life_orientation_highlights(life_orientation)
+        )
+        return self.backend.routed_chain(
+            "discover", self.models, lambda model: self.backend.structured_chain(prompt, model, DiscoveredResults)
+        )
     
-    def _create_augment_chain(self):
+    def _create_augment_chain(self, life_orientation: str, streaming: bool = False):
         """검토를 마친 포인트를 적용하여 일기 증강"""
-        return augment_template_v2 | self.gpt | self.augment_parser
+        prompt = augment_prompt.partial(
+            life_orientation=life_orientation,
+            highlight=self.get_life_orientation_highlights(life_orientation)
+        )
+        return self.backend.routed_chain(
+            "augment", self.models, lambda model: self.backend.structured_chain(prompt, model, AugmentResult, streaming)
+        )
     
-    def augment_from_perspective(self, diary_entry: str, life_orientation: str) -> str:
+    def _create_augment_stream_chain(self, life_orientation: str):
+        """증강 결과를 부분 JSON으로 스트리밍하는 체인 생성"""
+        return self._create_augment_chain(life_orientation, streaming=True)
+
+    def _create_augment_candidates_chain(self, life_orientation: str, n: int):
+        """한 번의 호출로 증강 후보 n개를 만드는 체인 생성"""
+        prompt = augment_prompt.partial(
+            life_orientation=life_orientation,
+            highlight=self.get_life_orientation_highlights(life_orientation)
+        )
+        return self.backend.routed_chain(
+            "augment", self.models, lambda model: self.backend.candidates_chain(prompt, model, AugmentResult, n)
+        )
+
+    def _get_chain(self, chains: Dict, life_orientation: str):
+        """미리 만들어 둔 관점별 체인 반환"""
+        if life_orientation not in chains:
+            raise ValueError(f"정의되지 않은 관점입니다: {life_orientation}")
+        return chains[life_orientation]
+    
+    def augment_from_perspective(self, diary_entry: str, life_orientation: str, use_cache: bool = True) -> str:
+        """주어진 관점에서 일기를 분석하고 증강 (동기 래퍼)"""
+        return run_sync(self.aaugment_from_perspective(diary_entry, life_orientation, use_cache))
+
+    async def aaugment_from_perspective(self, diary_entry: str, life_orientation: str, use_cache: bool = True) -> str:
         """주어진 관점에서 일기를 분석하고 증강"""
         try:
-            life_orientations_desc = self.get_life_orientation_definition(life_orientation)
-            life_orientations_highlight = self.get_life_orientation_highlights(life_orientation)
+            # 같은 일기와 관점으로 이미 증강했다면 재사용 (톤만 바뀐 경우)
+            cached = self._get_stage_cache("augment", diary_entry, life_orientation, use_cache)
+            if cached is not None:
+                return cached
 
             # 1. 주어진 관점으로 재해석할 포인트 발견
-            discovery_chain = self._create_discover_chain()
-            
-            discovery_result = discovery_chain.invoke({
-                "diary_entry": diary_entry,
-                "life_orientation": life_orientation,
-                "life_orientation_desc": life_orientations_desc,
-                "highlight": life_orientations_highlight,
-                "format_instructions": self.discover_parser.get_format_instructions()
-            })
-            print("Discovery Result Type:", type(discovery_result))
-            print("Discovery Result Content:", discovery_result)
-
-            # discovery_result는 이미 DiscoveredResults 객체이므로
-            # points 속성을 직접 사용하면 됩니다
-            extracted_points = discovery_result.points
+            discovery_result = await self.adiscover(diary_entry, life_orientation, use_cache, use_prefetch=use_cache)
 
             # 2. 주어진 관점으로 일기 증강
-            points = []
-            for point in extracted_points:
-                print("\n- ", point)
-                points.append(point)
-            
-            points_str = "\n========\n".join([
-                f"- Relevant excerpts: {j.quotes}\n- Interpretation: {j.new_perspective}" 
-                for j in points
-            ])
-            print("====================\n발견된 부분: ", points_str)
-            
-            augment_chain = self._create_augment_chain()
-            
-            augmented_result = augment_chain.invoke({
-                "diary_entry": diary_entry,
-                "relevant_points": points_str,  # 문자열로 변환된 버전 사용
-                "life_orientation": life_orientation,
-                "highlight": life_orientations_highlight,
-                "format_instructions": self.augment_parser.get_format_instructions()
-            })
-            print("====================\n", augmented_result.diary_entry)
-            return augmented_result.diary_entry
+            return await self.aaugment_stage(diary_entry, life_orientation, discovery_result, use_cache)
             
         except Exception as e:
             raise Exception(f"증강 중 오류 발생: {str(e)}")
 
+    async def aaugment_stage(self, diary_entry: str, life_orientation: str, discovery_result: DiscoveredResults,
+                             use_cache: bool = True) -> str:
+        """증강 단계만 실행 (캐시 확인 후, 같은 일기와 관점으로 진행 중인 증강이 있으면 합류)"""
+        cached = self._get_stage_cache("augment", diary_entry, life_orientation, use_cache)
+        if cached is not None:
+            return cached
+        return await self.inflight.do(
+            self._stage_cache_key("augment", diary_entry, life_orientation),
+            lambda: self.aaugment(diary_entry, life_orientation, discovery_result),
+            stage="augment"
+        )
+
+    async def astream_augment_from_perspective(self, diary_entry: str, life_orientation: str, use_cache: bool = True) -> AsyncIterator[str]:
+        """주어진 관점에서 일기를 분석하고, 증강된 일기를 생성되는 대로 조각 단위로 반환"""
+        try:
+            cached = self._get_stage_cache("augment", diary_entry, life_orientation, use_cache)
+            if cached is not None:
+                yield cached
+                return
+
+            discovery_result = await self.adiscover(diary_entry, life_orientation, use_cache, use_prefetch=use_cache)
+            async for chunk in self.astream_augment_stage(diary_entry, life_orientation, discovery_result, use_cache):
+                yield chunk
+        except Exception as e:
+            raise Exception(f"증강 중 오류 발생: {str(e)}")
+
+    async def astream_augment_stage(self, diary_entry: str, life_orientation: str, discovery_result: DiscoveredResults,
+                                    use_cache: bool = True) -> AsyncIterator[str]:
+        """증강 단계만 스트리밍 (캐시 확인 후, 같은 일기와 관점으로 진행 중인 스트림이 있으면 합류)"""
+        cached = self._get_stage_cache("augment", diary_entry, life_orientation, use_cache)
+        if cached is not None:
+            yield cached
+            return
+        async for chunk in self.inflight.stream(
+            self._stage_cache_key("augment", diary_entry, life_orientation),
+            lambda: self._astream_augment(diary_entry, life_orientation, discovery_result),
+            stage="augment"
+        ):
+            yield chunk
+
+    async def _astream_augment(self, diary_entry: str, life_orientation: str, discovery_result: DiscoveredResults) -> AsyncIterator[str]:
+        augment_chain = self._get_chain(self.augment_stream_chains, life_orientation)
+        chunks = []
+        with span("augment", model=model_name_of(self.gpt), life_orientation=life_orientation, streaming=True):
+            async for chunk in astream_text_field(
+                augment_chain,
+                self._build_augment_inputs(discovery_result, diary_entry)
+            ):
+                chunks.append(chunk)
+                yield chunk
+        self._set_stage_cache("augment", diary_entry, life_orientation, "".join(chunks))
+
+    async def adiscover(self, diary_entry: str, life_orientation: str, use_cache: bool = True, use_prefetch: bool = True) -> DiscoveredResults:
+        """주어진 관점으로 재해석할 포인트 발견"""
+        cached = self._get_stage_cache("discover", diary_entry, life_orientation, use_cache)
+        if cached is not None:
+            return DiscoveredResults.model_validate(cached)
+
+        # 관점 선택 시점에 이 세션이 미리 실행해 둔 결과가 있으면 사용
+        if self.prefetcher is not None and use_prefetch:
+            owner = (current_request() or {}).get("metadata", {}).get("session_id")
+            prefetched = await self.prefetcher.claim(owner, diary_entry, life_orientation)
+            record_cache("prefetch", "miss" if prefetched is None else "hit")
+            if prefetched is not None:
+                print("▶ 선실행된 발견 결과 사용")
+                return prefetched
+
+        # 선실행과 요청이 동시에 발견 단계를 시작해도 LLM 호출은 한 번
+        return await self.inflight.do(
+            self._stage_cache_key("discover", diary_entry, life_orientation),
+            lambda: self._adiscover(diary_entry, life_orientation),
+            stage="discover"
+        )
+
+    async def _adiscover(self, diary_entry: str, life_orientation: str) -> DiscoveredResults:
+        discovery_chain = self._get_chain(self.discover_chains, life_orientation)
+        
+        with span("discover", model=model_name_of(self.gpt), life_orientation=life_orientation):
+            discovery_result = await discovery_chain.ainvoke({"diary_entry": diary_entry})
+        print("Discovery Result Type:", type(discovery_result))
+        print("Discovery Result Content:", discovery_result)
+        self._set_stage_cache("discover", diary_entry, life_orientation, discovery_result.model_dump())
+        return discovery_result
+
+    async def aaugment(self, diary_entry: str, life_orientation: str, discovery_result: DiscoveredResults) -> str:
+        """발견된 포인트를 적용하여 일기 증강"""
+        augment_chain = self._get_chain(self.augment_chains, life_orientation)
+        
+        with span("augment", model=model_name_of(self.gpt), life_orientation=life_orientation):
+            augmented_result = await augment_chain.ainvoke(
+                self._build_augment_inputs(discovery_result, diary_entry)
+            )
+        print("====================\n", augmented_result.diary_entry)
+        self._set_stage_cache("augment", diary_entry, life_orientation, augmented_result.diary_entry)
+        return augmented_result.diary_entry
+
+    async def aaugment_candidates(self, diary_entry: str, life_orientation: str, discovery_result: DiscoveredResults, n: int) -> List[str]:
+        """발견된 포인트를 적용한 증강 후보 n개 (한 번의 호출)"""
+        self._get_chain(self.augment_chains, life_orientation)  # 정의되지 않은 관점 검사
+        if (life_orientation, n) not in self.augment_candidate_chains:
+            self.augment_candidate_chains[(life_orientation, n)] = self._create_augment_candidates_chain(life_orientation, n)
+        with span("augment", model=model_name_of(self.gpt), life_orientation=life_orientation, candidates=n):
+            results = await self.augment_candidate_chains[(life_orientation, n)].ainvoke(
+                self._build_augment_inputs(discovery_result, diary_entry)
+            )
+        return [result.diary_entry for result in results]
+
+    def _stage_cache_key(self, stage: str, diary_entry: str, life_orientation: str) -> str:
+        """단계 결과 캐시 키: 일기, 관점, 프롬프트 버전에만 의존"""
+        return make_cache_key(
+            f"perspective_agent.{stage}",
+            diary_entry=normalize_text(diary_entry),
+            life_orientation=life_orientation,
+            prompt_version=self.prompt_version
+        )
+
+    def _get_stage_cache(self, stage: str, diary_entry: str, life_orientation: str, use_cache: bool = True):
+        """단계 결과 캐시 조회 및 적중 여부 기록 (use_cache=False이면 조회하지 않음)"""
+        if self.cache is None:
+            return None
+        if not use_cache:
+            record_cache(stage, "bypass")
+            return None
+        cached = self.cache.get(self._stage_cache_key(stage, diary_entry, life_orientation))
+        record_cache(stage, "miss" if cached is None else "hit")
+        if cached is not None:
+            print(f"▶ {stage} 단계 캐시 사용")
+        return cached
+
+    def _set_stage_cache(self, stage: str, diary_entry: str, life_orientation: str, value):
+        """단계 결과 캐시 저장"""
+        if self.cache is not None:
+            self.cache.set(self._stage_cache_key(stage, diary_entry, life_orientation), value)
+
+    def _build_augment_inputs(self, discovery_result: DiscoveredResults, diary_entry: str) -> Dict:
+        """증강 체인의 요청별 입력 구성 (관점과 형식 지시문은 체인에 미리 채워져 있음)"""
+        # discovery_result는 이미 DiscoveredResults 객체이므로
+        # points 속성을 직접 사용하면 됩니다
+        points = []
+        for point in discovery_result.points:
+            print("\n- ", point)
+            points.append(point)
+        
+        points_str = "\n========\n".join([
+            f"- Relevant excerpts: {j.quotes}\n- Interpretation: {j.new_perspective}" 
+            for j in points
+        ])
+        print("====================\n발견된 부분: ", points_str)
+        
+        return {
+            "diary_entry": diary_entry,
+            "relevant_points": points_str  # 문자열로 변환된 버전 사용
+        }
+
     def get_life_orientation_definition(self, life_orientation: str) -> str:
         """특정 관점의 설명을 반환"""
         if life_orientation not in self.life_orientations:
@@ -1,10 +1,12 @@
 from langchain.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
-from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import Dict, List, Optional
 import json
 from pathlib import Path
+from .async_utils import run_sync
+from .llm_backend import LLMBackend
+from .relevance import RELEVANCE_FILTERS, LLMRelevanceFilter, LocalRelevanceFilter, RelevanceFilter
+from .tracing import span
 
 # 추출 결과 모델 정의
 class DiscoveringSteps(BaseModel):
@@ -99,16 +101,18 @@ augment_template = PromptTemplate(
 
 
 class PerspectiveManager:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, judge_concurrency: int = 5, backend: Optional[LLMBackend] = None,
+                 relevance_filter: str = "local"):
+        backend = backend or LLMBackend(api_key)
+        self.judge_concurrency = judge_concurrency  # 판정 단계 동시 호출 상한
         self.life_orientations = self._load_life_orientations()
-        self.llm = ChatOpenAI(
-            model_name="gpt-4o-mini",
-            temperature=0.7,
-            openai_api_key=api_key
-        )
-        self.discovery_parser = PydanticOutputParser(pydantic_object=DiscoveredResults)
-        self.judgment_parser = PydanticOutputParser(pydantic_object=JudgmentResult)
-        self.augment_parser = PydanticOutputParser(pydantic_object=AugmentResult)
+        self.llm = backend.chat_model("gpt-4o-mini", temperature=0.7)
+        # 체인은 한 번만 생성
+        self.discovery_chain = self._create_discovery_chain(backend)
+        self.judgment_chain = self._create_judgment_chain(backend)
+        self.augment_chain = self._augment_diary_chain(backend)
+        # 발견된 포인트의 관련성 판정 (local: n-gram 유사도, llm: 포인트마다 판정 체인 호출)
+        self.relevance_filter = self._create_relevance_filter(relevance_filter)
     
     
     def _load_life_orientations(self) -> Dict:
@@ -117,29 +121,41 @@ class PerspectiveManager:
         with open(json_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def _create_discovery_chain(self):
+    def _create_discovery_chain(self, backend: LLMBackend):
         """긍정적/감사한 포인트를 발견하는 체인 생성"""
-        return extract_template | self.llm | self.discovery_parser
+        return backend.structured_chain(extract_template, self.llm, DiscoveredResults)
     
-    def _create_judgment_chain(self):
+    def _create_judgment_chain(self, backend: LLMBackend):
         """발견된 포인트의 관련성을 판단하는 체인 생성"""
-        return judge_template | self.llm | self.judgment_parser
+        return backend.structured_chain(judge_template, self.llm, JudgmentResult)
     
-    def _augment_diary_chain(self):
+    def _create_relevance_filter(self, kind: str) -> RelevanceFilter:
+        """관련성 판정 필터 생성"""
+        if kind not in RELEVANCE_FILTERS:
+            raise ValueError(f"지원하지 않는 관련성 필터입니다: {kind}")
+        if kind == "llm":
+            return LLMRelevanceFilter(self.judgment_chain, self.life_orientations, self.judge_concurrency)
+        return LocalRelevanceFilter(self.life_orientations)
+
+    def _augment_diary_chain(self, backend: LLMBackend):
         """검토를 마친 포인트를 적용하여 일기 증강"""
-        return augment_template | self.llm | self.augment_parser
+        return backend.structured_chain(augment_template, self.llm, AugmentResult)
     
     def augment_from_perspective(self, diary_entry: str, life_orientation: str, value: str) -> str:
+        """주어진 관점에서 일기를 분석하고 증강 (동기 래퍼)"""
+        return run_sync(self.aaugment_from_perspective(diary_entry, life_orientation, value))
+
+    async def aaugment_from_perspective(self, diary_entry: str, life_orientation: str, value: str) -> str:
         """주어진 관점에서 일기를 분석하고 증강"""
         try:
             # 1. 긍정적/감사한 포인트 발견
-            discovery_chain = self._create_discovery_chain()
-            discovery_result = discovery_chain.invoke({
-                "diary_entry": diary_entry,
-                "life_orientation": life_orientation,
-                "value": value,
-                "format_instructions": self.discovery_parser.get_format_instructions()
-            })
+            discovery_chain = self.discovery_chain
+            with span("discover", model=self.llm.model_name, life_orientation=life_orientation):
+                discovery_result = await discovery_chain.ainvoke({
+                    "diary_entry": diary_entry,
+                    "life_orientation": life_orientation,
+                    "value": value
+                })
             print("Discovery Result Type:", type(discovery_result))
             print("Discovery Result Content:", discovery_result)
 
@@ -148,20 +164,18 @@ class PerspectiveManager:
             extracted_points = discovery_result.points
 
             # 2. 각 포인트에 대한 관점 기반 판단
-            judgment_chain = self._create_judgment_chain()
-            life_orientations_desc = self.get_life_orientation_definition(life_orientation)
-            
-            judgments = []
-            for point in extracted_points:
-                print("\n각각: ", point.point)
-                judgment = judgment_chain.invoke({
-                    "life_orientation": life_orientation,
-                    "life_orientation_desc": life_orientations_desc,
-                    "point_json": point.model_dump_json(),
-                    "format_instructions": self.judgment_parser.get_format_instructions()
-                })
+            self.get_life_orientation_definition(life_orientation)  # 정의되지 않은 관점 검사
+            relevance_filter = self.relevance_filter
+            model = self.llm.model_name if relevance_filter.name == "llm" else relevance_filter.name
+            with span("judge", model=model, life_orientation=life_orientation, points=len(extracted_points)):
+                decisions = await relevance_filter.ajudge(diary_entry, extracted_points, life_orientation)
+            judgments = [
+                JudgmentResult(point=point, is_relevant=is_relevant, reasoning=reasoning)
+                for point, (is_relevant, reasoning) in zip(extracted_points, decisions)
+            ]
+            for judgment in judgments:
+                print("\n각각: ", judgment.point.point)
                 print("결과: ", judgment.is_relevant)
-                judgments.append(judgment)
             
             # 3. 관련성 있는 포인트들로 일기 증강
             relevant_points_str = "\n".join([
@@ -170,13 +184,13 @@ class PerspectiveManager:
             ])
             print("====================\n최종 선정: ", relevant_points_str)
             
-            augment_chain = self._augment_diary_chain()
-            augmented_result = augment_chain.invoke({
-                "diary_entry": diary_entry,
-                "relevant_points": relevant_points_str,  # 문자열로 변환된 버전 사용
-                "life_orientation": life_orientation,
-                "format_instructions": self.augment_parser.get_format_instructions()
-            })
+            augment_chain = self.augment_chain
+            with span("augment", model=self.llm.model_name, life_orientation=life_orientation):
+                augmented_result = await augment_chain.ainvoke({
+                    "diary_entry": diary_entry,
+                    "relevant_points": relevant_points_str,  # 문자열로 변환된 버전 사용
+                    "life_orientation": life_orientation
+                })
             return augmented_result.diary_entry
             
         except Exception as e:
@@ -0,0 +1,246 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import anthropic
+import openai
+from langchain_core.exceptions import OutputParserException
+
+from .request_context import ensure_request_scope
+from .tracing import tracer
+
+# 다시 시도하면 성공할 수 있는 오류: 제한 시간 초과, 연결 / 속도 제한 / 서버 오류, 형식이 깨진 모델 출력
+# (잘못된 톤이나 관점 같은 입력 오류는 몇 번을 다시 해도 같으므로 재시도 / 대체 없이 바로 발생)
+TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    ConnectionError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    anthropic.APIConnectionError,
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+    OutputParserException,
+)
+
+
+class Stage:
+    """파이프라인 단계 하나: 실행 함수와 재시도 예산, 시도당 제한 시간
+
+    run(state)와 stream(state)는 state(요청 입력 + 앞 단계 출력이 단계 이름으로 들어 있는 dict)를 받는다.
+    fallback(state)이 있으면 일시적인 오류(TRANSIENT_ERRORS)로 재시도를 모두 실패했을 때 오류 대신 그 값을 이 단계의 출력으로 쓴다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Any]], Awaitable[Any]],
+        retries: int = 1,
+        timeout: Optional[float] = None,
+        fallback: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        stream: Optional[Callable[[Dict[str, Any]], AsyncIterator[str]]] = None
+    ):
+        self.name = name
+        self.run = run
+        self.retries = retries  # 첫 시도 외에 다시 시도할 횟수
+        self.timeout = timeout  # 시도당 제한 시간(초), 스트리밍은 첫 조각까지 (None이면 제한 없음)
+        self.fallback = fallback
+        self.stream = stream  # 마지막 단계로 스트리밍할 때 사용 (조각을 모두 이으면 run의 결과와 같음)
+
+
+class StageCheckpoints:
+    """끝나지 않은 요청의 단계별 출력을 잠시 보관하는 메모리 저장소
+
+    같은 요청(사용자, 일기, 관점, 방법)을 다시 보내면 저장된 단계는 건너뛰고 실패한 단계부터 다시 실행한다.
+    마지막 단계가 끝나면(대체 출력을 쓴 경우 포함) 지운다.
+    """
+
+    def __init__(self, ttl: float = 900.0, max_entries: int = 1000):
+        self.ttl = ttl  # 저장 후 이 시간(초)이 지나면 버림
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # 키 -> (만료 시각, 단계 이름 -> 출력)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                return {}
+            return dict(entry[1])
+
+    def save(self, key: str, stage: str, output: Any):
+        with self._lock:
+            _, outputs = self._entries.pop(key, (None, {}))
+            outputs[stage] = output
+            self._entries[key] = (time.monotonic() + self.ttl, outputs)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class StagePipeline:
+    """단계들을 차례로 실행하며 단계마다 출력을 체크포인트로 남기는 파이프라인
+
+    단계는 제한 시간 안에 끝나지 않거나 일시적인 오류가 나면 재시도 예산만큼 다시 실행되고(그 밖의 오류는 바로 발생), 실패한 시도가 쓴 토큰은
+    wasted_tokens로 요청 기록과 wasted_tokens_total 카운터에 남는다.
+    state["use_cache"]가 False(새로 받기)이면 저장된 체크포인트를 쓰지 않고 지운 뒤 처음부터 실행한다.
+    """
+
+    def __init__(self, name: str, stages: List[Stage], checkpoints: StageCheckpoints):
+        self.name = name
+        self.stages = stages
+        self.checkpoints = checkpoints
+
+    def _stages_until(self, until: Optional[str]) -> List[Stage]:
+        names = [stage.name for stage in self.stages]
+        return self.stages if until is None else self.stages[:names.index(until) + 1]
+
+    async def run(self, key: str, state: Dict[str, Any], until: Optional[str] = None) -> Any:
+        """until 단계(None이면 마지막 단계)까지 실행하고 그 출력 반환"""
+        stages = self._stages_until(until)
+        with ensure_request_scope() as record:
+            await self._run_stages(key, state, stages, record)
+            output = await self._run_stage(key, state, stages[-1], record, last=True)
+        return output
+
+    async def astream(self, key: str, state: Dict[str, Any], until: Optional[str] = None) -> AsyncIterator[str]:
+        """until 단계(None이면 마지막 단계) 앞까지 실행한 뒤, 그 단계의 출력을 조각 단위로 반환
+
+        첫 조각이 나오기 전에 실패하면 재시도 / 대체 출력을 쓰고, 조각을 내보낸 뒤의 실패는 그대로 발생시킨다
+        (앞 단계 체크포인트는 남아 있어 다시 요청하면 이 단계부터 실행).
+        """
+        stages = self._stages_until(until)
+        stage = stages[-1]
+        with ensure_request_scope() as record:
+            await self._run_stages(key, state, stages, record)
+            error = None
+            for attempt in range(stage.retries + 1):
+                tokens_before = self._used_tokens(record)
+                stream = stage.stream(state)
+                emitted = False
+                try:
+                    first = await self._first_chunk(stream, stage.timeout)
+                    if first is not None:
+                        emitted = True
+                        yield first
+                        async for chunk in stream:
+                            yield chunk
+                    self._finish(key, stage, record, last=True)
+                    return
+                except Exception as e:
+                    if emitted:
+                        raise
+                    error = self._note_failure(stage, attempt, e, record, tokens_before)
+                    if not isinstance(e, TRANSIENT_ERRORS):
+                        raise
+                finally:
+                    await stream.aclose()
+            yield self._fall_back(key, state, stage, record, error, last=True)
+
+    async def _run_stages(self, key: str, state: Dict[str, Any], stages: List[Stage], record: Dict):
+        """마지막 단계 앞까지 실행 (체크포인트에 출력이 남은 단계는 건너뜀)"""
+        if state.get("use_cache", True):
+            saved = self.checkpoints.get(key)
+        else:
+            # 새로 받기는 이전 시도의 단계 출력도 다시 만듦
+            self.checkpoints.clear(key)
+            saved = {}
+        for stage in stages:
+            if stage.name in saved and stage is not stages[-1]:
+                state[stage.name] = saved[stage.name]
+                continue
+            if saved and record["pipeline"]["resumed_from"] is None:
+                record["pipeline"]["resumed_from"] = stage.name
+                print(f"▶ {self.name}: 체크포인트 사용, {stage.name} 단계부터 재개")
+            if stage is stages[-1]:
+                return
+            await self._run_stage(key, state, stage, record)
+
+    async def _run_stage(self, key: str, state: Dict[str, Any], stage: Stage, record: Dict, last: bool = False) -> Any:
+        error = None
+        for attempt in range(stage.retries + 1):
+            tokens_before = self._used_tokens(record)
+            try:
+                output = await asyncio.wait_for(stage.run(state), stage.timeout)
+            except Exception as e:
+                error = self._note_failure(stage, attempt, e, record, tokens_before)
+                if not isinstance(e, TRANSIENT_ERRORS):
+                    raise
+                continue
+            state[stage.name] = output
+            self._finish(key, stage, record, last, output)
+            return output
+        return self._fall_back(key, state, stage, record, error, last)
+
+    def _finish(self, key: str, stage: Stage, record: Dict, last: bool, output: Any = None):
+        record["pipeline"]["attempts"][stage.name] = record["pipeline"]["attempts"].get(stage.name, 0) + 1
+        if last:
+            self.checkpoints.clear(key)
+        else:
+            self.checkpoints.save(key, stage.name, output)
+
+    def _fall_back(self, key: str, state: Dict[str, Any], stage: Stage, record: Dict, error: Exception, last: bool) -> Any:
+        """재시도를 모두 실패한 단계: 대체 출력이 있으면 쓰고, 없으면 마지막 오류 발생
+
+        오류를 발생시키면 체크포인트는 남겨 두고, 마지막 단계를 대체 출력으로 끝내면 지운다
+        (남겨 두면 TTL 동안 다시 보낸 요청이 이전 단계 출력을 재사용함).
+        """
+        if stage.fallback is None:
+            raise error
+        print(f"▶ {self.name}: {stage.name} 단계 실패, 이전 단계 결과로 대체")
+        tracer.count("stage_fallbacks_total", span=stage.name)
+        record["pipeline"]["fallback"] = stage.name
+        output = stage.fallback(state)
+        state[stage.name] = output
+        if last:
+            self.checkpoints.clear(key)
+        else:
+            self.checkpoints.save(key, stage.name, output)
+        return output
+
+    def _note_failure(self, stage: Stage, attempt: int, error: Exception, record: Dict, tokens_before: int) -> Exception:
+        """실패한 시도를 요청 기록과 카운터에 남기고, 제한 시간 초과는 알아보기 쉬운 오류로 바꿔 반환"""
+        if isinstance(error, asyncio.TimeoutError):
+            error = TimeoutError(f"{stage.name} 단계가 {stage.timeout}초 안에 끝나지 않았습니다.")
+        wasted = self._used_tokens(record) - tokens_before
+        print(f"▶ {self.name}: {stage.name} 단계 실패 ({attempt + 1}/{stage.retries + 1}회, 토큰 {wasted}개): {error}")
+        record["pipeline"]["failures"][stage.name] = record["pipeline"]["failures"].get(stage.name, 0) + 1
+        record["pipeline"]["wasted_tokens"] += wasted
+        tracer.count("stage_failures_total", span=stage.name)
+        tracer.count("wasted_tokens_total", value=wasted, span=stage.name)
+        return error
+
+    @staticmethod
+    def _used_tokens(record: Dict) -> int:
+        return record["tokens"]["prompt_tokens"] + record["tokens"]["completion_tokens"]
+
+    @staticmethod
+    async def _first_chunk(stream: AsyncIterator[str], timeout: Optional[float]) -> Optional[str]:
+        """첫 조각을 제한 시간 안에 받음 (스트림이 비어 있으면 None)
+
+        wait_for는 새 task에서 실행되어 스트림 안의 span 컨텍스트가 끊기므로, 현재 task를 직접 취소한다.
+        """
+        handle = None
+        timed_out = []
+        if timeout is not None:
+            task = asyncio.current_task()
+            handle = asyncio.get_running_loop().call_later(timeout, lambda: (timed_out.append(True), task.cancel()))
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+        except asyncio.CancelledError:
+            if not timed_out:
+                raise
+            if hasattr(task, "uncancel"):
+                task.uncancel()
+            raise asyncio.TimeoutError()
+        finally:
+            if handle is not None:
+                handle.cancel()
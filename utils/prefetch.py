@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .async_utils import submit
+from .response_cache import normalize_text
+
+
+class DiscoveryPrefetcher:
+    """관점을 고른 시점에 발견 단계를 미리 실행해 두는 추측 실행기
+
+    사용자(owner, 세션 ID)마다 최신 (일기, 관점) 조합 하나만 유지한다. 입력이 바뀌면 이전 작업을 취소하고,
+    입력이 idle_delay 동안 그대로일 때만 실제 LLM 호출을 시작한다. 결과는 예약한 사용자만 가져갈 수 있고,
+    가져간 뒤에는 입력만 사용됨 표시로 남겨(결과는 놓음) 같은 입력으로 다시 예약해도 다시 실행하지 않는다.
+    사용자 항목은 예약할 때 정리한다: idle_ttl 동안 예약이 없던 사용자와, max_owners를 넘는 가장 오래된 사용자를 지운다.
+    모든 상태는 공유 이벤트 루프 안에서만 다룬다.
+    """
+
+    def __init__(self, discover: Callable[[str, str], Awaitable[Any]], idle_delay: float = 1.5,
+                 idle_ttl: float = 1800.0, max_owners: int = 1000):
+        self._discover = discover  # (diary_entry, life_orientation) -> 발견 결과
+        self.idle_delay = idle_delay
+        self.idle_ttl = idle_ttl  # 마지막 예약 후 이 시간(초)이 지난 사용자 항목은 지움
+        self.max_owners = max_owners  # 유지할 사용자 항목 수 상한 (넘으면 오래된 순으로 지움)
+        # owner -> (입력, 작업, 마지막 예약 시각), 마지막 예약이 오래된 순서. 작업이 None이면 결과를 이미 가져간 입력
+        self._by_owner: "OrderedDict[str, Tuple[Tuple[str, str], Optional[asyncio.Task], float]]" = OrderedDict()
+        self._started: Dict[asyncio.Task, bool] = {}
+
+    @staticmethod
+    def _key(diary_entry: str, life_orientation: str) -> Tuple[str, str]:
+        return normalize_text(diary_entry), life_orientation
+
+    def schedule(self, owner: str, diary_entry: str, life_orientation: str):
+        """발견 단계 선실행 예약 (동기 코드에서 호출, 즉시 반환)"""
+        submit(self._aschedule(owner, diary_entry, life_orientation))
+
+    def cancel(self, owner: str):
+        """해당 사용자의 선실행 취소 (동기 코드에서 호출, 즉시 반환)"""
+        submit(self._acancel(owner))
+
+    async def _aschedule(self, owner: str, diary_entry: str, life_orientation: str):
+        key = self._key(diary_entry, life_orientation)
+        now = time.monotonic()
+        current = self._by_owner.get(owner)
+        if current is not None and current[0] == key:
+            # 같은 입력으로 다시 예약(Streamlit 재실행): 이미 실행 중이거나 가져간 입력이므로 시각만 갱신
+            self._by_owner[owner] = (key, current[1], now)
+            self._by_owner.move_to_end(owner)
+            return
+        # 입력이 바뀌었으면 이전 선실행은 더 이상 쓸모가 없으므로 대체
+        await self._acancel(owner)
+        task = asyncio.create_task(self._run(diary_entry, life_orientation))
+        self._started[task] = False
+        task.add_done_callback(self._forget)
+        self._by_owner[owner] = (key, task, now)
+        self._prune(now)
+        print(f"▶ 발견 단계 선실행 예약: {owner}, {life_orientation}")
+
+    async def _acancel(self, owner: str):
+        current = self._by_owner.pop(owner, None)
+        if current is not None and current[1] is not None:
+            current[1].cancel()
+
+    def _prune(self, now: float):
+        """오래 예약이 없던 사용자와 상한을 넘는 가장 오래된 사용자의 항목을 지움 (떠난 세션이 쌓이지 않도록)"""
+        while self._by_owner:
+            owner, (_, task, scheduled_at) = next(iter(self._by_owner.items()))
+            if len(self._by_owner) <= self.max_owners and now - scheduled_at < self.idle_ttl:
+                break
+            del self._by_owner[owner]
+            if task is not None:
+                task.cancel()
+
+    async def _run(self, diary_entry: str, life_orientation: str):
+        await asyncio.sleep(self.idle_delay)
+        self._started[asyncio.current_task()] = True
+        return await self._discover(diary_entry, life_orientation)
+
+    def _forget(self, task: asyncio.Task):
+        # 완료된 결과는 claim이 가져가거나 _prune이 지울 때까지 _by_owner에 남겨 두고, 시작 여부 표시만 정리
+        self._started.pop(task, None)
+        if task.cancelled():
+            for owner, (_, owned, _) in list(self._by_owner.items()):
+                if owned is task:
+                    del self._by_owner[owner]
+        elif task.exception() is not None:
+            # 가져가지 않은 실패도 "Task exception was never retrieved" 경고 없이 정리 (claim은 None을 받음)
+            print(f"▶ 발견 단계 선실행 실패: {task.exception()}")
+
+    async def claim(self, owner: Optional[str], diary_entry: str, life_orientation: str) -> Optional[Any]:
+        """owner가 예약한 선실행 결과를 가져감 (없거나, 입력이 다르거나, 아직 대기 중이거나, 이미 가져갔으면 None)"""
+        current = self._by_owner.get(owner) if owner is not None else None
+        if current is None:
+            return None
+        owned_key, task, scheduled_at = current
+        if task is None or owned_key != self._key(diary_entry, life_orientation):
+            return None
+        # 입력만 사용됨 표시로 남기고 작업(결과)은 놓음 (Streamlit 재실행이 같은 입력으로 다시 예약해도 _aschedule이 건너뜀)
+        self._by_owner[owner] = (owned_key, None, scheduled_at)
+        if not task.done() and not self._started.get(task, False):
+            # 아직 대기 중이면 기다리지 않고 호출자가 바로 실행
+            task.cancel()
+            return None
+        try:
+            return await task
+        except Exception:
+            return None  # 실패는 _forget이 기록
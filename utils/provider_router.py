@@ -0,0 +1,232 @@
+import asyncio
+import math
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .tracing import current_span, tracer
+
+_DONE = object()
+
+
+class LatencyWindow:
+    """단계 x 제공자별 최근 지연 시간과 성공 / 실패 기록"""
+
+    def __init__(self, size: int):
+        self.samples: deque = deque(maxlen=size)  # 지연 시간(초), 취소된 요청은 그때까지 걸린 시간(하한)
+        self.outcomes: deque = deque(maxlen=size)  # 완료된 요청의 성공 여부
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else math.inf
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ProviderRouter:
+    """단계별로 제공자(OpenAI, Anthropic 등)를 고르고, 느린 요청을 다른 제공자로 헤징하는 라우터
+
+    1순위 제공자가 관측된 지연 시간의 hedge_percentile 백분위까지 응답하지 않으면 2순위에 같은 요청을 보내고,
+    먼저 도착한 유효한(출력 파서를 통과한) 결과를 쓰며 나머지는 취소한다. 1순위가 실패하면 바로 다음 제공자로 넘어간다.
+    단계별 지연 시간 중앙값과 오류율이 더 나은 제공자가 자동으로 1순위가 된다.
+    """
+
+    def __init__(
+        self,
+        hedge_percentile: float = 0.9,
+        hedging: bool = True,
+        min_samples: int = 10,
+        default_hedge_delay: float = 8.0,
+        min_hedge_delay: float = 0.3,
+        max_hedge_delay: float = 30.0,
+        window: int = 200
+    ):
+        self.hedge_percentile = hedge_percentile  # 이 백분위 지연 시간이 지나면 헤징
+        self.hedging = hedging  # False면 헤징 없이 실패 시 다음 제공자로만 넘어감
+        self.min_samples = min_samples  # 관측치가 이보다 적으면 기본 순서와 default_hedge_delay 사용
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.window = window
+        self._windows: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+    def _window(self, stage: str, provider: str) -> LatencyWindow:
+        key = (stage, provider)
+        if key not in self._windows:
+            self._windows[key] = LatencyWindow(self.window)
+        return self._windows[key]
+
+    def _record(self, stage: str, provider: str, seconds: float, ok: Optional[bool]):
+        """지연 시간 기록 (ok가 None이면 취소된 요청으로, 성공 / 실패에는 넣지 않음)"""
+        with self._lock:
+            window = self._window(stage, provider)
+            window.samples.append(seconds)
+            if ok is not None:
+                window.outcomes.append(ok)
+
+    def order(self, stage: str, providers: List[str]) -> List[str]:
+        """관측된 지연 시간 중앙값(오류율만큼 불이익)이 짧은 순서로 제공자 정렬 (관측치가 부족하면 주어진 순서)"""
+        with self._lock:
+            windows = [self._window(stage, provider) for provider in providers]
+            if any(len(window.samples) < self.min_samples for window in windows):
+                return list(providers)
+            scores = {
+                provider: window.percentile(0.5) * (1 + 4 * window.error_rate())
+                for provider, window in zip(providers, windows)
+            }
+        return sorted(providers, key=lambda provider: scores[provider])
+
+    def hedge_delay(self, stage: str, provider: str) -> float:
+        """헤징 요청을 보내기까지 기다릴 시간(초)"""
+        if not self.hedging:
+            return math.inf
+        with self._lock:
+            window = self._window(stage, provider)
+            if len(window.samples) < self.min_samples:
+                return self.default_hedge_delay
+            delay = window.percentile(self.hedge_percentile)
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    async def _race(self, stage: str, providers: List[str],
+                    start: Callable[[str], Awaitable[Any]]) -> Tuple[str, Any]:
+        """providers 순서로 요청을 시작해 먼저 성공한 (제공자, 결과) 반환"""
+        loop = asyncio.get_running_loop()
+        order = self.order(stage, providers)
+        waiting = list(order)
+        pending: Dict[asyncio.Future, str] = {}
+        started: Dict[str, float] = {}
+        errors: List[BaseException] = []
+
+        def launch() -> float:
+            provider = waiting.pop(0)
+            started[provider] = loop.time()
+            pending[asyncio.ensure_future(start(provider))] = provider
+            return started[provider] + self.hedge_delay(stage, provider)
+
+        deadline = launch()
+        try:
+            while pending:
+                timeout = max(0.0, deadline - loop.time()) if waiting and deadline != math.inf else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 응답이 늦어 다음 제공자에 같은 요청을 보냄
+                    print(f"▶ {stage}: {', '.join(pending.values())} 응답 지연, {waiting[0]}(으)로 헤징")
+                    tracer.count("hedged_requests_total", provider=waiting[0])
+                    deadline = launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    elapsed = loop.time() - started[provider]
+                    if task.exception() is None:
+                        self._record(stage, provider, elapsed, ok=True)
+                        if provider != order[0]:
+                            tracer.count("hedge_wins_total", provider=provider)
+                        return provider, task.result()
+                    self._record(stage, provider, elapsed, ok=False)
+                    errors.append(task.exception())
+                    print(f"▶ {stage}: {provider} 요청 실패 ({type(task.exception()).__name__})")
+                # 진행 중인 요청이 모두 실패했으면 기다리지 않고 다음 제공자로 넘어감
+                if not pending and waiting:
+                    tracer.count("provider_failovers_total", provider=waiting[0])
+                    deadline = launch()
+            raise errors[0]
+        finally:
+            for task, provider in pending.items():
+                task.cancel()
+                self._record(stage, provider, loop.time() - started[provider], ok=None)
+
+    async def ainvoke(self, stage: str, chains: Dict[str, Any], inputs: Dict[str, Any]) -> Tuple[str, Any]:
+        """제공자별 체인 중 먼저 유효한 결과를 낸 쪽의 (제공자, 결과) 반환"""
+        return await self._race(stage, list(chains), lambda provider: chains[provider].ainvoke(inputs))
+
+    async def astream(self, stage: str, chains: Dict[str, Any], inputs: Dict[str, Any],
+                      on_winner: Optional[Callable[[str], None]] = None) -> AsyncIterator[Any]:
+        """제공자별 스트리밍 체인 중 첫 조각이 먼저 도착한 쪽의 스트림을 반환 (헤징 기준은 첫 조각까지의 시간)"""
+        queues: Dict[str, asyncio.Queue] = {}
+        pumps: Dict[str, asyncio.Task] = {}
+
+        async def pump(provider: str):
+            try:
+                async for item in chains[provider].astream(inputs):
+                    queues[provider].put_nowait((item, None))
+                queues[provider].put_nowait((_DONE, None))
+            except Exception as e:
+                queues[provider].put_nowait((_DONE, e))
+
+        async def first_item(provider: str):
+            queues[provider] = asyncio.Queue()
+            pumps[provider] = asyncio.ensure_future(pump(provider))
+            item, error = await queues[provider].get()
+            if item is _DONE:
+                raise error or ValueError(f"{provider} 응답이 비어 있습니다.")
+            return item
+
+        try:
+            winner, first = await self._race(stage, list(chains), first_item)
+            for provider, task in pumps.items():
+                if provider != winner:
+                    task.cancel()
+            if on_winner is not None:
+                on_winner(winner)
+            yield first
+            while True:
+                item, error = await queues[winner].get()
+                if item is _DONE:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            for task in pumps.values():
+                task.cancel()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """단계 x 제공자별 관측치 수, 지연 시간 백분위, 오류율"""
+        with self._lock:
+            return {
+                f"{stage}/{provider}": {
+                    "samples": len(window.samples),
+                    "p50_s": window.percentile(0.5),
+                    "p90_s": window.percentile(0.9),
+                    "error_rate": window.error_rate(),
+                }
+                for (stage, provider), window in sorted(self._windows.items())
+                if window.samples
+            }
+
+
+class RoutedChain:
+    """제공자별로 만든 같은 체인을 묶어, 라우터를 거쳐 실행하는 체인 (ainvoke / astream만 지원)"""
+
+    def __init__(self, stage: str, chains: Dict[str, Any], model_names: Dict[str, str], router: ProviderRouter):
+        self.stage = stage
+        self.chains = chains  # 제공자 -> 체인 (기본 우선순위 순)
+        self.model_names = model_names
+        self.router = router
+
+    def _mark_winner(self, provider: str):
+        """현재 span에 실제로 응답한 제공자와 모델 기록"""
+        span = current_span()
+        if span is not None:
+            span.set(provider=provider, model=self.model_names[provider])
+
+    async def ainvoke(self, inputs: Dict[str, Any]) -> Any:
+        if len(self.chains) == 1:
+            provider, chain = next(iter(self.chains.items()))
+            self._mark_winner(provider)
+            return await chain.ainvoke(inputs)
+        provider, result = await self.router.ainvoke(self.stage, self.chains, inputs)
+        self._mark_winner(provider)
+        return result
+
+    async def astream(self, inputs: Dict[str, Any]) -> AsyncIterator[Any]:
+        if len(self.chains) == 1:
+            provider, chain = next(iter(self.chains.items()))
+            self._mark_winner(provider)
+            async for item in chain.astream(inputs):
+                yield item
+            return
+        async for item in self.router.astream(f"{self.stage}-stream", self.chains, inputs, on_winner=self._mark_winner):
+            yield item
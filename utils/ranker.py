@@ -0,0 +1,65 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 점수 항목별 가중치 (합이 1)
+DEFAULT_WEIGHTS = {"fidelity": 0.5, "length": 0.2, "novelty": 0.3}
+
+
+class CandidateRanker:
+    """여러 후보 일기를 LLM 호출 없이 점수화해 순서를 매기는 랭커
+
+    fidelity: 원본 일기의 문자 n-gram이 후보에 얼마나 남아 있는지 (원본의 사건과 표현을 지켰는지)
+    length: 후보 길이 / 원본 길이가 target_length_ratio에 얼마나 가까운지
+    novelty: 이미 보여 준 결과들과 얼마나 다른지 (1 - 가장 비슷한 결과와의 n-gram 유사도)
+    """
+
+    def __init__(self, ngram_size: int = 3, target_length_ratio: float = 1.5, weights: Optional[Dict[str, float]] = None):
+        self.ngram_size = ngram_size
+        self.target_length_ratio = target_length_ratio  # 증강 결과는 원본보다 조금 긴 것이 자연스러움
+        self.weights = weights or DEFAULT_WEIGHTS
+
+    def ngrams(self, text: str) -> Counter:
+        """공백을 하나로 합친 텍스트의 문자 n-gram 빈도"""
+        text = re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+        n = self.ngram_size
+        return Counter(text[i:i + n] for i in range(max(len(text) - n + 1, 0)))
+
+    @staticmethod
+    def similarity(a: Counter, b: Counter) -> float:
+        """n-gram 빈도의 Dice 계수 (0~1)"""
+        total = sum(a.values()) + sum(b.values())
+        return 2 * sum((a & b).values()) / total if total else 0.0
+
+    def score(self, candidate: str, original: str, previous: Sequence[str] = ()) -> Dict[str, float]:
+        """후보 하나의 항목별 점수와 가중합(score)"""
+        return self._score(candidate, self.ngrams(original), len(original or ""), [self.ngrams(text) for text in previous])
+
+    def rank(self, candidates: Sequence[str], original: str, previous: Sequence[str] = ()) -> List[Tuple[str, Dict[str, float]]]:
+        """후보를 점수가 높은 순서로 정렬한 (후보, 점수) 목록 (previous와 같은 후보는 제외)"""
+        original_ngrams = self.ngrams(original)
+        previous_ngrams = [self.ngrams(text) for text in previous]
+        shown = set(previous)
+        scored = [
+            (candidate, self._score(candidate, original_ngrams, len(original or ""), previous_ngrams))
+            for candidate in dict.fromkeys(candidates) if candidate and candidate not in shown
+        ]
+        return sorted(scored, key=lambda item: item[1]["score"], reverse=True)
+
+    def best(self, candidates: Sequence[str], original: str, previous: Sequence[str] = ()) -> Optional[str]:
+        """아직 보여 주지 않은 후보 중 가장 점수가 높은 후보 (없으면 None)"""
+        ranked = self.rank(candidates, original, previous)
+        return ranked[0][0] if ranked else None
+
+    def _score(self, candidate: str, original_ngrams: Counter, original_length: int, previous_ngrams: List[Counter]) -> Dict[str, float]:
+        candidate_ngrams = self.ngrams(candidate)
+        original_total = sum(original_ngrams.values())
+        fidelity = sum((original_ngrams & candidate_ngrams).values()) / original_total if original_total else 0.0
+        ratio = len(candidate) / original_length if original_length else 0.0
+        length = math.exp(-abs(math.log(ratio / self.target_length_ratio))) if ratio > 0 else 0.0
+        novelty = 1.0 - max((self.similarity(candidate_ngrams, ngrams) for ngrams in previous_ngrams), default=0.0)
+        scores = {"fidelity": fidelity, "length": length, "novelty": novelty}
+        scores["score"] = sum(self.weights[name] * value for name, value in scores.items())
+        return scores
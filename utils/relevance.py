@@ -0,0 +1,123 @@
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# 포인트 하나의 판정 결과: (관련 있음 여부, 이유)
+Judgment = Tuple[bool, str]
+
+
+class RelevanceFilter(ABC):
+    """발견된 포인트가 관점에 맞고 일기에 근거하는지 판정하는 필터
+
+    포인트는 point, quotes, reason 속성을 가진 객체(perspective_manager.DiscoveringSteps)이다.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def ajudge(self, diary_entry: str, points: Sequence[Any], life_orientation: str) -> List[Judgment]:
+        """포인트마다 (관련 있음 여부, 이유)를 입력 순서대로 반환"""
+
+
+class LLMRelevanceFilter(RelevanceFilter):
+    """포인트마다 판정 체인(judge_template)을 한 번씩 호출하는 필터"""
+
+    name = "llm"
+
+    def __init__(self, judgment_chain, life_orientations: Dict, concurrency: int = 5):
+        self.judgment_chain = judgment_chain
+        self.life_orientations = life_orientations
+        self.concurrency = concurrency  # 판정 단계 동시 호출 상한
+
+    async def ajudge(self, diary_entry: str, points: Sequence[Any], life_orientation: str) -> List[Judgment]:
+        # 모든 포인트를 동시에 판정 (abatch는 입력 순서대로 결과를 반환)
+        judgments = await self.judgment_chain.abatch(
+            [{
+                "life_orientation": life_orientation,
+                "life_orientation_desc": self.life_orientations[life_orientation]["definition"],
+                "point_json": point.model_dump_json()
+            } for point in points],
+            config={"max_concurrency": self.concurrency}
+        )
+        return [(judgment.is_relevant, judgment.reasoning) for judgment in judgments]
+
+
+class LocalRelevanceFilter(RelevanceFilter):
+    """LLM 호출 없이 문자 n-gram 유사도로 판정하는 필터 (포인트 수와 관계없이 수 밀리초)
+
+    grounding: 포인트의 quotes가 일기에 실제로 있는지 (quotes의 n-gram 중 일기에도 있는 비율)
+    alignment: 포인트의 reason이 관점과 맞는지 (reason과 관점 키워드(life_orientations.json의 highlight)의 n-gram 코사인 유사도)
+    둘 다 기준을 넘으면 관련 있음으로 판정하고, 하나도 넘지 못하면 min_keep개까지는 점수가 높은 순으로 남긴다.
+    """
+
+    name = "local"
+
+    def __init__(self, life_orientations: Dict, ngram_size: int = 2, grounding_threshold: float = 0.6,
+                 alignment_threshold: float = 0.1, min_keep: int = 1):
+        self.life_orientations = life_orientations
+        self.ngram_size = ngram_size
+        self.grounding_threshold = grounding_threshold
+        self.alignment_threshold = alignment_threshold
+        self.min_keep = min_keep  # 증강할 포인트가 하나도 없지 않도록 남길 최소 개수
+
+    def ngrams(self, text: str) -> List[str]:
+        """단어별 문자 n-gram (n보다 짧은 단어는 단어 그대로)"""
+        grams = []
+        n = self.ngram_size
+        for word in re.findall(r"\w+", unicodedata.normalize("NFC", text or "").lower()):
+            grams.extend([word] if len(word) <= n else [word[i:i + n] for i in range(len(word) - n + 1)])
+        return grams
+
+    def vectorize(self, texts: Sequence[str]) -> np.ndarray:
+        """텍스트 목록을 같은 어휘 위의 n-gram 빈도 행렬(텍스트 수 x 어휘 수)로 변환"""
+        vocabulary: Dict[str, int] = {}
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for gram in self.ngrams(text):
+                rows.append(row)
+                cols.append(vocabulary.setdefault(gram, len(vocabulary)))
+        matrix = np.zeros((len(texts), max(len(vocabulary), 1)))
+        np.add.at(matrix, (rows, cols), 1.0)
+        return matrix
+
+    def orientation_text(self, life_orientation: str) -> str:
+        """관점 키워드(highlight), 없으면 관점 설명 (설명은 길어 키워드와 겹치는 비중이 작아짐)"""
+        orientation = self.life_orientations[life_orientation]
+        return orientation.get("highlight") or orientation["definition"]
+
+    def score(self, diary_entry: str, points: Sequence[Any], life_orientation: str) -> Tuple[np.ndarray, np.ndarray]:
+        """포인트별 (grounding, alignment) 점수 배열"""
+        if not points:
+            return np.zeros(0), np.zeros(0)
+        matrix = self.vectorize(
+            [diary_entry, self.orientation_text(life_orientation)]
+            + [point.quotes for point in points] + [point.reason for point in points]
+        )
+        diary, orientation = matrix[0], matrix[1]
+        quotes, reasons = matrix[2:2 + len(points)], matrix[2 + len(points):]
+        grounding = np.minimum(quotes, diary).sum(axis=1) / np.maximum(quotes.sum(axis=1), 1.0)
+        norms = np.linalg.norm(reasons, axis=1) * np.linalg.norm(orientation)
+        alignment = reasons @ orientation / np.maximum(norms, 1e-9)
+        return grounding, alignment
+
+    def decide(self, grounding: np.ndarray, alignment: np.ndarray) -> np.ndarray:
+        """점수로 관련 여부 결정 (통과한 포인트가 min_keep개보다 적으면 점수 순으로 채움)"""
+        relevant = (grounding >= self.grounding_threshold) & (alignment >= self.alignment_threshold)
+        if relevant.sum() < self.min_keep:
+            for index in np.argsort(-(grounding + alignment))[:self.min_keep]:
+                relevant[index] = True
+        return relevant
+
+    async def ajudge(self, diary_entry: str, points: Sequence[Any], life_orientation: str) -> List[Judgment]:
+        grounding, alignment = self.score(diary_entry, points, life_orientation)
+        relevant = self.decide(grounding, alignment)
+        return [
+            (bool(is_relevant), f"원문 일치도 {g:.2f}, 관점 유사도 {a:.2f}")
+            for is_relevant, g, a in zip(relevant, grounding, alignment)
+        ]
+
+
+RELEVANCE_FILTERS = ("local", "llm")
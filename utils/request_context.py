@@ -0,0 +1,53 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# 현재 처리 중인 증강 요청의 기록. 공유 이벤트 루프로 넘어가도 contextvars로 전달된다.
+_current_request: ContextVar[Optional[Dict]] = ContextVar("current_request", default=None)
+
+
+@contextmanager
+def request_scope(**metadata) -> Iterator[Dict]:
+    """한 번의 증강 요청 동안 단계별 기록을 모으는 컨텍스트"""
+    record = {
+        "metadata": metadata,
+        "cache": {},  # 단계 이름 -> "hit" / "miss" / "bypass"
+        "tokens": {"prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "llm_calls": 0, "by_stage": {}},  # utils.tracing이 누적
+        "scheduler": {"queue_wait_s": 0.0, "retries": 0, "rate_limited": 0},  # utils.scheduler가 누적
+        # utils.pipeline이 기록: 재개한 단계, 단계별 성공 / 실패 횟수, 실패한 시도가 쓴 토큰, 대체 출력을 쓴 단계
+        "pipeline": {"resumed_from": None, "attempts": {}, "failures": {}, "wasted_tokens": 0, "fallback": None},
+        "children": {}  # 이름 -> 하위 요청의 기록 (sub_request_scope)
+    }
+    token = _current_request.set(record)
+    try:
+        yield record
+    finally:
+        _current_request.reset(token)
+
+
+@contextmanager
+def sub_request_scope(name: str, **metadata) -> Iterator[Dict]:
+    """현재 요청 안에서 기록을 따로 모으는 하위 요청 (메타데이터를 물려받고, 현재 기록의 children[name]에 연결)"""
+    parent = current_request()
+    with request_scope(**{**(parent or {}).get("metadata", {}), **metadata}) as record:
+        if parent is not None:
+            parent["children"][name] = record
+        yield record
+
+
+def current_request() -> Optional[Dict]:
+    """현재 요청의 기록 반환 (요청 컨텍스트 밖이면 None)"""
+    return _current_request.get()
+
+
+def ensure_request_scope():
+    """현재 요청 기록을 그대로 쓰거나, 요청 컨텍스트 밖이면 새 기록을 만드는 컨텍스트 (배치 스크립트 등)"""
+    record = current_request()
+    return nullcontext(record) if record is not None else request_scope()
+
+
+def record_cache(stage: str, outcome: str):
+    """현재 요청에 단계별 캐시 적중 여부 기록"""
+    record = current_request()
+    if record is not None:
+        record["cache"][stage] = outcome
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / '.cache' / 'responses.sqlite3'
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키 생성을 위한 텍스트 정규화 (유니코드 NFC, 줄바꿈 통일, 줄 끝 공백 제거)"""
+    text = unicodedata.normalize("NFC", text or "")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.strip().split("\n"))
+
+
+def make_cache_key(namespace: str, **parts: Any) -> str:
+    """네임스페이스와 키 구성 요소로 캐시 키 생성"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def _prompt_text(template: Any) -> str:
+    """문자열, PromptTemplate, ChatPromptTemplate, JSON 직렬화 가능한 설정을 해시용 문자열로 변환"""
+    if isinstance(template, str):
+        return template
+    if hasattr(template, "messages"):  # ChatPromptTemplate: 메시지 역할과 템플릿을 순서대로
+        return "\0".join(
+            f"{type(message).__name__}:{_prompt_text(getattr(message, 'prompt', message))}"
+            for message in template.messages
+        )
+    if hasattr(template, "template"):
+        return template.template
+    return json.dumps(template, sort_keys=True, ensure_ascii=False)
+
+
+def hash_prompts(*templates: Any) -> str:
+    """프롬프트 템플릿과 설정 내용의 해시 (프롬프트가 바뀌면 캐시 키도 바뀜)"""
+    hasher = hashlib.sha256()
+    for template in templates:
+        text = _prompt_text(template)
+        hasher.update(text.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()[:16]
+
+
+class ResponseCache:
+    """메모리 LRU 계층과 로컬 SQLite 파일로 구성된 2단계 응답 캐시"""
+
+    def __init__(
+        self,
+        path: Optional[Path] = DEFAULT_CACHE_PATH,
+        max_memory_entries: int = 256,
+        max_disk_entries: int = 5000,
+        ttl_seconds: float = 7 * 24 * 60 * 60
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (created_at, value)
+        self._lock = threading.Lock()
+        self._conn = self._connect(path) if path is not None else None
+
+    def _connect(self, path: Path) -> sqlite3.Connection:
+        """SQLite 캐시 파일 연결 및 테이블 생성"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses (created_at)")
+        conn.commit()
+        return conn
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """캐시된 값을 반환 (없거나 만료된 경우 None)"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value_json, created_at = row
+            if self._is_expired(created_at, now):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            value = json.loads(value_json)
+            self._remember(key, created_at, value)
+            return value
+
+    def set(self, key: str, value: Any):
+        """값을 메모리와 SQLite 양쪽에 저장 (값은 JSON 직렬화 가능해야 함)"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._evict_disk(now)
+            self._conn.commit()
+
+    def invalidate(self, key: str):
+        """특정 키 삭제"""
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+
+    def _remember(self, key: str, created_at: float, value: Any):
+        """메모리 LRU 계층에 저장하고 용량을 넘으면 가장 오래 쓰지 않은 항목 제거"""
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        """만료된 항목과 용량을 넘는 오래된 항목을 SQLite에서 제거"""
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_disk_entries,)
+        )
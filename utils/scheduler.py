@@ -0,0 +1,304 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from .async_utils import run_sync
+from .request_context import current_request
+from .tracing import current_span, estimate_tokens, span, tracer
+
+# 재시도할 응답 상태 (요청 한도 초과, 서버 과부하)
+RETRY_STATUSES = (429, 500, 502, 503, 504, 529)
+
+# 제공자별 남은 한도 응답 헤더 (요청 수, 토큰 수)
+RATE_LIMIT_HEADERS = {
+    "openai": ("x-ratelimit-remaining-requests", "x-ratelimit-remaining-tokens"),
+    "anthropic": ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-tokens-remaining"),
+}
+
+
+def provider_of(request: httpx.Request) -> Optional[str]:
+    """LLM 호출 요청의 제공자 (모델 목록 조회 같은 다른 요청은 None)"""
+    if request.method != "POST":
+        return None
+    path = request.url.path.rstrip("/")
+    if path.endswith("/chat/completions"):
+        return "openai"
+    if path.endswith("/messages"):
+        return "anthropic"
+    return None
+
+
+class TokenBucket:
+    """분당 한도(RPM 또는 TPM)를 초 단위로 채우는 토큰 버킷"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount만큼 꺼낼 수 있을 때까지 남은 시간(초), 한도보다 큰 요청은 한도만큼만 기다림"""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def clamp(self, remaining: float):
+        """제공자가 알려 준 남은 한도가 더 적으면 맞춤 (다른 프로세스와 한도를 나눠 쓰는 경우)"""
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class LLMScheduler:
+    """모든 LLM 호출 앞에서 제공자별 RPM / TPM 한도를 지키고, 사용자별로 공정하게 순서를 정하는 스케줄러
+
+    대기 중인 호출은 user_id별 큐에 들어가고, 한도가 허락할 때마다 사용자를 돌아가며 하나씩 내보낸다.
+    429나 5xx 응답은 Retry-After(없으면 지수 백오프 + 지터)만큼 기다린 뒤 다시 큐의 뒤로 들어가므로,
+    한 사용자의 재시도가 다른 사용자의 호출을 밀어내지 않는다. 429를 받으면 해당 제공자의 버킷을 비워 모두 속도를 늦춘다.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, float]]] = None,
+        max_retries: int = 4,
+        base_backoff: float = 0.5,
+        max_backoff: float = 20.0,
+        completion_tokens_estimate: int = 800
+    ):
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff  # 첫 재시도 대기 시간 상한(초), 재시도마다 두 배
+        self.max_backoff = max_backoff
+        self.completion_tokens_estimate = completion_tokens_estimate  # max_tokens가 없을 때 출력 토큰 추정치
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._queues: Dict[str, "OrderedDict[str, deque]"] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+        self._waits: deque = deque(maxlen=1000)  # 최근 대기 시간(초)
+        self._counts = {"granted": 0, "retries": 0, "rate_limited": 0}
+        self.configure(limits or {})
+
+    def configure(self, limits: Dict[str, Dict[str, float]]):
+        """제공자별 한도 설정, 예: {"openai": {"rpm": 500, "tpm": 30000}} (없는 제공자는 무제한)"""
+        with self._lock:
+            self._buckets = {
+                provider: (
+                    TokenBucket(limit["rpm"]) if limit.get("rpm") else None,
+                    TokenBucket(limit["tpm"]) if limit.get("tpm") else None,
+                )
+                for provider, limit in limits.items()
+                if limit.get("rpm") or limit.get("tpm")
+            }
+
+    def estimate_request_tokens(self, request: httpx.Request) -> int:
+        """요청 본문으로 추정한 프롬프트 + 최대 출력 토큰 수"""
+        try:
+            body = json.loads(request.content or b"{}")
+        except (ValueError, UnicodeDecodeError, httpx.RequestNotRead):
+            return self.completion_tokens_estimate
+        text = json.dumps(body.get("messages", []), ensure_ascii=False) + json.dumps(body.get("system", ""), ensure_ascii=False)
+        completion = body.get("max_tokens") or body.get("max_completion_tokens") or self.completion_tokens_estimate
+        return estimate_tokens(text) + completion * (body.get("n") or 1)
+
+    async def acquire(self, provider: str, tokens: int, user: Optional[str] = None) -> float:
+        """한도 안에서 차례가 올 때까지 기다리고 대기 시간(초) 반환"""
+        if provider not in self._buckets:
+            return 0.0
+        if user is None:
+            record = current_request()
+            user = str((record or {}).get("metadata", {}).get("user_id") or "-")
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        start = time.monotonic()
+        self._queues.setdefault(provider, OrderedDict()).setdefault(user, deque()).append((waiter, tokens))
+        self._wakeup(provider).set()
+        if provider not in self._dispatchers or self._dispatchers[provider].done():
+            self._dispatchers[provider] = loop.create_task(self._dispatch(provider))
+        with span("llm-queue", provider=provider):
+            await waiter
+        waited = time.monotonic() - start
+        with self._lock:
+            self._waits.append(waited)
+            self._counts["granted"] += 1
+        return waited
+
+    def _wakeup(self, provider: str) -> asyncio.Event:
+        if provider not in self._wakeups:
+            self._wakeups[provider] = asyncio.Event()
+        return self._wakeups[provider]
+
+    async def _dispatch(self, provider: str):
+        """사용자를 돌아가며 한도가 허락하는 만큼 대기 중인 호출을 내보냄"""
+        queues = self._queues[provider]
+        while True:
+            if not queues:
+                self._wakeup(provider).clear()
+                await self._wakeup(provider).wait()
+                continue
+            user, waiters = next(iter(queues.items()))
+            waiter, tokens = waiters[0]
+            if waiter.done():  # 헤징에서 져서 취소된 호출 등
+                waiters.popleft()
+                if not waiters:
+                    del queues[user]
+                continue
+            with self._lock:
+                rpm, tpm = self._buckets.get(provider, (None, None))
+                delay = max(rpm.wait_time(1) if rpm else 0.0, tpm.wait_time(tokens) if tpm else 0.0)
+                if delay <= 0:
+                    if rpm:
+                        rpm.take(1)
+                    if tpm:
+                        tpm.take(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            waiters.popleft()
+            waiter.set_result(None)
+            # 다음 차례는 다른 사용자에게
+            if waiters:
+                queues.move_to_end(user)
+            else:
+                del queues[user]
+
+    def backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """재시도 전 대기 시간 (Retry-After 우선, 없으면 full jitter 지수 백오프)"""
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after)) + random.uniform(0, self.base_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def observe(self, provider: str, response: httpx.Response):
+        """응답의 남은 한도 헤더와 429를 버킷에 반영"""
+        with self._lock:
+            rpm, tpm = self._buckets.get(provider, (None, None))
+            if response.status_code == 429:
+                self._counts["rate_limited"] += 1
+                for bucket in (rpm, tpm):
+                    if bucket:
+                        bucket.clamp(0)
+                return
+            for bucket, header in zip((rpm, tpm), RATE_LIMIT_HEADERS.get(provider, ())):
+                value = response.headers.get(header)
+                if bucket and value and value.isdigit():
+                    bucket.clamp(float(value))
+
+    def note_retry(self, provider: str, status: Optional[int]):
+        """재시도를 현재 span, 요청 기록, 카운터에 반영"""
+        with self._lock:
+            self._counts["retries"] += 1
+        current = current_span()
+        if current is not None:
+            current.add_retry()
+        tracer.count("llm_retries_total", provider=provider)
+        if status == 429:
+            tracer.count("rate_limited_total", provider=provider)
+            self._add_to_request("rate_limited", 1)
+        self._add_to_request("retries", 1)
+
+    @staticmethod
+    def note_wait(waited: float):
+        current = current_span()
+        if current is not None:
+            current.add_queue_wait(waited)
+        LLMScheduler._add_to_request("queue_wait_s", waited)
+
+    @staticmethod
+    def _add_to_request(key: str, value: float):
+        record = current_request()
+        if record is not None:
+            record["scheduler"][key] += value
+
+    def stats(self) -> Dict:
+        """대기 중인 호출 수, 최근 대기 시간 백분위, 재시도 / 429 횟수"""
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "queued": {
+                    provider: sum(len(waiters) for waiters in queues.values())
+                    for provider, queues in self._queues.items()
+                },
+                "wait_p50_s": waits[len(waits) // 2] if waits else None,
+                "wait_p95_s": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else None,
+                **self._counts,
+            }
+
+
+class ScheduledTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """LLM 호출을 스케줄러에 통과시키고 재시도하는 httpx 전송 계층 (다른 요청은 그대로 전달)"""
+
+    def __init__(self, transport, scheduler: LLMScheduler):
+        self.transport = transport
+        self.scheduler = scheduler
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        provider = provider_of(request)
+        if provider is None:
+            return self.transport.handle_request(request)
+        tokens = self.scheduler.estimate_request_tokens(request)
+        for attempt in range(self.scheduler.max_retries + 1):
+            # 대기는 공유 이벤트 루프의 디스패처가 정함 (동기 클라이언트는 루프 밖 스레드에서만 쓰임)
+            self.scheduler.note_wait(run_sync(self.scheduler.acquire(provider, tokens)))
+            response = None
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError:
+                if attempt == self.scheduler.max_retries:
+                    raise
+            if response is not None:
+                self.scheduler.observe(provider, response)
+                if response.status_code not in RETRY_STATUSES or attempt == self.scheduler.max_retries:
+                    return response
+                response.read()
+                response.close()
+            self.scheduler.note_retry(provider, response.status_code if response is not None else None)
+            time.sleep(self.scheduler.backoff(attempt, response))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        provider = provider_of(request)
+        if provider is None:
+            return await self.transport.handle_async_request(request)
+        tokens = self.scheduler.estimate_request_tokens(request)
+        for attempt in range(self.scheduler.max_retries + 1):
+            self.scheduler.note_wait(await self.scheduler.acquire(provider, tokens))
+            response = None
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                if attempt == self.scheduler.max_retries:
+                    raise
+            if response is not None:
+                self.scheduler.observe(provider, response)
+                if response.status_code not in RETRY_STATUSES or attempt == self.scheduler.max_retries:
+                    return response
+                await response.aread()
+                await response.aclose()
+            self.scheduler.note_retry(provider, response.status_code if response is not None else None)
+            await asyncio.sleep(self.scheduler.backoff(attempt, response))
+
+    def close(self):
+        self.transport.close()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+# 프로세스 전체에서 공유하는 스케줄러 (한도는 configure로 설정, 설정 전에는 재시도만 담당)
+scheduler = LLMScheduler()
@@ -0,0 +1,123 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from .request_context import record_cache
+from .tracing import tracer
+
+
+class _Call:
+    """진행 중인 실행 하나와 그 결과를 기다리는 호출자 수"""
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamCall:
+    """진행 중인 스트림 하나: 지금까지 받은 조각을 모아 두고 늦게 합류한 호출자에게 처음부터 다시 보냄"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+
+    def notify(self):
+        # 기다리던 호출자를 모두 깨우고, 다음 조각은 새 이벤트로 기다리게 함
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 요청을 하나의 실행으로 합치는 도우미 (공유 이벤트 루프 안에서만 사용)
+
+    먼저 온 호출자가 실행을 시작하고, 실행이 끝나기 전에 같은 키로 온 호출자는 그 결과(또는 오류)를 함께 받는다.
+    한 호출자가 취소되어도 실행은 계속되며, 기다리는 호출자가 모두 떠났을 때만 실행을 취소한다.
+    실행이 끝나면 키를 지우므로 완료된 결과를 보관하는 캐시 역할은 하지 않는다.
+    """
+
+    def __init__(self, name: str):
+        self.name = name  # 카운터와 요청 기록에 남길 단계 이름
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+
+    def _note_join(self, stage: Optional[str]):
+        print(f"▶ 진행 중인 {stage or self.name} 실행에 합류")
+        tracer.count("singleflight_joined_total", span=stage or self.name)
+        record_cache(stage or self.name, "coalesced")
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]], stage: Optional[str] = None) -> Any:
+        """key로 진행 중인 실행이 있으면 그 결과를 기다리고, 없으면 factory()를 실행"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        else:
+            self._note_join(stage)
+        call.waiters += 1
+        try:
+            # shield: 이 호출자가 취소되어도 다른 호출자가 기다리는 실행은 그대로 둠
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 취소한 실행에 새 호출자가 합류하지 않도록 키를 먼저 지움 (done 콜백은 다음 루프 차례에 실행됨)
+                self._forget(self._calls, key, call)
+                call.task.cancel()
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]], stage: Optional[str] = None) -> AsyncIterator[Any]:
+        """key로 진행 중인 스트림이 있으면 지금까지의 조각부터 이어 받고, 없으면 factory()의 스트림을 시작"""
+        call = self._streams.get(key)
+        if call is None:
+            call = _StreamCall()
+            self._streams[key] = call
+            call.task = asyncio.ensure_future(self._pump(call, factory))
+            call.task.add_done_callback(lambda _: self._forget(self._streams, key, call))
+        else:
+            self._note_join(stage)
+        call.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(call.chunks):
+                    index += 1
+                    yield call.chunks[index - 1]
+                if call.done:
+                    if call.error is not None:
+                        raise call.error
+                    return
+                await call.changed.wait()
+        finally:
+            call.subscribers -= 1
+            if call.subscribers == 0 and not call.done:
+                # 취소한 스트림에 새 구독자가 합류하지 않도록 키를 먼저 지움 (_pump의 finally는 나중에 실행됨)
+                self._forget(self._streams, key, call)
+                call.task.cancel()
+
+    @staticmethod
+    async def _pump(call: _StreamCall, factory: Callable[[], AsyncIterator[Any]]):
+        try:
+            async for chunk in factory():
+                call.chunks.append(chunk)
+                call.notify()
+        except asyncio.CancelledError:
+            call.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            call.error = e
+        finally:
+            call.done = True
+            call.notify()
+
+    @staticmethod
+    def _forget(calls: Dict, key: str, call):
+        # 같은 키로 이미 새 실행이 시작되었으면 지우지 않음
+        if calls.get(key) is call:
+            del calls[key]
+
+    def in_flight(self) -> int:
+        """지금 진행 중인 실행 수"""
+        return len(self._calls) + len(self._streams)
@@ -0,0 +1,12 @@
+from .base import StorageBackend
+
+
+def create_storage(kind: str = "firestore", **kwargs) -> StorageBackend:
+    """설정 이름으로 저장소 생성 (firestore: db 필요, sqlite: path 선택)"""
+    if kind == "firestore":
+        from .firestore_backend import FirestoreStorage  # firebase_admin은 이 경우에만 필요
+        return FirestoreStorage(kwargs["db"])
+    if kind == "sqlite":
+        from .sqlite_backend import SQLiteStorage
+        return SQLiteStorage(**kwargs)
+    raise ValueError(f"지원하지 않는 저장소입니다: {kind}")
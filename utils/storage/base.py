@@ -0,0 +1,92 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+class StorageBackend(ABC):
+    """사용자, 세션 로그, 일기, API 응답을 저장하는 저장소 인터페이스
+
+    쓰기 메서드는 WriteBehindQueue의 쓰기 의도(kind, params)와 1:1로 대응한다.
+    """
+
+    # WriteBehindQueue가 접수할 수 있는 쓰기 의도 종류
+    INTENT_KINDS = (
+        "start_session", "start_api_responses", "append_activity", "save_entry", "save_api_response", "save_api_responses"
+    )
+
+    # 다시 시도하면 성공할 수 있는 쓰기 오류 (WriteBehindQueue는 이 오류면 계속 재시도하고,
+    # 그 밖의 오류가 반복되는 의도는 기록할 수 없는 것으로 보고 스풀의 dead letter 테이블로 옮긴다)
+    TRANSIENT_ERRORS: Tuple[type, ...] = (ConnectionError, TimeoutError)
+
+    # 사용자
+    @abstractmethod
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        """사용자 정보 반환 (없으면 None)"""
+
+    @abstractmethod
+    def put_user(self, user_id: str, data: Dict):
+        """사용자 정보 저장"""
+
+    # 세션과 활동 로그
+    @abstractmethod
+    def start_session(self, user_id: str, session_id: str, start_time: datetime):
+        """세션 로그 초기화"""
+
+    def start_api_responses(self, user_id: str, session_id: str, start_time: datetime):
+        """세션 응답 기록 초기화 (별도 초기화가 필요 없는 저장소는 그대로 둠)"""
+
+    @abstractmethod
+    def append_activities(self, user_id: str, session_id: str, activities: List[Dict]):
+        """세션 로그에 활동 추가 (각 활동은 activity, timestamp를 가짐)"""
+
+    @abstractmethod
+    def load_activities(self, user_id: str, session_id: str) -> List[Dict]:
+        """세션의 활동을 기록 순서대로 반환"""
+
+    # 일기 (initial_diaries / working_diaries / saved_diaries)
+    @abstractmethod
+    def save_entry(self, user_id: str, session_id: str, entry_type: str, doc_counter: int, entry: str, timestamp: str):
+        """일기 저장"""
+
+    @abstractmethod
+    def load_entries(self, user_id: str, session_id: str, entry_type: str) -> List[Dict]:
+        """세션의 일기를 doc_counter 순서대로 반환"""
+
+    # API 응답
+    @abstractmethod
+    def save_api_response(self, user_id: str, session_id: str, doc_counter: int, response: Dict):
+        """API 응답 하나를 저장"""
+
+    @abstractmethod
+    def load_api_responses(self, user_id: str, session_id: str) -> List[Dict]:
+        """세션의 API 응답을 요청 순서대로 반환"""
+
+    def apply_batch(self, intents: List[Tuple[str, Dict]]):
+        """쓰기 의도를 순서대로 적용 (한 번에 묶어 쓸 수 있는 저장소는 재정의)"""
+        for kind, params in intents:
+            self.apply(kind, params)
+
+    def apply(self, kind: str, params: Dict):
+        """쓰기 의도 하나를 해당 메서드 호출로 적용"""
+        if kind == "start_session":
+            self.start_session(params["user_id"], params["session_id"], params["start_time"])
+        elif kind == "start_api_responses":
+            self.start_api_responses(params["user_id"], params["session_id"], params["start_time"])
+        elif kind == "append_activity":
+            self.append_activities(
+                params["user_id"], params["session_id"],
+                [{"activity": params["activity"], "timestamp": params["timestamp"]}]
+            )
+        elif kind == "save_entry":
+            self.save_entry(
+                params["user_id"], params["session_id"], params["entry_type"],
+                params["doc_counter"], params["entry"], params["timestamp"]
+            )
+        elif kind == "save_api_response":
+            self.save_api_response(params["user_id"], params["session_id"], params["doc_counter"], params["response"])
+        elif kind == "save_api_responses":
+            # 관점 비교처럼 한 번의 요청에서 나온 응답 여러 개 (responses: doc_counter, response 목록)
+            for item in params["responses"]:
+                self.save_api_response(params["user_id"], params["session_id"], item["doc_counter"], item["response"])
+        else:
+            raise ValueError(f"지원하지 않는 쓰기 의도입니다: {kind}")
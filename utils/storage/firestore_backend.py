@@ -0,0 +1,183 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from firebase_admin import firestore
+from google.api_core import exceptions as google_exceptions
+
+from ..tracing import span
+from .base import StorageBackend
+
+# api_responses/{session_id} 문서 아래 responses 하위 컬렉션에 응답 하나당 문서 하나를 저장한다.
+# 문서 ID는 doc_counter를 0으로 채운 값이라 ID 순서가 곧 요청 순서다.
+RESPONSES_SUBCOLLECTION = "responses"
+
+# Firestore batch 하나에 담을 수 있는 최대 쓰기 수
+MAX_BATCH_WRITES = 500
+
+
+def api_response_doc_id(doc_counter: int) -> str:
+    """응답 문서 ID (정렬 가능한 형태)"""
+    return f"{doc_counter:06d}"
+
+
+class FirestoreStorage(StorageBackend):
+    """Firestore 저장소 구현"""
+
+    # 서버 / 네트워크 쪽 일시적인 오류 (InvalidArgument(문서 크기 초과 등), PermissionDenied는 재시도해도 같음)
+    TRANSIENT_ERRORS = StorageBackend.TRANSIENT_ERRORS + (
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.Aborted,
+        google_exceptions.RetryError,
+    )
+
+    def __init__(self, db):
+        self.db = db
+
+    # 문서 참조
+    def _user_ref(self, user_id: str):
+        return self.db.collection("users").document(user_id)
+
+    def _logs_ref(self, user_id: str, session_id: str):
+        return self._user_ref(user_id).collection("logs").document(session_id)
+
+    def _entry_ref(self, user_id: str, session_id: str, entry_type: str, doc_counter: int):
+        return self._user_ref(user_id).collection(entry_type).document(f'{session_id}_{doc_counter}')
+
+    def _api_responses_ref(self, user_id: str, session_id: str):
+        return self._user_ref(user_id).collection("api_responses").document(session_id)
+
+    def _api_response_ref(self, user_id: str, session_id: str, doc_counter: int):
+        return self._api_responses_ref(user_id, session_id) \
+            .collection(RESPONSES_SUBCOLLECTION).document(api_response_doc_id(doc_counter))
+
+    # 사용자
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        with span("firestore.get", collection="users"):
+            user_doc = self._user_ref(user_id).get()
+        return user_doc.to_dict() if user_doc.exists else None
+
+    def put_user(self, user_id: str, data: Dict):
+        self._user_ref(user_id).set(data)
+
+    # 쓰기: 하나씩 호출하면 각각 batch 하나로 기록
+    def start_session(self, user_id: str, session_id: str, start_time: datetime):
+        self.apply_batch([("start_session", {"user_id": user_id, "session_id": session_id, "start_time": start_time})])
+
+    def start_api_responses(self, user_id: str, session_id: str, start_time: datetime):
+        self.apply_batch([("start_api_responses", {"user_id": user_id, "session_id": session_id, "start_time": start_time})])
+
+    def append_activities(self, user_id: str, session_id: str, activities: List[Dict]):
+        self.apply_batch([
+            ("append_activity", {"user_id": user_id, "session_id": session_id, **activity})
+            for activity in activities
+        ])
+
+    def save_entry(self, user_id: str, session_id: str, entry_type: str, doc_counter: int, entry: str, timestamp: str):
+        self._entry_ref(user_id, session_id, entry_type, doc_counter).set({"entry": entry, "timestamp": timestamp})
+
+    def save_api_response(self, user_id: str, session_id: str, doc_counter: int, response: Dict):
+        self._api_response_ref(user_id, session_id, doc_counter).set({**response, "doc_counter": doc_counter})
+
+    def apply_batch(self, intents: List[Tuple[str, Dict]]):
+        """의도 목록을 순서대로 Firestore batch에 담아 기록"""
+        writes = self._to_writes(intents)
+        for start in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = self.db.batch()
+            chunk = writes[start:start + MAX_BATCH_WRITES]
+            for ref, data, merge in chunk:
+                batch.set(ref, data, merge=merge)
+            with span("firestore.batch_commit", writes=len(chunk)):
+                batch.commit()
+
+    def _to_writes(self, intents: List[Tuple[str, Dict]]) -> List[Tuple]:
+        """(문서 참조, 데이터, merge 여부) 목록으로 변환. 같은 세션의 활동 로그는 ArrayUnion 하나로 합침"""
+        writes = []
+        activities = defaultdict(list)
+        activity_slots = {}
+        for kind, params in intents:
+            if kind == "append_activity":
+                key = (params["user_id"], params["session_id"])
+                if key not in activity_slots:
+                    activity_slots[key] = len(writes)
+                    writes.append(None)  # 첫 활동 위치에서 기록해 순서 유지
+                activities[key].append({"activity": params["activity"], "timestamp": params["timestamp"]})
+            else:
+                writes.extend(self._to_write(kind, params))
+        for (user_id, session_id), entries in activities.items():
+            writes[activity_slots[(user_id, session_id)]] = (
+                self._logs_ref(user_id, session_id),
+                {"activities": firestore.ArrayUnion(entries)},
+                True
+            )
+        return writes
+
+    def _to_write(self, kind: str, params: Dict) -> List[Tuple]:
+        if kind == "start_session":
+            return [(
+                self._logs_ref(params["user_id"], params["session_id"]),
+                {"start_time": params["start_time"], "end_time": None, "activities": []},
+                False
+            )]
+        if kind == "start_api_responses":
+            # 응답은 responses 하위 컬렉션에 하나씩 저장
+            return [(
+                self._api_responses_ref(params["user_id"], params["session_id"]),
+                {"start_time": params["start_time"]},
+                False
+            )]
+        if kind == "save_entry":
+            return [(
+                self._entry_ref(params["user_id"], params["session_id"], params["entry_type"], params["doc_counter"]),
+                {"entry": params["entry"], "timestamp": params["timestamp"]},
+                False
+            )]
+        if kind == "save_api_response":
+            return [(
+                self._api_response_ref(params["user_id"], params["session_id"], params["doc_counter"]),
+                {**params["response"], "doc_counter": params["doc_counter"]},
+                False
+            )]
+        if kind == "save_api_responses":
+            return [
+                (
+                    self._api_response_ref(params["user_id"], params["session_id"], item["doc_counter"]),
+                    {**item["response"], "doc_counter": item["doc_counter"]},
+                    False
+                )
+                for item in params["responses"]
+            ]
+        raise ValueError(f"지원하지 않는 쓰기 의도입니다: {kind}")
+
+    # 읽기
+    def load_activities(self, user_id: str, session_id: str) -> List[Dict]:
+        with span("firestore.get", collection="logs"):
+            logs_doc = self._logs_ref(user_id, session_id).get()
+        return logs_doc.to_dict().get("activities", []) if logs_doc.exists else []
+
+    def load_entries(self, user_id: str, session_id: str, entry_type: str) -> List[Dict]:
+        prefix = f"{session_id}_"
+        with span("firestore.query", collection=entry_type):
+            entries = [
+                {**doc.to_dict(), "doc_counter": int(doc.id[len(prefix):])}
+                for doc in self._user_ref(user_id).collection(entry_type).stream() if doc.id.startswith(prefix)
+            ]
+        return sorted(entries, key=lambda entry: entry["doc_counter"])
+
+    def load_api_responses(self, user_id: str, session_id: str) -> List[Dict]:
+        """세션의 응답을 요청 순서대로 모아서 반환 (이전 배열 형식으로 저장된 응답 포함)"""
+        session_ref = self._api_responses_ref(user_id, session_id)
+
+        # 이전 형식: 세션 문서의 responses 배열
+        with span("firestore.get", collection="api_responses"):
+            session_doc = session_ref.get()
+        legacy = session_doc.to_dict().get("responses", []) if session_doc.exists else []
+
+        with span("firestore.query", collection="api_responses"):
+            docs = session_ref.collection(RESPONSES_SUBCOLLECTION).order_by("doc_counter").stream()
+            responses = [doc.to_dict() for doc in docs]
+        return list(legacy) + responses
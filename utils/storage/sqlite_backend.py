@@ -0,0 +1,204 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .base import StorageBackend
+
+DEFAULT_STORAGE_PATH = Path(__file__).parent.parent.parent / '.cache' / 'storage.sqlite3'
+
+
+def _to_json(value) -> str:
+    """datetime을 ISO 문자열로 바꿔 JSON 직렬화"""
+    return json.dumps(value, ensure_ascii=False, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
+
+def _to_text(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class SQLiteStorage(StorageBackend):
+    """로컬 SQLite(WAL) 저장소 구현 (Firestore 없이 로컬 모드로 실행하거나 저장 비용을 측정할 때 사용)
+
+    조회 패턴(사용자 -> 세션 -> 순번)에 맞춰 복합 인덱스를 두고, apply_batch는 트랜잭션 하나로 기록한다.
+    """
+
+    # 잠김(database is locked), 디스크 I/O 오류 등
+    TRANSIENT_ERRORS = StorageBackend.TRANSIENT_ERRORS + (sqlite3.OperationalError,)
+
+    def __init__(self, path: Optional[Path] = DEFAULT_STORAGE_PATH):
+        # path가 None이면 메모리 DB
+        self._conn = self._connect(path)
+        self._lock = threading.Lock()
+
+    def _connect(self, path: Optional[Path]) -> sqlite3.Connection:
+        """SQLite 파일 연결 및 테이블, 인덱스 생성"""
+        if path is None:
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+        else:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sessions (
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                start_time TEXT,
+                end_time TEXT,
+                PRIMARY KEY (user_id, session_id)
+            );
+            CREATE TABLE IF NOT EXISTS activities (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                activity TEXT NOT NULL,
+                timestamp TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_activities_session ON activities (user_id, session_id, seq);
+            CREATE TABLE IF NOT EXISTS diaries (
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                entry_type TEXT NOT NULL,
+                doc_counter INTEGER NOT NULL,
+                entry TEXT NOT NULL,
+                timestamp TEXT,
+                PRIMARY KEY (user_id, entry_type, session_id, doc_counter)
+            );
+            CREATE INDEX IF NOT EXISTS idx_diaries_timestamp ON diaries (user_id, entry_type, timestamp);
+            CREATE TABLE IF NOT EXISTS api_responses (
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                doc_counter INTEGER NOT NULL,
+                response TEXT NOT NULL,
+                timestamp TEXT,
+                PRIMARY KEY (user_id, session_id, doc_counter)
+            );
+            CREATE INDEX IF NOT EXISTS idx_api_responses_timestamp ON api_responses (user_id, timestamp);
+            """
+        )
+        conn.commit()
+        return conn
+
+    # 사용자
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_user(self, user_id: str, data: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO users (user_id, data) VALUES (?, ?)", (user_id, _to_json(data))
+            )
+            self._conn.commit()
+
+    # 쓰기: 하나씩 호출해도 apply_batch와 같은 경로로 기록
+    def start_session(self, user_id: str, session_id: str, start_time: datetime):
+        self.apply_batch([("start_session", {"user_id": user_id, "session_id": session_id, "start_time": start_time})])
+
+    def append_activities(self, user_id: str, session_id: str, activities: List[Dict]):
+        self.apply_batch([
+            ("append_activity", {"user_id": user_id, "session_id": session_id, **activity})
+            for activity in activities
+        ])
+
+    def save_entry(self, user_id: str, session_id: str, entry_type: str, doc_counter: int, entry: str, timestamp: str):
+        self.apply_batch([("save_entry", {
+            "user_id": user_id, "session_id": session_id, "entry_type": entry_type,
+            "doc_counter": doc_counter, "entry": entry, "timestamp": timestamp
+        })])
+
+    def save_api_response(self, user_id: str, session_id: str, doc_counter: int, response: Dict):
+        self.apply_batch([("save_api_response", {
+            "user_id": user_id, "session_id": session_id, "doc_counter": doc_counter, "response": response
+        })])
+
+    def apply_batch(self, intents: List[Tuple[str, Dict]]):
+        """의도 목록을 트랜잭션 하나로 기록 (실패하면 전부 롤백되어 큐가 같은 묶음을 다시 시도)"""
+        with self._lock:
+            try:
+                for kind, params in intents:
+                    self._execute(kind, params)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def _execute(self, kind: str, params: Dict):
+        if kind == "start_session":
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (user_id, session_id, start_time, end_time) VALUES (?, ?, ?, NULL)",
+                (params["user_id"], params["session_id"], _to_text(params["start_time"]))
+            )
+            self._conn.execute(
+                "DELETE FROM activities WHERE user_id = ? AND session_id = ?",
+                (params["user_id"], params["session_id"])
+            )
+        elif kind == "start_api_responses":
+            pass  # 응답은 api_responses 테이블에 행 단위로 저장되므로 초기화할 것이 없음
+        elif kind == "append_activity":
+            self._conn.execute(
+                "INSERT INTO activities (user_id, session_id, activity, timestamp) VALUES (?, ?, ?, ?)",
+                (params["user_id"], params["session_id"], params["activity"], _to_text(params["timestamp"]))
+            )
+        elif kind == "save_entry":
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO diaries (user_id, session_id, entry_type, doc_counter, entry, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (params["user_id"], params["session_id"], params["entry_type"], params["doc_counter"],
+                 params["entry"], _to_text(params["timestamp"]))
+            )
+        elif kind == "save_api_response":
+            response = params["response"]
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO api_responses (user_id, session_id, doc_counter, response, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (params["user_id"], params["session_id"], params["doc_counter"],
+                 _to_json({**response, "doc_counter": params["doc_counter"]}), _to_text(response.get("timestamp")))
+            )
+        elif kind == "save_api_responses":
+            for item in params["responses"]:
+                self._execute("save_api_response", {**params, **item})
+        else:
+            raise ValueError(f"지원하지 않는 쓰기 의도입니다: {kind}")
+
+    # 읽기
+    def load_activities(self, user_id: str, session_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT activity, timestamp FROM activities WHERE user_id = ? AND session_id = ? ORDER BY seq",
+                (user_id, session_id)
+            ).fetchall()
+        return [{"activity": activity, "timestamp": timestamp} for activity, timestamp in rows]
+
+    def load_entries(self, user_id: str, session_id: str, entry_type: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT doc_counter, entry, timestamp FROM diaries
+                WHERE user_id = ? AND entry_type = ? AND session_id = ? ORDER BY doc_counter
+                """,
+                (user_id, entry_type, session_id)
+            ).fetchall()
+        return [{"entry": entry, "timestamp": timestamp, "doc_counter": doc_counter} for doc_counter, entry, timestamp in rows]
+
+    def load_api_responses(self, user_id: str, session_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT response FROM api_responses WHERE user_id = ? AND session_id = ? ORDER BY doc_counter",
+                (user_id, session_id)
+            ).fetchall()
+        return [json.loads(response) for (response,) in rows]
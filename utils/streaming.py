@@ -0,0 +1,21 @@
+from typing import Any, AsyncIterator, Dict
+
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import Runnable
+
+
+def create_stream_parser(pydantic_object) -> JsonOutputParser:
+    """부분 JSON을 파싱하는 스트리밍용 파서 생성 (형식 지시문은 PydanticOutputParser와 동일)"""
+    return JsonOutputParser(pydantic_object=pydantic_object)
+
+
+async def astream_text_field(chain: Runnable, inputs: Dict[str, Any], field: str = "diary_entry") -> AsyncIterator[str]:
+    """JSON 출력 체인을 스트리밍하며 문자열 필드의 새로 늘어난 부분만 반환"""
+    emitted = ""
+    async for partial in chain.astream(inputs):
+        text = partial.get(field) if isinstance(partial, dict) else None
+        # 부분 파싱 결과가 이전 출력의 연장인 경우에만 증가분을 내보냄
+        if not isinstance(text, str) or len(text) <= len(emitted) or not text.startswith(emitted):
+            continue
+        yield text[len(emitted):]
+        emitted = text
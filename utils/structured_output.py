@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, Dict, List, Type
+
+import anthropic
+import openai
+from langchain.output_parsers import PydanticOutputParser
+from langchain_anthropic import ChatAnthropic
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser, PydanticToolsParser
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda, RunnablePassthrough
+from langchain_core.utils.function_calling import convert_to_openai_function
+from pydantic import BaseModel, ValidationError
+
+from .streaming import create_stream_parser
+from .tracing import tracer
+
+# 구조화 출력이 실패했을 때 형식 지시문 + 텍스트 파서로 다시 시도할 오류
+# (출력이 스키마에 맞지 않거나, 제공자 / 모델이 response_format이나 도구 호출을 지원하지 않는 경우)
+FALLBACK_ERRORS = (OutputParserException, ValidationError, openai.BadRequestError, anthropic.BadRequestError)
+
+
+def openai_response_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Pydantic 모델을 OpenAI response_format(json_schema, strict)으로 변환"""
+    function = convert_to_openai_function(schema, strict=True)
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": function["name"], "schema": function["parameters"], "strict": True},
+    }
+
+
+def native_chain(model: BaseChatModel, schema: Type[BaseModel], streaming: bool = False) -> Runnable:
+    """제공자 고유 구조화 출력을 쓰는 model | parser 체인
+
+    OpenAI는 response_format json_schema로 스키마에 맞는 JSON 본문을, Anthropic은 도구 호출을 강제해
+    도구 입력으로 결과를 받는다. 스트리밍이면 부분 JSON을 dict로 내보낸다.
+    """
+    if isinstance(model, ChatAnthropic):
+        name = schema.__name__
+        bound = model.bind_tools([schema], tool_choice=name)
+        if streaming:
+            return bound | JsonOutputKeyToolsParser(key_name=name, first_tool_only=True)
+        return bound | PydanticToolsParser(tools=[schema], first_tool_only=True)
+    bound = model.bind(response_format=openai_response_format(schema))
+    return bound | (create_stream_parser(schema) if streaming else PydanticOutputParser(pydantic_object=schema))
+
+
+def _note_fallback(inputs):
+    print("▶ 구조화 출력 실패, 형식 지시문으로 다시 시도")
+    tracer.count("structured_output_fallbacks_total")
+    return inputs
+
+
+async def _anote_fallback(inputs):
+    return _note_fallback(inputs)
+
+
+def structured_chain(prompt: BasePromptTemplate, model: BaseChatModel, schema: Type[BaseModel],
+                     streaming: bool = False, native: bool = True) -> Runnable:
+    """prompt | model | parser 체인 생성 (prompt의 {format_instructions}는 여기서 채움)
+
+    native이면 형식 지시문 없이 제공자 고유 구조화 출력을 쓰고, 실패하면 형식 지시문을 넣은 프롬프트와
+    텍스트 파서로 한 번 더 시도한다. 스트리밍은 첫 조각이 나오기 전에 실패한 경우에만 다시 시도한다.
+    """
+    format_instructions = PydanticOutputParser(pydantic_object=schema).get_format_instructions()
+    parser = create_stream_parser(schema) if streaming else PydanticOutputParser(pydantic_object=schema)
+    text_chain = prompt.partial(format_instructions=format_instructions) | model | parser
+    if not native:
+        return text_chain
+    return (prompt.partial(format_instructions="") | native_chain(model, schema, streaming)).with_fallbacks(
+        [RunnablePassthrough(_note_fallback, afunc=_anote_fallback) | text_chain],
+        exceptions_to_handle=FALLBACK_ERRORS
+    )
+
+
+def candidates_chain(prompt: BasePromptTemplate, model: BaseChatModel, schema: Type[BaseModel], n: int,
+                     native: bool = True) -> Runnable:
+    """한 번의 호출로 후보 n개를 만들어 스키마 객체 목록으로 반환하는 체인
+
+    OpenAI는 n 파라미터로 한 번에 받고(입력 토큰은 한 번만 과금), n을 지원하지 않는 Anthropic은 n번 동시에 호출한다.
+    파싱에 실패한 후보는 버리고, 하나도 남지 않으면 오류를 발생시킨다.
+    """
+    if isinstance(model, ChatAnthropic):
+        chain = structured_chain(prompt, model, schema, native=native)
+
+        async def ainvoke_each(inputs: Dict[str, Any]) -> List[BaseModel]:
+            return list(await asyncio.gather(*(chain.ainvoke(inputs) for _ in range(n))))
+        return RunnableLambda(ainvoke_each)
+
+    parser = PydanticOutputParser(pydantic_object=schema)
+    if native:
+        prompt = prompt.partial(format_instructions="")
+        kwargs = {"n": n, "response_format": openai_response_format(schema)}
+    else:
+        prompt = prompt.partial(format_instructions=parser.get_format_instructions())
+        kwargs = {"n": n}
+
+    async def agenerate(inputs: Dict[str, Any]) -> List[BaseModel]:
+        prompt_value = await prompt.ainvoke(inputs)
+        result = await model.agenerate_prompt([prompt_value], **kwargs)
+        candidates = []
+        for generation in result.generations[0]:
+            try:
+                candidates.append(parser.parse(generation.text))
+            except (OutputParserException, ValidationError):
+                tracer.count("candidate_parse_failures_total")
+        if not candidates:
+            raise OutputParserException(f"후보 {n}개를 모두 파싱하지 못했습니다.")
+        return candidates
+    return RunnableLambda(agenerate)
@@ -1,27 +1,21 @@
 import json
 import random
 from pathlib import Path
-from langchain.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
-from langchain.output_parsers import PydanticOutputParser
+from .async_utils import run_sync
+from .streaming import astream_text_field
+from .tracing import span
+from langchain.prompts import ChatPromptTemplate
+from .llm_backend import LLMBackend, model_name_of
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional
 
-tone_template = PromptTemplate(
-    input_variables=["diary_entry", "tone", "tone_example"],
-    template=(
-        """
+# 톤 적용 프롬프트: 제공자 측 프롬프트 캐시가 적중하도록 정적 지시문과 형식 지시문을 앞에 두고,
+# 요청마다 달라지는 톤 예시와 일기를 뒤에 둔다.
+tone_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
         당신은 글쓰기 전문가입니다.
 
-        일기:
-        ```
-        {diary_entry}
-        ```
-
-        '{tone}' 톤의 예시:
-        "{tone_example}"
-
-        주어진 일기의 내용은 유지하되, 예시를 참고하여 '{tone}' 톤을 다음 측면에서 적용해 주세요:
+        주어진 일기의 내용은 유지하되, 주어진 톤의 예시를 참고하여 그 톤을 다음 측면에서 적용해 주세요:
         - 묘사의 깊이
         - 표현의 가벼움
         - 주로 사용되는 어투
@@ -33,15 +27,21 @@ tone_template = PromptTemplate(
         - 표현의 일관성과 자연스러움을 유지하세요.
 
         {format_instructions}
-        """
-    )
-)
+        """),
+    ("human", """
+        '{tone}' 톤의 예시:
+        "{tone_example}"
 
-my_tone_template = PromptTemplate(
-    input_variables=["diary_entry", "original_diary_entry"],
-    template=(
-        """
-        당신은 글쓰기 전문가입니다. '확장된 글'을 '원본 글'을 쓴 사람이 작성한 것처럼 다듬어야 합니다. 
+        일기:
+        ```
+        {diary_entry}
+        ```
+        """),
+])
+
+my_tone_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
+        당신은 글쓰기 전문가입니다. '확장된 글'을 '원본 글'을 쓴 사람이 작성한 것처럼 다듬어야 합니다.
 
         '확장된 글'을 '원본 글'과 비교하여 동일한 부분은 유지하되, 다른 부분에 한해서 '원본 글'의 표현을 반영해 자연스럽게 다듬으세요:
         - 일상적 어휘와 단어 선택
@@ -53,6 +53,9 @@ my_tone_template = PromptTemplate(
         - 원본 글의 내용은 그대로 유지되고, 추가된 부분의 '표현이나 어휘'가 다듬어진 상태여야 합니다.
         - 수정 사항이 없는 경우 원본 글을 반환하세요.
 
+        {format_instructions}
+        """),
+    ("human", """
         원본 글:
         ```
         {original_diary_entry}
@@ -62,24 +65,25 @@ my_tone_template = PromptTemplate(
         ```
         {diary_entry}
         ```
+        """),
+])
 
-        {format_instructions}
-        """
-    )
-)
 
 class ToneAugmentResult(BaseModel):
     diary_entry: str = Field(description="증강된 일기 내용")
 
 class ToneAgent:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, backend: Optional[LLMBackend] = None):
+        self.backend = backend or LLMBackend(api_key)
         self.examples: Dict[str, List[str]] = self._load_examples()
-        self.llm = ChatOpenAI(
-            model_name="gpt-4o-mini",
-            temperature=0.7,
-            openai_api_key=api_key
-        )
-        self.tone_parser = PydanticOutputParser(pydantic_object=ToneAugmentResult)
+        # 제공자별 모델 (체인은 라우터로 묶어 헤징 / 장애 조치)
+        self.models = self.backend.chat_models("gpt-4o-mini", temperature=0.7)
+        self.llm = self.models[self.backend.providers[0]]
+        # 체인은 (my_tone 여부, 스트리밍 여부)별로 한 번만 생성
+        self.tone_chains = {
+            (my_tone, streaming): self._build_tone_chain(my_tone, streaming)
+            for my_tone in (False, True) for streaming in (False, True)
+        }
 
     def _load_examples(self) -> Dict[str, List[str]]:
         """톤 예시 JSON 파일 로드"""
@@ -100,34 +104,58 @@ class ToneAgent:
         print("톤 예시: ", chosen)
         return chosen
     
-    def _create_tone_chain(self, tone: str):
+    def validate_tone(self, tone: Optional[str]):
+        """지원하지 않는 톤이면 ValueError (None은 톤 단계 생략, my_tone은 원본 일기의 문체)"""
+        if tone is not None and tone != "my_tone" and tone not in self.examples:
+            raise ValueError(f"지원하지 않는 톤입니다: {tone}")
+
+    def _build_tone_chain(self, my_tone: bool, streaming: bool):
         """글 톤을 다듬는 체인 생성"""
+        prompt = my_tone_prompt if my_tone else tone_prompt
+        return self.backend.routed_chain(
+            "tone", self.models, lambda model: self.backend.structured_chain(prompt, model, ToneAugmentResult, streaming)
+        )
+
+    def _create_tone_chain(self, tone: str, streaming: bool = False):
+        """톤에 맞는 체인 반환 (미리 만들어 둔 체인 재사용)"""
+        return self.tone_chains[(tone == "my_tone", streaming)]
+
+    def _build_tone_inputs(self, diary_entry: str, original_diary_entry: str, tone: str, tone_example: Optional[str] = None) -> Dict:
+        """톤 체인의 입력 구성 (tone_example이 없으면 예시를 새로 고름)"""
         if tone=="my_tone":
-            return my_tone_template | self.llm | self.tone_parser
+            return {
+                "diary_entry": diary_entry,
+                "original_diary_entry": original_diary_entry
+            }
         else:
-            return tone_template | self.llm | self.tone_parser
+            return {
+                "diary_entry": diary_entry,
+                "tone": tone,
+                "tone_example": tone_example or self.get_random_example(tone)
+            }
 
     def refine_with_tone(self, diary_entry: str, original_diary_entry: str, tone: str) -> str:
-        try:
-            if tone=="my_tone":
-                
-                tone_chain = self._create_tone_chain(tone)
-                tone_result = tone_chain.invoke({
-                    "diary_entry": diary_entry,
-                    "original_diary_entry": original_diary_entry,
-                    "format_instructions": self.tone_parser.get_format_instructions()
-                })
-                
-                return tone_result.diary_entry
-            else:
-                tone_chain = self._create_tone_chain(tone)
-                tone_result = tone_chain.invoke({
-                    "diary_entry": diary_entry,
-                    "tone": tone,
-                    "tone_example": self.get_random_example(tone),
-                    "format_instructions": self.tone_parser.get_format_instructions()
-                })
-                return tone_result.diary_entry
-        
-        except Exception as e:
-            print(f"증강 중 오류 발생: {str(e)}")
\ No newline at end of file
+        """주어진 톤으로 일기 문체 다듬기 (동기 래퍼)"""
+        return run_sync(self.arefine_with_tone(diary_entry, original_diary_entry, tone))
+
+    async def arefine_with_tone(self, diary_entry: str, original_diary_entry: str, tone: str, tone_example: Optional[str] = None) -> str:
+        """주어진 톤으로 일기 문체 다듬기
+
+        오류는 감싸지 않고 그대로 발생시킨다 (호출한 쪽(파이프라인)이 오류 종류로 재시도 / 대체 여부를 정함).
+        """
+        tone_chain = self._create_tone_chain(tone)
+        with span("tone", model=model_name_of(self.llm), tone=tone):
+            tone_result = await tone_chain.ainvoke(
+                self._build_tone_inputs(diary_entry, original_diary_entry, tone, tone_example)
+            )
+        return tone_result.diary_entry
+
+    async def astream_refine_with_tone(self, diary_entry: str, original_diary_entry: str, tone: str, tone_example: Optional[str] = None) -> AsyncIterator[str]:
+        """주어진 톤으로 일기 문체를 다듬으며 결과를 생성되는 대로 조각 단위로 반환"""
+        tone_chain = self._create_tone_chain(tone, streaming=True)
+        with span("tone", model=model_name_of(self.llm), tone=tone, streaming=True):
+            async for chunk in astream_text_field(
+                tone_chain,
+                self._build_tone_inputs(diary_entry, original_diary_entry, tone, tone_example)
+            ):
+                yield chunk
@@ -1,11 +1,12 @@
 import json
 import random
 from pathlib import Path
+from .async_utils import run_sync
+from .tracing import span
 from langchain.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
-from langchain.output_parsers import PydanticOutputParser
+from .llm_backend import LLMBackend
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 tone_template = PromptTemplate(
     input_variables=["diary_entry", "tone", "tone_example"],
@@ -34,14 +35,12 @@ class ToneAugmentResult(BaseModel):
     diary_entry: str = Field(description="증강된 일기 내용")
 
 class ToneManager:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, backend: Optional[LLMBackend] = None):
+        backend = backend or LLMBackend(api_key)
         self.examples: Dict[str, List[str]] = self._load_examples()
-        self.llm = ChatOpenAI(
-            model_name="gpt-4o-mini",
-            temperature=0.7,
-            openai_api_key=api_key
-        )
-        self.tone_parser = PydanticOutputParser(pydantic_object=ToneAugmentResult)
+        self.llm = backend.chat_model("gpt-4o-mini", temperature=0.7)
+        # 체인은 한 번만 생성
+        self.tone_chain = self._create_tone_chain(backend)
 
     def _load_examples(self) -> Dict[str, List[str]]:
         """톤 예시 JSON 파일 로드"""
@@ -60,19 +59,24 @@ class ToneManager:
         print("톤 예시: ", chosen)
         return chosen
     
-    def _create_tone_chain(self):
+    def _create_tone_chain(self, backend: LLMBackend):
         """글 톤을 다듬는 체인 생성"""
-        return tone_template | self.llm | self.tone_parser
+        return backend.structured_chain(tone_template, self.llm, ToneAugmentResult)
 
     def refine_with_tone(self, diary_entry: str, tone: str) -> str:
+        """주어진 톤으로 일기 문체 다듬기 (동기 래퍼)"""
+        return run_sync(self.arefine_with_tone(diary_entry, tone))
+
+    async def arefine_with_tone(self, diary_entry: str, tone: str) -> str:
+        """주어진 톤으로 일기 문체 다듬기"""
         try:
-            tone_chain = self._create_tone_chain()
-            tone_result = tone_chain.invoke({
-                "diary_entry": diary_entry,
-                "tone": tone,
-                "tone_example": self.get_random_example(tone),
-                "format_instructions": self.tone_parser.get_format_instructions()
-            })
+            tone_chain = self.tone_chain
+            with span("tone", model=self.llm.model_name, tone=tone):
+                tone_result = await tone_chain.ainvoke({
+                    "diary_entry": diary_entry,
+                    "tone": tone,
+                    "tone_example": self.get_random_example(tone)
+                })
             return tone_result.diary_entry
         except Exception as e:
             raise Exception(f"증강 중 오류 발생: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .request_context import current_request
+
+# 지연 시간 히스토그램 구간 상한(초)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# 집계 레이블 (span 속성 중 이 값들로만 나눠 집계해 카디널리티를 제한)
+METRIC_LABELS = ("span", "provider", "model", "life_orientation", "tone", "status")
+
+# 현재 실행 중인 span. 공유 이벤트 루프로 넘어가도 contextvars로 전달된다.
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 사용량을 받을 수 없을 때(스트리밍)의 근사치 (한국어 기준 두 글자당 한 토큰)"""
+    return max(1, math.ceil(len(text) / 2)) if text else 0
+
+
+class Span:
+    """단계 하나(발견, 판정, 증강, 톤, 저장소 호출 등)의 실행 기록"""
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs  # model, life_orientation, tone 등
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.wall_s: Optional[float] = None
+        self.prompt_tokens = 0
+        self.cached_tokens = 0  # 제공자 측 프롬프트 캐시에서 읽은 프롬프트 토큰
+        self.completion_tokens = 0
+        self.llm_calls = 0
+        self.token_source = None  # "usage"(API 응답) 또는 "estimated"
+        self.retries = 0
+        self.queue_wait_s = 0.0  # 스케줄러 큐에서 기다린 시간
+        self.parse_failures = 0
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add_tokens(self, prompt_tokens: int, completion_tokens: int, source: str = "usage", cached_tokens: int = 0):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.completion_tokens += completion_tokens
+            self.llm_calls += 1
+            # 하나라도 추정치가 섞이면 추정치로 표시
+            self.token_source = "estimated" if "estimated" in (self.token_source, source) else source
+
+    def add_retry(self, count: int = 1):
+        with self._lock:
+            self.retries += count
+
+    def add_queue_wait(self, seconds: float):
+        with self._lock:
+            self.queue_wait_s += seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span": self.name,
+            **self.attrs,
+            "start_time": self.start_time,
+            "wall_s": self.wall_s,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "llm_calls": self.llm_calls,
+            "token_source": self.token_source,
+            "retries": self.retries,
+            "queue_wait_s": self.queue_wait_s,
+            "parse_failures": self.parse_failures,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class Tracer:
+    """span을 모아 레이블별 히스토그램과 카운터로 집계하고 Prometheus 텍스트 / JSON lines로 내보냄"""
+
+    def __init__(self, jsonl_path: Optional[Path] = None):
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None  # 설정하면 끝난 span을 한 줄씩 기록
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple, List[int]] = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self._sums: Dict[Tuple, float] = defaultdict(float)
+        self._counters: Dict[Tuple[str, Tuple], float] = defaultdict(float)
+
+    def configure(self, jsonl_path: Optional[Path] = None):
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        """블록 실행을 span으로 기록 (출력 파서 오류는 parse_failures로 집계)"""
+        span = Span(name, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except (GeneratorExit, asyncio.CancelledError):
+            span.status = "cancelled"  # 스트리밍을 중간에 멈췄거나 취소된 경우
+            raise
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e}"[:500]
+            # langchain을 불러오지 않도록 이름으로 출력 파서 오류 판별
+            if type(e).__name__ == "OutputParserException" or "OutputParserException" in str(e):
+                span.parse_failures += 1
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                _current_span.set(None)  # 다른 컨텍스트에서 끝난 스트리밍 span
+            span.wall_s = time.perf_counter() - span._start
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        labels = self._labels(span)
+        with self._lock:
+            index = bisect_left(LATENCY_BUCKETS, span.wall_s)
+            self._histograms[labels][index] += 1
+            self._sums[labels] += span.wall_s
+            for counter, value in (
+                ("prompt_tokens_total", span.prompt_tokens),
+                ("cached_prompt_tokens_total", span.cached_tokens),
+                ("completion_tokens_total", span.completion_tokens),
+                ("llm_calls_total", span.llm_calls),
+                ("retries_total", span.retries),
+                ("queue_wait_seconds_total", span.queue_wait_s),
+                ("parse_failures_total", span.parse_failures),
+            ):
+                self._counters[(counter, labels)] += value
+            if self.jsonl_path is not None:
+                self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+        self._attach_to_request(span)
+
+    @staticmethod
+    def _labels(span: Span) -> Tuple:
+        return Tracer._label_values({"span": span.name, "status": span.status, **span.attrs})
+
+    @staticmethod
+    def _label_values(values: Dict[str, Any]) -> Tuple:
+        return tuple((label, str(values.get(label) or "")) for label in METRIC_LABELS)
+
+    def count(self, counter: str, value: float = 1, **attrs):
+        """span 밖에서 생기는 사건(HTTP 연결 등)을 현재 span의 레이블로 카운터에 누적"""
+        span = current_span()
+        values = {"span": span.name, **span.attrs} if span is not None else {}
+        values.update(attrs)
+        with self._lock:
+            self._counters[(counter, self._label_values(values))] += value
+
+    @staticmethod
+    def _attach_to_request(span: Span):
+        """현재 요청 기록에 단계별 토큰 사용량 누적"""
+        record = current_request()
+        if record is None or not (span.prompt_tokens or span.completion_tokens or span.llm_calls):
+            return
+        tokens = record["tokens"]
+        stage = tokens["by_stage"].setdefault(
+            span.name, {"prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "llm_calls": 0}
+        )
+        for key in ("prompt_tokens", "cached_tokens", "completion_tokens", "llm_calls"):
+            stage[key] += getattr(span, key)
+            tokens[key] += getattr(span, key)
+        if span.token_source == "estimated":
+            tokens["estimated"] = True
+
+    def to_prometheus(self) -> str:
+        """Prometheus 텍스트 형식으로 집계 결과 반환"""
+        lines = [
+            "# HELP augmentiary_span_seconds Wall time of pipeline stages and storage calls.",
+            "# TYPE augmentiary_span_seconds histogram",
+        ]
+        with self._lock:
+            for labels, counts in sorted(self._histograms.items()):
+                label_str = ",".join(f'{key}="{value}"' for key, value in labels)
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (math.inf,), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f'augmentiary_span_seconds_bucket{{{label_str},le="{le}"}} {cumulative}')
+                lines.append(f"augmentiary_span_seconds_sum{{{label_str}}} {self._sums[labels]}")
+                lines.append(f"augmentiary_span_seconds_count{{{label_str}}} {cumulative}")
+            counters = defaultdict(list)
+            for (counter, labels), value in self._counters.items():
+                counters[counter].append((labels, value))
+            for counter, values in sorted(counters.items()):
+                lines.append(f"# TYPE augmentiary_{counter} counter")
+                for labels, value in sorted(values):
+                    label_str = ",".join(f'{key}="{value_}"' for key, value_ in labels)
+                    lines.append(f"augmentiary_{counter}{{{label_str}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path):
+        """Prometheus 텍스트 파일로 저장 (node_exporter textfile collector 형식, 원자적 교체)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """레이블별 호출 수, 평균/백분위 지연 시간(히스토그램 구간 상한 기준), 토큰 합계"""
+        rows = []
+        with self._lock:
+            for labels, counts in sorted(self._histograms.items()):
+                total = sum(counts)
+                row = {key: value for key, value in labels if value}
+                row["count"] = total
+                row["mean_s"] = self._sums[labels] / total if total else None
+                for name, q in (("p50_s", 0.5), ("p95_s", 0.95)):
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS + (math.inf,), counts):
+                        cumulative += count
+                        if cumulative >= q * total:
+                            row[name] = bound
+                            break
+                for counter in (
+                    "prompt_tokens_total", "cached_prompt_tokens_total", "completion_tokens_total",
+                    "retries_total", "parse_failures_total"
+                ):
+                    row[counter] = self._counters[(counter, labels)]
+                rows.append(row)
+        return rows
+
+    def prompt_cache_report(self) -> Dict[str, Dict[str, Any]]:
+        """단계(span 이름)별 프롬프트 토큰 중 제공자 캐시에서 읽은 비율"""
+        report = defaultdict(lambda: {"prompt_tokens": 0, "cached_tokens": 0, "llm_calls": 0})
+        with self._lock:
+            for (counter, labels), value in self._counters.items():
+                name = dict(labels)["span"]
+                if counter == "prompt_tokens_total":
+                    report[name]["prompt_tokens"] += value
+                elif counter == "cached_prompt_tokens_total":
+                    report[name]["cached_tokens"] += value
+                elif counter == "llm_calls_total":
+                    report[name]["llm_calls"] += value
+        for row in report.values():
+            row["hit_rate"] = row["cached_tokens"] / row["prompt_tokens"] if row["prompt_tokens"] else None
+        return {name: row for name, row in sorted(report.items()) if row["llm_calls"]}
+
+    def connection_report(self) -> Dict[str, Dict[str, Any]]:
+        """단계(span 이름)별 HTTP 요청 중 기존 연결을 재사용한 비율"""
+        report = defaultdict(lambda: {"requests": 0, "new_connections": 0, "tls_handshakes": 0})
+        with self._lock:
+            for (counter, labels), value in self._counters.items():
+                name = dict(labels)["span"] or "-"
+                if counter == "http_requests_total":
+                    report[name]["requests"] += value
+                elif counter == "http_new_connections_total":
+                    report[name]["new_connections"] += value
+                elif counter == "http_tls_handshakes_total":
+                    report[name]["tls_handshakes"] += value
+        for row in report.values():
+            row["reuse_rate"] = 1 - row["new_connections"] / row["requests"] if row["requests"] else None
+        return {name: row for name, row in sorted(report.items()) if row["requests"]}
+
+
+# 프로세스 전체에서 공유하는 tracer
+tracer = Tracer(os.environ.get("AUGMENTIARY_TRACE_JSONL") or None)
+span = tracer.span
+
+
+def current_span() -> Optional[Span]:
+    """현재 실행 중인 span 반환 (없으면 None)"""
+    return _current_span.get()
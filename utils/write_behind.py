@@ -0,0 +1,271 @@
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: 스풀을 잠그지 않음 (프로세스 하나만 실행한다고 가정)
+    fcntl = None
+
+DEFAULT_SPOOL_PATH = Path(__file__).parent.parent / '.cache' / 'write_spool.sqlite3'
+# 같은 스풀 경로를 쓰는 프로세스 수 상한 (프로세스마다 write_spool.sqlite3, write_spool-1.sqlite3, ... 중 하나를 잠가 씀)
+MAX_SPOOL_SLOTS = 16
+
+
+class WriteBehindQueue:
+    """쓰기 의도(write intent)를 받아 즉시 반환하고, 백그라운드에서 일괄 기록하는 큐
+
+    모든 의도는 먼저 로컬 SQLite(WAL) 스풀에 순서대로 저장되므로, 저장소가 느리거나 내려가 있어도
+    유실되지 않는다. 워커는 스풀을 순서대로 읽어 sink.apply_batch로 기록하고, 성공한 것만 스풀에서 지운다.
+    일시적인 오류(sink.TRANSIENT_ERRORS)면 백오프 후 같은 순서로 다시 시도하고, 그 밖의 오류면 묶음을 반으로 나눠
+    기록할 수 없는 의도를 찾아 max_attempts번 실패한 뒤 dead_intents 테이블로 옮긴다 (뒤의 의도가 막히지 않도록).
+
+    스풀 파일은 프로세스마다 따로 잠가 쓰므로(Streamlit 앱, scripts/*, 두 번째 서버 프로세스) 서로의 의도를
+    기록하거나 지우지 않는다. 프로세스가 재시작되면 남은 의도부터 다시 기록하고, 잠겨 있지 않은
+    (종료된 프로세스가 남긴) 다른 슬롯의 의도도 가져와 기록한다.
+    """
+
+    def __init__(
+        self,
+        sink,
+        spool_path: Path = DEFAULT_SPOOL_PATH,
+        flush_interval: float = 0.5,
+        max_batch_size: int = 200,
+        max_backoff: float = 30.0,
+        max_attempts: int = 5
+    ):
+        self.sink = sink  # apply_batch(intents)를 제공하는 저장소
+        self.flush_interval = flush_interval  # 의도를 모으는 최대 대기 시간(초)
+        self.max_batch_size = max_batch_size  # 한 번에 기록할 최대 의도 수
+        self.max_backoff = max_backoff  # 실패 시 재시도 간격 상한(초)
+        self.max_attempts = max_attempts  # 일시적이지 않은 오류로 이만큼 실패한 의도는 dead letter로 옮김
+        self._transient_errors = getattr(sink, "TRANSIENT_ERRORS", (ConnectionError, TimeoutError))
+        self.spool_path, self._spool_lock = self._acquire_spool(Path(spool_path))
+        self._conn = self._connect(self.spool_path)
+        self._adopt_orphans(Path(spool_path))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_count = 0
+        self._flush_latency_total = 0.0
+        self._last_flush_latency: Optional[float] = None
+        self._max_flush_latency = 0.0
+        self._last_write_lag: Optional[float] = None  # 가장 오래된 의도의 접수부터 기록 완료까지
+        self._failures = 0
+        self._attempts: Dict[int, int] = {}  # 의도 순번 -> 일시적이지 않은 오류로 실패한 횟수
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._worker.start()
+
+    @staticmethod
+    def _spool_slots(path: Path) -> List[Path]:
+        """path를 쓰는 프로세스들이 나눠 쓰는 스풀 파일 목록"""
+        return [path] + [path.with_name(f"{path.stem}-{slot}{path.suffix}") for slot in range(1, MAX_SPOOL_SLOTS)]
+
+    @staticmethod
+    def _try_lock(path: Path):
+        """스풀 옆의 .lock 파일을 배타적으로 잠금 (다른 프로세스나 다른 큐가 쓰는 중이면 None, 프로세스가 끝나면 풀림)"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(path.with_name(path.name + ".lock"), "a")
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _acquire_spool(self, path: Path):
+        """잠겨 있지 않은 첫 스풀 슬롯을 잠그고 (경로, 잠금 파일) 반환"""
+        for slot in self._spool_slots(path):
+            lock_file = self._try_lock(slot)
+            if lock_file is not None:
+                if slot != path:
+                    print(f"► 스풀 {path.name}을 다른 프로세스가 사용 중이라 {slot.name} 사용")
+                return slot, lock_file
+        raise RuntimeError(f"사용 가능한 스풀이 없습니다 (프로세스 {MAX_SPOOL_SLOTS}개 초과): {path}")
+
+    def _adopt_orphans(self, path: Path):
+        """잠겨 있지 않은(종료된 프로세스가 남긴) 다른 슬롯의 의도를 이 스풀로 옮김"""
+        for slot in self._spool_slots(path):
+            if slot == self.spool_path or not slot.exists():
+                continue
+            lock_file = self._try_lock(slot)
+            if lock_file is None:
+                continue
+            try:
+                orphan = self._connect(slot)
+                rows = orphan.execute("SELECT kind, params, enqueued_at FROM intents ORDER BY seq").fetchall()
+                if rows:
+                    self._conn.executemany("INSERT INTO intents (kind, params, enqueued_at) VALUES (?, ?, ?)", rows)
+                    self._conn.commit()
+                    orphan.execute("DELETE FROM intents")
+                    orphan.commit()
+                    print(f"► {slot.name}에 남은 의도 {len(rows)}건을 {self.spool_path.name}로 옮김")
+                orphan.close()
+            finally:
+                lock_file.close()
+
+    @staticmethod
+    def _connect(path: Path) -> sqlite3.Connection:
+        """스풀 파일 연결 및 테이블 생성"""
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS intents (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                params BLOB NOT NULL,
+                enqueued_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS dead_intents (
+                seq INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params BLOB NOT NULL,
+                enqueued_at REAL NOT NULL,
+                failed_at REAL NOT NULL,
+                error TEXT NOT NULL
+            );
+            """
+        )
+        conn.commit()
+        return conn
+
+    def submit(self, kind: str, **params):
+        """쓰기 의도를 스풀에 추가하고 즉시 반환"""
+        # 기록할 수 없는 의도가 스풀 앞을 막지 않도록 접수 시점에 검사
+        if kind not in getattr(self.sink, "INTENT_KINDS", (kind,)):
+            raise ValueError(f"지원하지 않는 쓰기 의도입니다: {kind}")
+        with self._wakeup:
+            self._conn.execute(
+                "INSERT INTO intents (kind, params, enqueued_at) VALUES (?, ?, ?)",
+                (kind, pickle.dumps(params), time.time())
+            )
+            self._conn.commit()
+            self._wakeup.notify()
+
+    def flush(self, timeout: float = None) -> bool:
+        """스풀이 빌 때까지 대기 (timeout 안에 비면 True)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._wakeup:
+            while self._depth_locked() > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wakeup.wait(remaining if remaining is not None else 1.0)
+            return True
+
+    def queue_depth(self) -> int:
+        """아직 기록되지 않은 의도 수"""
+        with self._lock:
+            return self._depth_locked()
+
+    def _depth_locked(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM intents").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """큐 길이, dead letter 수와 기록 지연 시간 통계"""
+        with self._lock:
+            return {
+                "queue_depth": self._depth_locked(),
+                "dead_letters": self._conn.execute("SELECT COUNT(*) FROM dead_intents").fetchone()[0],
+                "flushes": self._flush_count,
+                "failures": self._failures,
+                "last_flush_latency_s": self._last_flush_latency,
+                "mean_flush_latency_s": self._flush_latency_total / self._flush_count if self._flush_count else None,
+                "max_flush_latency_s": self._max_flush_latency,
+                "last_write_lag_s": self._last_write_lag,
+            }
+
+    def _take_batch(self) -> List[Tuple[int, str, Dict, float]]:
+        """스풀에서 가장 오래된 의도부터 한 묶음 읽기 (삭제는 기록 성공 후)"""
+        with self._wakeup:
+            while self._depth_locked() == 0:
+                self._wakeup.wait()
+            # 첫 의도가 들어온 뒤 flush_interval 동안 더 모음
+            first_enqueued_at = self._conn.execute("SELECT MIN(enqueued_at) FROM intents").fetchone()[0]
+            while self._depth_locked() < self.max_batch_size:
+                wait = first_enqueued_at + self.flush_interval - time.time()
+                if wait <= 0:
+                    break
+                self._wakeup.wait(wait)
+            rows = self._conn.execute(
+                "SELECT seq, kind, params, enqueued_at FROM intents ORDER BY seq LIMIT ?",
+                (self.max_batch_size,)
+            ).fetchall()
+        return [(seq, kind, pickle.loads(params), enqueued_at) for seq, kind, params, enqueued_at in rows]
+
+    def _write(self, batch: List[Tuple[int, str, Dict, float]]) -> int:
+        """batch를 기록하고 스풀에서 지운 뒤 기록한 의도 수 반환
+
+        일시적인 오류는 그대로 발생시킨다 (저장소가 돌아올 때까지 같은 순서로 재시도).
+        그 밖의 오류면 batch를 반으로 나눠 앞에서부터 기록해 실패하는 의도 하나를 찾고, 그 의도가 max_attempts번
+        실패하면 dead letter로 옮긴다 (그 전까지는 오류를 발생시켜 백오프 후 다시 시도).
+        """
+        try:
+            self.sink.apply_batch([(kind, params) for _, kind, params, _ in batch])
+        except self._transient_errors:
+            raise
+        except Exception as e:
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                return self._write(batch[:middle]) + self._write(batch[middle:])
+            seq = batch[0][0]
+            attempts = self._attempts.get(seq, 0) + 1
+            if attempts < self.max_attempts:
+                self._attempts[seq] = attempts
+                raise
+            self._dead_letter(batch[0], e, attempts)
+            return 0
+        with self._wakeup:
+            self._conn.execute(
+                f"DELETE FROM intents WHERE seq IN ({','.join('?' * len(batch))})",
+                [seq for seq, _, _, _ in batch]
+            )
+            self._conn.commit()
+            for seq, _, _, _ in batch:
+                self._attempts.pop(seq, None)
+            self._wakeup.notify_all()
+        return len(batch)
+
+    def _dead_letter(self, intent: Tuple[int, str, Dict, float], error: Exception, attempts: int):
+        """기록할 수 없는 의도를 dead_intents 테이블로 옮김 (원인을 고친 뒤 다시 제출할 수 있도록 보관)"""
+        seq, kind, params, enqueued_at = intent
+        with self._wakeup:
+            self._conn.execute(
+                "INSERT INTO dead_intents (seq, kind, params, enqueued_at, failed_at, error) VALUES (?, ?, ?, ?, ?, ?)",
+                (seq, kind, pickle.dumps(params), enqueued_at, time.time(), f"{type(error).__name__}: {error}")
+            )
+            self._conn.execute("DELETE FROM intents WHERE seq = ?", (seq,))
+            self._conn.commit()
+            self._attempts.pop(seq, None)
+            self._wakeup.notify_all()
+        print(f"► 기록할 수 없는 의도 {kind}(#{seq})를 {attempts}번 시도 후 dead letter로 옮김: {error}")
+
+    def _run(self):
+        backoff = 0.5
+        while True:
+            batch = self._take_batch()
+            start = time.perf_counter()
+            try:
+                written = self._write(batch)
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                print(f"► 저장 실패, 남은 의도를 스풀에 보관하고 {backoff:.1f}초 후 재시도: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = 0.5
+            latency = time.perf_counter() - start
+            with self._wakeup:
+                self._flush_count += 1
+                self._flush_latency_total += latency
+                self._last_flush_latency = latency
+                self._max_flush_latency = max(self._max_flush_latency, latency)
+                self._last_write_lag = time.time() - min(enqueued_at for _, _, _, enqueued_at in batch)
+            print(f"► {written}건 저장 완료 ({latency * 1000:.0f}ms)")